@@ -7,6 +7,7 @@ from abc import ABCMeta, abstractmethod
 from datetime import timedelta
 
 from django.conf import settings
+from django.core.cache import cache
 from django.urls import resolve
 from django.utils.translation import ugettext as _
 from django.utils.translation import ugettext_lazy
@@ -28,6 +29,9 @@ from xmodule.modulestore import ModuleStoreEnum
 # how far back from the trigger point to look back in order to index
 REINDEX_AGE = timedelta(0, 60)  # 60 seconds
 
+# Maximum number of items sent to the search engine in each bulk request.
+INDEX_BATCH_SIZE = 500
+
 log = logging.getLogger('edx.modulestore')
 
 
@@ -132,6 +136,11 @@ class SearchIndexerBase(object):
             which items may need to be removed from the index
             If None, then a full reindex takes place
 
+        If incremental indexing is enabled, and the structure indexed last time is
+        known, then when triggered_at is given only the blocks that changed since
+        that structure, and their affected ancestors and descendants, are walked
+        and indexed, and the blocks deleted since then are removed from the index.
+
         Returns:
         Number of items that have been added to the index
         """
@@ -165,7 +174,12 @@ class SearchIndexerBase(object):
             """
             return item.location.version_agnostic().replace(branch=None)
 
-        def prepare_item_index(item, skip_index=False, groups_usage_info=None):
+        # structure_diff is the StructureDiff since the structure indexed last
+        # time, when indexing incrementally.
+        structure_diff = None
+        structure_version = None
+
+        def prepare_item_index(item, skip_index=False, groups_usage_info=None, in_changed_subtree=False):
             """
             Add this item to the items_index and indexed_items list
 
@@ -177,9 +191,23 @@ class SearchIndexerBase(object):
                 This should really only be passed from the recursive child calls when
                 this method has determined that it is safe to do so
 
+            in_changed_subtree - when indexing incrementally, whether the item is in
+                the subtree of a block whose settings changed since the last indexing
+
             Returns:
             item_content_groups - content groups assigned to indexed item
             """
+            if structure_diff is not None and not in_changed_subtree:
+                item_location = get_item_location(item)
+                in_changed_subtree = item_location in structure_diff.changed_subtrees
+                if not (
+                        in_changed_subtree or
+                        item_location in structure_diff.changed or
+                        item_location in structure_diff.ancestors
+                ):
+                    # Neither the item nor its descendants changed.
+                    return
+
             is_indexable = hasattr(item, "index_dictionary")
             item_index_dictionary = item.index_dictionary() if is_indexable else None
             # if it's not indexable and it does not have children, then ignore
@@ -211,9 +239,12 @@ class SearchIndexerBase(object):
             item_id = text_type(cls._id_modifier(item.scope_ids.usage_id))
             indexed_items.add(item_id)
             if item.has_children:
-                # determine if it's okay to skip adding the children herein based upon how recently any may have changed
-                skip_child_index = skip_index or \
-                    (triggered_at is not None and (triggered_at - item.subtree_edited_on) > reindex_age)
+                # determine if it's okay to skip adding the children herein based upon how recently any may have
+                # changed, unless the structure diff already tells which children changed
+                skip_child_index = skip_index or (
+                    structure_diff is None and triggered_at is not None and
+                    (triggered_at - item.subtree_edited_on) > reindex_age
+                )
                 children_groups_usage = []
                 for child_item in item.get_children():
                     if modulestore.has_published_version(child_item):
@@ -221,7 +252,8 @@ class SearchIndexerBase(object):
                             prepare_item_index(
                                 child_item,
                                 skip_index=skip_child_index,
-                                groups_usage_info=groups_usage_info
+                                groups_usage_info=groups_usage_info,
+                                in_changed_subtree=in_changed_subtree,
                             )
                         )
                 if None in children_groups_usage:
@@ -251,6 +283,12 @@ class SearchIndexerBase(object):
         try:
             with modulestore.branch_setting(ModuleStoreEnum.RevisionOption.published_only):
                 structure = cls._fetch_top_level(modulestore, structure_key)
+                structure_version = getattr(structure, 'course_version', None)
+                if triggered_at is not None:
+                    structure_diff = cls._get_structure_diff(modulestore, structure_key, structure)
+                if structure_diff is None:
+                    # The content of every block is indexed, so fetch it in bulk.
+                    modulestore.prefetch_definitions(structure.location, depth=None)
                 groups_usage_info = cls.fetch_group_usage(modulestore, structure)
 
                 # First perform any additional indexing from the structure object
@@ -259,8 +297,15 @@ class SearchIndexerBase(object):
                 # Now index the content
                 for item in structure.get_children():
                     prepare_item_index(item, groups_usage_info=groups_usage_info)
-                searcher.index(cls.DOCUMENT_TYPE, items_index)
-                cls.remove_deleted_items(searcher, structure_key, indexed_items)
+                for start in range(0, len(items_index), INDEX_BATCH_SIZE):
+                    searcher.index(cls.DOCUMENT_TYPE, items_index[start:start + INDEX_BATCH_SIZE])
+                if structure_diff is None:
+                    cls.remove_deleted_items(searcher, structure_key, indexed_items)
+                elif structure_diff.deleted:
+                    searcher.remove(
+                        cls.DOCUMENT_TYPE,
+                        [text_type(cls._id_modifier(location)) for location in structure_diff.deleted],
+                    )
         except Exception as err:  # pylint: disable=broad-except
             # broad exception so that index operation does not prevent the rest of the application from working
             log.exception(
@@ -273,8 +318,47 @@ class SearchIndexerBase(object):
         if error_list:
             raise SearchIndexingError('Error(s) present during indexing', error_list)
 
+        if structure_version is not None and cls.incremental_indexing_is_enabled():
+            cache.set(cls._indexed_version_cache_key(structure_key), structure_version, None)
         return indexed_count["count"]
 
+    @classmethod
+    def incremental_indexing_is_enabled(cls):
+        """
+        Checks to see if indexing only the changes since the last indexing is enabled
+        """
+        return False
+
+    @classmethod
+    def _indexed_version_cache_key(cls, structure_key):
+        """ Key of the cached version of the structure that was indexed last """
+        return u'{}.indexed_version.{}'.format(cls.INDEX_NAME, structure_key)
+
+    @classmethod
+    def _get_structure_diff(cls, modulestore, structure_key, structure):
+        """
+        Returns the StructureDiff of the given structure since the structure indexed
+        last, or None if the whole structure must be indexed.
+        """
+        if not cls.incremental_indexing_is_enabled():
+            return None
+        indexed_version = cache.get(cls._indexed_version_cache_key(structure_key))
+        if indexed_version is None or not hasattr(modulestore, 'get_structure_diff'):
+            return None
+        structure_diff = modulestore.get_structure_diff(structure.location.course_key, indexed_version)
+        if structure_diff is None:
+            return None
+        if structure.location.version_agnostic().replace(branch=None) in structure_diff.changed_subtrees:
+            # The settings of the course itself changed, which can affect every block
+            return None
+        log.info(
+            u'Indexing %d changed blocks and their ancestors, and removing %d deleted blocks, of %s',
+            len(structure_diff.changed) + len(structure_diff.changed_subtrees),
+            len(structure_diff.deleted),
+            structure_key,
+        )
+        return structure_diff
+
     @classmethod
     def _do_reindex(cls, modulestore, structure_key):
         """
@@ -354,6 +438,13 @@ class CoursewareSearchIndexer(SearchIndexerBase):
 
     UNNAMED_MODULE_NAME = ugettext_lazy("(Unnamed)")
 
+    @classmethod
+    def incremental_indexing_is_enabled(cls):
+        """
+        Checks to see if indexing only the changes since the last indexing is enabled
+        """
+        return settings.FEATURES.get('ENABLE_INCREMENTAL_COURSEWARE_INDEX', False)
+
     @classmethod
     def normalize_structure_key(cls, structure_key):
         """ Normalizes structure key for use in indexing """
@@ -13,6 +13,7 @@ import ddt
 import pytest
 import six
 from django.conf import settings
+from django.core.cache import cache
 from lazy.lazy import lazy
 from mock import patch
 from pytz import UTC
@@ -444,6 +445,58 @@ class TestCoursewareSearchIndexer(MixedWithOptionsTestCase):
         indexed_count = self.reindex_course(store)
         self.assertEqual(indexed_count, 7)
 
+    def _test_incremental_index(self, store):
+        """ Make sure that a time based request to index only indexes the changes since the last indexing """
+        cache.clear()
+        self.publish_item(store, self.vertical.location)
+        indexed_count = self.reindex_course(store)
+        self.assertEqual(indexed_count, 4)
+
+        # Add a new sequential, with a new vertical and its content
+        sequential2 = ItemFactory.create(
+            parent_location=self.chapter.location,
+            category='sequential',
+            display_name='Section 2',
+            modulestore=store,
+            publish_item=True,
+            start=datetime(2015, 3, 1, tzinfo=UTC),
+        )
+        vertical2 = ItemFactory.create(
+            parent_location=sequential2.location,
+            category='vertical',
+            display_name='Subsection 2',
+            modulestore=store,
+            publish_item=True,
+        )
+        ItemFactory.create(
+            parent_location=vertical2.location,
+            category="html",
+            display_name="Some other content",
+            publish_item=False,
+            modulestore=store,
+        )
+
+        before_time = datetime.now(UTC)
+        self.publish_item(store, vertical2.location)
+        # only the new blocks and their ancestor chapter are indexed, the
+        # original sequential did not change
+        new_indexed_count = self.index_recent_changes(store, before_time)
+        self.assertEqual(new_indexed_count, 4)
+        response = self.search()
+        self.assertEqual(response["total"], 7)
+
+        # deleting the new vertical removes it and its content from the index
+        self.delete_item(store, vertical2.location)
+        before_time = datetime.now(UTC)
+        self.publish_item(store, sequential2.location)
+        self.index_recent_changes(store, before_time)
+        response = self.search()
+        self.assertEqual(response["total"], 5)
+
+        # full index again
+        indexed_count = self.reindex_course(store)
+        self.assertEqual(indexed_count, 5)
+
     def _test_course_about_property_index(self, store):
         """ Test that informational properties in the course object end up in the course_info index """
         display_name = "Help, I need somebody!"
@@ -575,6 +628,15 @@ class TestCoursewareSearchIndexer(MixedWithOptionsTestCase):
     def test_time_based_index(self, store_type):
         self._perform_test_using_store(store_type, self._test_time_based_index)
 
+    @patch.dict('django.conf.settings.FEATURES', {'ENABLE_INCREMENTAL_COURSEWARE_INDEX': True})
+    def test_incremental_index(self):
+        self._perform_test_using_store(ModuleStoreEnum.Type.split, self._test_incremental_index)
+
+    @patch.dict('django.conf.settings.FEATURES', {'ENABLE_INCREMENTAL_COURSEWARE_INDEX': True})
+    def test_incremental_index_not_versioned(self):
+        # Courses in the old mongo modulestore are still indexed based on time
+        self._perform_test_using_store(ModuleStoreEnum.Type.mongo, self._test_time_based_index)
+
     @ddt.data(*WORKS_WITH_STORES)
     def test_exception(self, store_type):
         self._perform_test_using_store(store_type, self._test_exception)
@@ -5,6 +5,7 @@ Unit tests for course import and export Celery tasks
 
 import copy
 import json
+import tarfile
 from uuid import uuid4
 
 import mock
@@ -52,8 +53,14 @@ class ExportCourseTestCase(CourseTestCase):
         self.assertEqual(len(artifacts), 1)
         output = artifacts[0]
         self.assertEqual(output.name, 'Output')
-
-    @mock.patch('contentstore.tasks.export_course_to_xml', side_effect=side_effect_exception)
+        output.file.open('rb')
+        with tarfile.open(fileobj=output.file, mode='r:gz') as tar_file:
+            names = tar_file.getnames()
+        course_dir = self.course.location.block_id
+        self.assertIn(course_dir + '/course.xml', names)
+        self.assertIn(course_dir + '/policies/assets.json', names)
+
+    @mock.patch('contentstore.tasks.export_course_to_tarball', side_effect=side_effect_exception)
     def test_exception(self, mock_export):  # pylint: disable=unused-argument
         """
         The export task should fail gracefully if an exception is thrown
@@ -144,6 +144,16 @@ BLOCK_STRUCTURES_SETTINGS = dict(
 
     # Backend storage options
     PRUNING_ACTIVE=False,
+
+    # Maximum total size, in bytes, of block structures to keep decoded in
+    # each process, in front of the cache and storage, as accounted by their
+    # serialized size.  Only used when storage backing is enabled.  0
+    # disables the process cache.
+    PROCESS_CACHE_MAX_SIZE_IN_BYTES=0,
+
+    # Compression codec of the zpickle serializer: 'zlib', 'lz4' or 'zstd'.
+    # See openedx.core.lib.compression.
+    CODEC='zlib',
 )
 
 ############################ FEATURE CONFIGURATION #############################
@@ -254,6 +264,10 @@ FEATURES = {
     # Enable content libraries search functionality
     'ENABLE_LIBRARY_INDEX': False,
 
+    # When the courseware is reindexed after a publish, only index the blocks that
+    # changed since the course version indexed last (split modulestore only)
+    'ENABLE_INCREMENTAL_COURSEWARE_INDEX': False,
+
     # Enable course reruns, which will always use the split modulestore
     'ALLOW_COURSE_RERUNS': True,
 
@@ -832,6 +846,17 @@ CODE_JAIL = {
         # Needs to be non-zero so that jailed code can use it as their temp directory.(1MiB in bytes)
         'FSIZE': 1048576,
     },
+
+    # Warm sandbox workers, see capa/safe_exec/sandbox_pool.py.
+    'pool': {
+        # Number of workers to keep in each process.  0 disables the pool.
+        'size': 0,
+        # Replace workers after this many executions.
+        'max_executions': 100,
+        # Replace workers once their resident set size exceeds this many
+        # bytes.  0 disables the check.
+        'max_memory': 0,
+    },
 }
 
 # Some courses are allowed to run unsafe code. This is a list of regexes, one
@@ -1825,6 +1850,30 @@ CACHES = {
     },
 }
 
+# Maximum total size, in bytes, of decoded split modulestore course structures
+# to keep in each process, in front of the course_structure_cache.  0 disables
+# the process cache.
+COURSE_STRUCTURE_PROCESS_CACHE_MAX_SIZE_IN_BYTES = 0
+
+# Compression codec of the course structures in the course_structure_cache:
+# 'zlib', 'lz4' or 'zstd'.  See openedx.core.lib.compression.  A dictionary
+# trained on course structures, written by the benchmark_compression perf
+# script, can be given for use with 'zstd'.
+COURSE_STRUCTURE_CACHE_CODEC = 'zlib'
+COURSE_STRUCTURE_CACHE_COMPRESSION_DICTIONARY_PATH = None
+
+############### Settings for user-state-client ##################
+# Compact storage of courseware StudentModule state and its history.
+COMPACT_STUDENT_MODULE_STATE = dict(
+    # States and history entries at least this many characters long are
+    # stored compressed.  None disables compression.
+    COMPRESSION_MIN_LENGTH=None,
+
+    # Whether new history entries are stored as deltas against the
+    # latest full history entry of the StudentModule, when smaller.
+    HISTORY_DELTAS=False,
+)
+
 ############################ OAUTH2 Provider ###################################
 
 
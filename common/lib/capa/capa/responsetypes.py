@@ -24,6 +24,7 @@ import re
 import sys
 import textwrap
 import traceback
+import warnings
 from cmath import isnan
 from collections import namedtuple
 from datetime import datetime
@@ -53,10 +54,13 @@ from openedx.core.lib.grade_utils import round_away_from_zero
 from . import correctmap
 from .registry import TagRegistry
 from .util import (
+    compare_arrays_with_tolerance,
     compare_with_tolerance,
     contextualize_text,
     convert_files_to_filenames,
     default_tolerance,
+    evaluate_constant,
+    evaluate_expression,
     find_with_default,
     get_inner_html_from_xpath,
     is_list_of_files
@@ -1568,7 +1572,7 @@ class NumericalResponse(LoncapaResponse):
             # `ValueError`. Then test if instead it is a math expression.
             # `complex` seems to only generate `ValueErrors`, only catch these.
             try:
-                correct_ans = evaluator({}, {}, answer)
+                correct_ans = evaluate_constant(answer)
             except Exception:
                 log.debug("Content error--answer '%s' is not a valid number", answer)
                 _ = edx_six.get_gettext(self.capa_system.i18n)
@@ -3025,10 +3029,28 @@ class ExternalResponse(LoncapaResponse):
 
 #-----------------------------------------------------------------------------
 
+class _SampleArray(numpy.ndarray):
+    """
+    Array of the values of a variable at all of the sample points of a
+    FormulaResponse.  The calc evaluator only keeps the operands that are
+    numbers.Number instances when it reduces some of its expressions, so
+    the arrays it is given must pass for numbers.
+    """
+    pass
+
+
+numbers.Number.register(_SampleArray)
+
+
 @registry.register
 class FormulaResponse(LoncapaResponse):
     """
     Checking of symbolic math response using numerical sampling.
+
+    When vectorize_samples is set, each expression is evaluated once for
+    all of the sample points, with arrays of the values of the variables,
+    and its results are compared to the expected ones at once.  Expressions
+    that can't be evaluated this way are evaluated once per sample point.
     """
 
     human_name = _('Math Expression Input')
@@ -3038,6 +3060,7 @@ class FormulaResponse(LoncapaResponse):
     required_attributes = ['answer', 'samples']
     max_inputfields = 1
     multi_device_support = True
+    vectorize_samples = True
 
     def __init__(self, *args, **kwargs):
         self.correct_answer = ''
@@ -3095,7 +3118,7 @@ class FormulaResponse(LoncapaResponse):
         out = []
         for var_dict in var_dict_list:
             try:
-                out.append(evaluator(
+                out.append(evaluate_expression(
                     var_dict,
                     dict(),
                     answer,
@@ -3151,6 +3174,53 @@ class FormulaResponse(LoncapaResponse):
                 )
         return out
 
+    def evaluate_samples(self, answer, var_dict_list):
+        """
+        Takes in an answer and a list of dictionaries mapping variables to values,
+        as tupleize_answers does, and returns an array of the formula evaluation
+        results.
+        """
+        if self.vectorize_samples:
+            results = self._evaluate_samples_vectorized(answer, var_dict_list)
+            if results is not None:
+                return results
+        return numpy.array(self.tupleize_answers(answer, var_dict_list))
+
+    def _evaluate_samples_vectorized(self, answer, var_dict_list):
+        """
+        Returns an array of the results of the answer at all of the sample
+        points, evaluated at once, or None if the answer can't be evaluated
+        this way, in which case it must be evaluated once per sample point.
+        """
+        # The parallel operator compares its operands to zero, which is
+        # ambiguous for arrays.
+        if len(var_dict_list) < 2 or '||' in answer:
+            return None
+
+        variables = {
+            var: numpy.array([var_dict[var] for var_dict in var_dict_list]).view(_SampleArray)
+            for var in var_dict_list[0]
+        }
+        try:
+            # Errors, such as divisions by zero, which raise exceptions for
+            # single values, result in non finite values instead.
+            with numpy.errstate(all='ignore'), warnings.catch_warnings():
+                warnings.simplefilter('ignore')
+                results = evaluate_expression(variables, dict(), answer, case_sensitive=self.case_sensitive)
+            results = numpy.array(numpy.broadcast_to(results, (len(var_dict_list),)))
+        except Exception:  # pylint: disable=broad-except
+            return None
+        if results.dtype.kind not in 'iufc' or not numpy.all(numpy.isfinite(results)):
+            return None
+
+        # Functions that don't handle arrays may have been reduced to
+        # values that are not arrays, so the results are checked against
+        # the scalar evaluation of the first and last sample points.
+        expected_results = self.tupleize_answers(answer, [var_dict_list[0], var_dict_list[-1]])
+        if not numpy.allclose(results[[0, -1]], expected_results, rtol=1e-9, atol=1e-12):
+            return None
+        return results
+
     def randomize_variables(self, samples):
         """
         Returns a list of dictionaries mapping variables to random values in range,
@@ -3179,11 +3249,10 @@ class FormulaResponse(LoncapaResponse):
         "correct" or "incorrect".
         """
         var_dict_list = self.randomize_variables(samples)
-        student_result = self.tupleize_answers(given, var_dict_list)
-        instructor_result = self.tupleize_answers(expected, var_dict_list)
+        student_result = self.evaluate_samples(given, var_dict_list)
+        instructor_result = self.evaluate_samples(expected, var_dict_list)
 
-        correct = all(compare_with_tolerance(student, instructor, self.tolerance)
-                      for student, instructor in zip(student_result, instructor_result))
+        correct = compare_arrays_with_tolerance(student_result, instructor_result, self.tolerance).all()
         if correct:
             return "correct"
         else:
@@ -1,3 +1,9 @@
 """Capa's specialized use of codejail.safe_exec."""
 
-from .safe_exec import safe_exec, update_hash
+from .safe_exec import (
+    SafeExecResultCache,
+    clear_result_cache_stats,
+    result_cache_stats,
+    safe_exec,
+    update_hash
+)
@@ -0,0 +1,71 @@
+#!/usr/bin/env python
+"""
+Compares the latency of running problem code with codejail, which starts
+a new sandbox for each execution, and with a warm SandboxPool.
+
+Runs with the given sandbox python and user, as configured in
+settings.CODE_JAIL, and reports the median and worst times of each.
+"""
+
+
+import timeit
+
+from codejail import jail_code
+from codejail.safe_exec import safe_exec as codejail_safe_exec
+
+from capa.safe_exec.safe_exec import CODE_PROLOG, LAZY_IMPORTS
+from capa.safe_exec.sandbox_pool import SandboxPool
+
+try:
+    import click
+except ImportError:
+    click = None
+
+# Typical script code of a randomized numerical problem.
+PROBLEM_CODE = """\
+a = random.randint(1, 10)
+b = numpy.array([a, 2 * a, 3 * a])
+expected = float(numpy.linalg.norm(b))
+"""
+
+
+def benchmark(exec_fn, repeat):
+    """
+    Returns the sorted seconds taken by each of `repeat` executions of the
+    problem code with the given function.
+    """
+    code = CODE_PROLOG % 1 + LAZY_IMPORTS + PROBLEM_CODE
+    return sorted(timeit.repeat(lambda: exec_fn(code, {}), repeat=repeat, number=1))
+
+
+if click is not None:
+    # pylint: disable=bad-continuation
+    @click.command()
+    @click.option('--python_bin', required=True, help='Python executable of the sandbox.')
+    @click.option('--user', default=None, help='User to run the sandbox as.')
+    @click.option('--repeat', default=20, help='Number of executions of each kind.')
+    def cli(python_bin, user, repeat):
+        """
+        Main.
+        """
+        jail_code.configure('python', python_bin, user=user)
+        command = (['sudo', '-u', user] if user else []) + jail_code.COMMANDS['python']['cmdline_start']
+        pool = SandboxPool(command, size=1)
+        try:
+            # Wait for the worker to import its modules.
+            benchmark(pool.safe_exec, 1)
+            for name, exec_fn in (('cold', codejail_safe_exec), ('warm', pool.safe_exec)):
+                times = benchmark(exec_fn, repeat)
+                click.echo(u'{name}\tmedian: {median_ms:.1f} ms\tmax: {max_ms:.1f} ms'.format(
+                    name=name,
+                    median_ms=times[len(times) // 2] * 1000,
+                    max_ms=times[-1] * 1000,
+                ))
+        finally:
+            pool.close()
+
+if __name__ == '__main__':
+    if click is not None:
+        cli()  # pylint: disable=no-value-for-parameter
+    else:
+        print("Aborted! Module 'click' is not installed.")
@@ -2,14 +2,28 @@
 
 
 import hashlib
+import json
+import logging
+import time
+import tokenize
 
 from codejail.safe_exec import SafeExecException, json_safe
 from codejail.safe_exec import not_safe_exec as codejail_not_safe_exec
 from codejail.safe_exec import safe_exec as codejail_safe_exec
+from edx_django_utils.monitoring import set_custom_metric
 import six
 from six import text_type
 
-from . import lazymod
+try:
+    import newrelic.agent
+except ImportError:
+    newrelic = None  # pylint: disable=invalid-name
+
+from openedx.core.lib.cache_utils import ByteSizeLRUCache, zpickle, zunpickle
+
+from . import lazymod, sandbox_pool
+
+log = logging.getLogger(__name__)
 
 # Establish the Python environment for Capa.
 # Capa assumes float-friendly division always.
@@ -79,6 +93,174 @@ def update_hash(hasher, obj):
         hasher.update(six.b(repr(obj)))
 
 
+# Globals that differ between learners without changing the result of code
+# that doesn't refer to them.  They are left out of the cache key of such
+# code, and out of its cached results.
+VOLATILE_GLOBALS = ('anonymous_student_id',)
+
+# Names through which code can read globals without naming them.  Code that
+# uses any of them is assumed to refer to all VOLATILE_GLOBALS.
+INDIRECT_GLOBALS_NAMES = frozenset((
+    'globals', 'locals', 'vars', 'eval', 'exec', 'execfile', 'compile', 'getattr', '__import__', '__builtins__',
+    'sys', 'inspect',
+))
+
+# Results at least this many bytes long, as JSON, are stored compressed.
+COMPRESSION_MIN_SIZE = 4096
+
+# Results larger than this many bytes, once compressed, are not cached, as
+# they would exceed the item size limit of memcached.
+MAX_RESULT_SIZE = 1000 * 1000
+
+# Size of the process-wide tier of SafeExecResultCaches created with
+# local=True.
+LOCAL_CACHE_SIZE = 16 * 1024 * 1024
+
+_local_results = ByteSizeLRUCache(LOCAL_CACHE_SIZE)
+
+
+class SafeExecResultCache(object):
+    """
+    Cache of the results of safe_exec, stored in a backend cache.
+
+    `backend` is an object with .get(key) and .set(key, value) methods.
+    Results are stored in it as (emsg, cleaned_results) pairs, with the
+    results of COMPRESSION_MIN_SIZE bytes or more zpickled.
+
+    If `local` is true, results are also kept zpickled in a process-wide
+    LRU cache, bounded by the total size of the stored results, which is
+    checked before the backend.  Since they are unpickled on each hit,
+    callers can't modify the results held by the cache.
+    """
+
+    def __init__(self, backend, local=False):
+        self.backend = backend
+        self.local = local
+
+    def get(self, key):
+        """
+        Returns the (emsg, cleaned_results) pair cached for the given key,
+        or None.
+        """
+        value = _local_results.get(key) if self.local else None
+        if value is None:
+            value = self.backend.get(key)
+            if value is None:
+                return None
+            if self.local:
+                self._set_local(key, value)
+        emsg, results = value
+        if isinstance(results, bytes):
+            try:
+                results = zunpickle(results)
+            except Exception:  # pylint: disable=broad-except
+                log.exception(u'Could not read cached safe_exec results for %s', key)
+                return None
+        return emsg, results
+
+    def set(self, key, value):
+        """
+        Caches the given (emsg, cleaned_results) pair for the given key.
+        """
+        emsg, results = value
+        if len(json.dumps(results)) >= COMPRESSION_MIN_SIZE:
+            results = zpickle(results)
+            if len(results) > MAX_RESULT_SIZE:
+                return
+        value = (emsg, results)
+        self.backend.set(key, value)
+        if self.local:
+            self._set_local(key, value)
+
+    def _set_local(self, key, value):
+        """
+        Caches the given stored (emsg, results) pair in the process-wide tier.
+        """
+        emsg, results = value
+        if not isinstance(results, bytes):
+            results = zpickle(results)
+        _local_results.set(key, (emsg, results), size_in_bytes=len(results))
+
+
+def cache_key(code, globals_dict, random_seed=None, python_path=None, extra_files=None):
+    """
+    Returns the key under which the results of running the given code with
+    the given globals are cached.
+
+    The key is a digest of everything that determines the results: the
+    code, the seed, the python path, the contents of the extra files, and
+    the canonicalized values of the globals, leaving out VOLATILE_GLOBALS
+    that the code doesn't refer to.
+    """
+    hasher = hashlib.sha256()
+    hasher.update(repr(code).encode('utf-8'))
+    update_hash(hasher, [random_seed, python_path])
+    for filename, contents in extra_files or ():
+        update_hash(hasher, filename)
+        hasher.update(contents if isinstance(contents, bytes) else contents.encode('utf-8'))
+    update_hash(hasher, _cacheable_globals(code, json_safe(globals_dict)))
+    return "safe_exec.%s" % hasher.hexdigest()
+
+
+def _cacheable_globals(code, safe_globals):
+    """
+    Returns the given JSON-safe globals without the VOLATILE_GLOBALS that
+    the given code doesn't refer to.  This is conservative: the globals are
+    kept if the code names them anywhere outside of strings and comments,
+    if it uses any of INDIRECT_GLOBALS_NAMES, or if it can't be tokenized.
+    """
+    names = _referenced_names(code)
+    keep_volatile = names is None or not names.isdisjoint(INDIRECT_GLOBALS_NAMES)
+    return {
+        name: value
+        for name, value in six.iteritems(safe_globals)
+        if name not in VOLATILE_GLOBALS or keep_volatile or name in names
+    }
+
+
+def _referenced_names(code):
+    """
+    Returns the set of the names in the given code, or None if it can't be
+    tokenized.
+    """
+    names = set()
+    try:
+        for token in tokenize.generate_tokens(six.StringIO(code).readline):
+            if token[0] == tokenize.NAME:
+                names.add(token[1])
+    except (tokenize.TokenError, SyntaxError):
+        return None
+    return names
+
+
+def _record(outcome, seconds, slug):
+    """
+    Records a result cache hit or miss of safe_exec, and the seconds it took,
+    as custom metrics, and attaches the outcome and the slug of the code to
+    the current transaction.
+    """
+    set_custom_metric('safe_exec_slug', slug)
+    set_custom_metric('safe_exec_cache', outcome)
+    if newrelic:
+        newrelic.agent.record_custom_metric(u'Custom/safe_exec/cache_{}'.format(outcome), 1)
+        newrelic.agent.record_custom_metric(u'Custom/safe_exec/cache_{}_seconds'.format(outcome), seconds)
+
+
+def result_cache_stats():
+    """
+    Returns the hit, miss and eviction counts and the size of the
+    process-wide tier of the result cache.
+    """
+    return _local_results.stats()
+
+
+def clear_result_cache_stats():
+    """
+    Empties the process-wide tier of the result cache, and resets its counters.
+    """
+    _local_results.clear()
+
+
 def safe_exec(
     code,
     globals_dict,
@@ -105,9 +287,10 @@ def safe_exec(
     `extra_files` is a list of (filename, contents) pairs.  These files are
     created in the sandbox.
 
-    `cache` is an object with .get(key) and .set(key, value) methods.  It will be used
-    to cache the execution, taking into account the code, the values of the globals,
-    and the random seed.
+    `cache` is an object with .get(key) and .set(key, value) methods, or a
+    SafeExecResultCache.  It will be used to cache the execution, taking into
+    account the code, the values of the globals, the random seed, and the
+    python path and extra files (see cache_key).
 
     `slug` is an arbitrary string, a description that's meaningful to the
     caller, that will be used in log messages.
@@ -117,13 +300,13 @@ def safe_exec(
     """
     # Check the cache for a previous result.
     if cache:
-        safe_globals = json_safe(globals_dict)
-        md5er = hashlib.md5()
-        md5er.update(repr(code).encode('utf-8'))
-        update_hash(md5er, safe_globals)
-        key = "safe_exec.%r.%s" % (random_seed, md5er.hexdigest())
+        start_time = time.time()
+        if not isinstance(cache, SafeExecResultCache):
+            cache = SafeExecResultCache(cache)
+        key = cache_key(code, globals_dict, random_seed, python_path, extra_files)
         cached = cache.get(key)
         if cached is not None:
+            _record('hit', time.time() - start_time, slug)
             # We have a cached result.  The result is a pair: the exception
             # message, if any, else None; and the resulting globals dictionary.
             emsg, cleaned_results = cached
@@ -140,6 +323,9 @@ def safe_exec(
         exec_fn = codejail_not_safe_exec
     else:
         exec_fn = codejail_safe_exec
+        pool = sandbox_pool.get_pool()
+        if pool is not None:
+            exec_fn = pool.safe_exec
 
     # Run the code!  Results are side effects in globals_dict.
     try:
@@ -157,8 +343,9 @@ def safe_exec(
     # Put the result back in the cache.  This is complicated by the fact that
     # the globals dict might not be entirely serializable.
     if cache:
-        cleaned_results = json_safe(globals_dict)
+        cleaned_results = _cacheable_globals(code, json_safe(globals_dict))
         cache.set(key, (emsg, cleaned_results))
+        _record('miss', time.time() - start_time, slug)
 
     # If an exception happened, raise it now.
     if emsg:
@@ -0,0 +1,341 @@
+"""
+A pool of warm sandbox workers for safe_exec.
+
+codejail starts a new sandboxed python for each execution, which then
+imports the modules that the code uses, such as numpy and scipy, again.
+A SandboxPool instead keeps sandbox workers running, started the same way
+as codejail starts the sandboxed python, as the same user, that have
+imported those modules once.  Each execution is run in a child process
+forked from a worker, with codejail's limits, and never affects the
+worker or later executions (see sandbox_worker.py).
+
+The NPROC limit counts all the processes of the sandbox user, which
+include the idle workers of every process using a pool, and the worker
+that forks the execution.  So that executions can start as many processes
+as they could with codejail, extra_nproc is added to the NPROC limit.  It
+should be the total size of the pools on the host, plus one.
+
+Workers are replaced after max_executions executions, or once their
+resident set size exceeds max_memory bytes.
+
+The pool is enabled with the "pool" options of settings.CODE_JAIL, and is
+only used when codejail is configured to run python in a sandbox:
+
+    CODE_JAIL = {
+        'pool': {
+            # Number of warm workers in each process.  0 disables the pool.
+            'size': 2,
+            'max_executions': 100,
+            'max_memory': 512 * 1024 * 1024,
+            # Added to the NPROC limit.  Defaults to size + 1, which only
+            # allows for the workers of one process.
+            'extra_nproc': 2 * 8 + 1,
+        },
+    }
+"""
+
+
+import json
+import logging
+import os
+import select
+import shutil
+import subprocess
+import tempfile
+import threading
+
+from codejail import jail_code
+from codejail.safe_exec import SafeExecException, json_safe
+from codejail.safe_exec import safe_exec as codejail_safe_exec
+
+from . import sandbox_worker
+
+log = logging.getLogger(__name__)
+
+# Modules imported by the workers, which are those of ASSUMED_IMPORTS and
+# the modules imported by the code prolog of safe_exec.
+PRELOAD_MODULES = (
+    'random2', 'six', 'numpy', 'math', 'scipy', 'calc', 'eia',
+    'chem.chemcalc', 'chem.chemtools', 'chem.miller', 'verifiers.draganddrop',
+)
+
+# Seconds to wait for a new worker to import its modules.
+STARTUP_TIMEOUT = 30
+
+# Seconds after which a worker kills a job if the REALTIME limit is not set,
+# so that it never waits for a job forever.
+MAX_REALTIME = 60
+
+# Seconds to wait for a worker to respond after it should have killed the
+# job.
+RESPONSE_TIMEOUT = 5
+
+# We'll need the code of the worker to run it in the sandbox, so read it now.
+worker_py_file = sandbox_worker.__file__
+if worker_py_file.endswith("c"):
+    worker_py_file = worker_py_file[:-1]
+
+with open(worker_py_file) as f:
+    WORKER_PY = f.read()
+
+
+class WorkerError(Exception):
+    """
+    Raised when a worker fails, rather than the code it runs.
+    """
+    pass
+
+
+class SandboxWorker(object):
+    """
+    A sandbox worker process.
+    """
+
+    def __init__(self, command, preload=PRELOAD_MODULES):
+        with open(os.devnull, 'wb') as devnull:
+            self.process = subprocess.Popen(
+                command + ['-c', WORKER_PY] + list(preload),
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=devnull,
+                close_fds=True,
+            )
+        self.ready = False
+        self.executions = 0
+        self.maxrss = 0
+
+    def _read_line(self, timeout):
+        """
+        Returns the next line written by the worker, waiting for at most the
+        given number of seconds.
+        """
+        if not select.select([self.process.stdout], [], [], timeout)[0]:
+            raise WorkerError(u'Sandbox worker did not respond in {} seconds'.format(timeout))
+        line = self.process.stdout.readline()
+        if not line:
+            raise WorkerError(u'Sandbox worker exited with status {}'.format(self.process.wait()))
+        return line
+
+    def run(self, job_dir, limits):
+        """
+        Runs the job in the given directory with the given limits, and
+        returns the worker's response (see sandbox_worker.py).  The job is
+        killed after the REALTIME limit, or MAX_REALTIME if it is not set.
+        """
+        if not self.ready:
+            self._read_line(STARTUP_TIMEOUT)
+            self.ready = True
+        self.executions += 1
+        timeout = limits.get('REALTIME') or MAX_REALTIME
+        job = {'dir': job_dir, 'limits': limits, 'timeout': timeout}
+        try:
+            self.process.stdin.write(json.dumps(job).encode('utf-8') + b'\n')
+            self.process.stdin.flush()
+        except (IOError, OSError) as error:
+            raise WorkerError(u'Could not send job to sandbox worker: {}'.format(error))
+        response = json.loads(self._read_line(timeout + RESPONSE_TIMEOUT))
+        if 'error' in response:
+            raise WorkerError(response['error'])
+        self.maxrss = response['maxrss']
+        return response
+
+    def stop(self):
+        """
+        Stops the worker.
+        """
+        try:
+            self.process.stdin.close()
+        except (IOError, OSError):
+            pass
+        if self.process.poll() is None:
+            try:
+                self.process.kill()
+            except OSError:
+                # The worker runs as the sandbox user, so it can only be
+                # stopped by closing its stdin.
+                pass
+        try:
+            self.process.stdout.close()
+        except (IOError, OSError):
+            pass
+        # Reap the worker without waiting for it to exit.
+        reaper = threading.Thread(target=self.process.wait)
+        reaper.daemon = True
+        reaper.start()
+
+
+class SandboxPool(object):
+    """
+    A pool of warm sandbox workers, started with the given command.
+
+    Up to `size` workers are kept idle.  Executions that find no idle
+    worker start a new one, which is stopped afterwards if the pool is
+    full, so concurrent executions never wait for one another.
+
+    `extra_nproc` is added to the NPROC limit of executions, if it is set,
+    to allow for the workers of the sandbox user.  It defaults to size + 1.
+    """
+
+    def __init__(self, command, size, max_executions=100, max_memory=0, preload=PRELOAD_MODULES, extra_nproc=None):
+        self.command = list(command)
+        self.size = size
+        self.extra_nproc = size + 1 if extra_nproc is None else extra_nproc
+        self.max_executions = max_executions
+        self.max_memory = max_memory
+        self.preload = preload
+        self.pid = os.getpid()
+        self._lock = threading.Lock()
+        self._idle = [self._start_worker() for _ in range(size)]
+
+    def _start_worker(self):
+        return SandboxWorker(self.command, self.preload)
+
+    def _acquire(self):
+        """
+        Returns an idle worker, or a new one.
+        """
+        with self._lock:
+            if self._idle:
+                return self._idle.pop()
+        return self._start_worker()
+
+    def _release(self, worker):
+        """
+        Returns the given worker to the pool, or replaces it with a new one
+        if it is due to be recycled.
+        """
+        recycle = (
+            worker.process.poll() is not None or
+            (self.max_executions and worker.executions >= self.max_executions) or
+            (self.max_memory and worker.maxrss > self.max_memory)
+        )
+        if recycle:
+            worker.stop()
+            worker = self._start_worker()
+        with self._lock:
+            if len(self._idle) < self.size:
+                self._idle.append(worker)
+                return
+        worker.stop()
+
+    def close(self):
+        """
+        Stops all idle workers.
+        """
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for worker in idle:
+            worker.stop()
+
+    def safe_exec(self, code, globals_dict, python_path=None, extra_files=None, slug=None):
+        """
+        Executes the given code in a sandbox worker, in the same way as
+        codejail.safe_exec.safe_exec, with which it is run instead if the
+        worker fails.
+        """
+        limits = dict(jail_code.LIMITS)
+        if limits.get('NPROC'):
+            limits['NPROC'] += self.extra_nproc
+        job_dir = _make_job_dir(code, globals_dict, python_path, extra_files)
+        try:
+            worker = self._acquire()
+            try:
+                response = worker.run(job_dir, limits)
+            except WorkerError:
+                worker.stop()
+                raise
+            self._release(worker)
+        except WorkerError:
+            log.exception(u'Sandbox worker failed to run %s, running it with codejail', slug)
+            codejail_safe_exec(code, globals_dict, python_path=python_path, extra_files=extra_files, slug=slug)
+            return
+        finally:
+            shutil.rmtree(job_dir, ignore_errors=True)
+
+        result = response['result']
+        if result is None or result['emsg']:
+            stdout, stderr = (result['stdout'], result['emsg']) if result else (u'', u'')
+            status = response['status'] or 1
+            if response['timed_out']:
+                stderr = u'Jailed code exceeded the REALTIME limit'
+            raise SafeExecException(
+                u"Couldn't execute jailed code: stdout: {!r}, stderr: {!r} with status code: {}".format(
+                    stdout, stderr, status,
+                )
+            )
+        globals_dict.update(result['globals'])
+
+
+def _make_job_dir(code, globals_dict, python_path, extra_files):
+    """
+    Returns a new directory containing the given job for a sandbox worker,
+    readable by the sandbox user, with a "tmp" directory it can write to.
+    Files named in python_path that are not in extra_files are copied from
+    the filesystem, as codejail does.
+    """
+    job_dir = tempfile.mkdtemp(prefix='codejail-')
+    try:
+        os.chmod(job_dir, 0o755)
+        tmp_dir = os.path.join(job_dir, 'tmp')
+        os.mkdir(tmp_dir)
+        os.chmod(tmp_dir, 0o777)
+
+        extra_names = set()
+        for filename, contents in extra_files or ():
+            extra_names.add(filename)
+            with open(os.path.join(job_dir, filename), 'wb') as extra_file:
+                extra_file.write(contents)
+        for filename in python_path or ():
+            if filename not in extra_names:
+                destination = os.path.join(job_dir, os.path.basename(filename))
+                if os.path.isdir(filename):
+                    shutil.copytree(filename, destination)
+                else:
+                    shutil.copy(filename, destination)
+
+        job = {
+            'code': code,
+            'globals': json_safe(globals_dict),
+            'python_path': [os.path.basename(filename) for filename in python_path or ()],
+        }
+        with open(os.path.join(job_dir, sandbox_worker.JOB_FILENAME), 'w') as job_file:
+            json.dump(job, job_file)
+    except Exception:
+        shutil.rmtree(job_dir, ignore_errors=True)
+        raise
+    return job_dir
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """
+    Returns the SandboxPool of this process, or None if the pool is not
+    enabled, or codejail is not configured to run python in a sandbox.
+    """
+    global _pool  # pylint: disable=global-statement
+    if not jail_code.is_configured('python'):
+        return None
+    from django.conf import settings
+    options = getattr(settings, 'CODE_JAIL', {}).get('pool') or {}
+    if not options.get('size'):
+        return None
+
+    with _pool_lock:
+        # Workers started before the process forked belong to its parent.
+        if _pool is None or _pool.pid != os.getpid():
+            command = []
+            user = jail_code.COMMANDS['python']['user']
+            if user:
+                command.extend(['sudo', '-u', user])
+            command.extend(jail_code.COMMANDS['python']['cmdline_start'])
+            _pool = SandboxPool(
+                command,
+                size=options['size'],
+                max_executions=options.get('max_executions', 100),
+                max_memory=options.get('max_memory', 0),
+                extra_nproc=options.get('extra_nproc'),
+            )
+        return _pool
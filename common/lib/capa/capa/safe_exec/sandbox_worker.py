@@ -0,0 +1,215 @@
+"""
+A warm sandbox worker, run by SandboxPool (see sandbox_pool.py).
+
+This file is not imported: its source is run with "-c" by the sandbox
+python, as the sandbox user, exactly as codejail runs jailed code.  The
+worker imports the given modules once, then runs one job per line read
+from stdin, writing one response line to stdout for each.
+
+Each job is run in a child forked from the worker, which never runs any
+jailed code itself, so each job starts from the same state as a freshly
+started sandbox that imported the modules: nothing a job does is seen by
+later jobs.  The pool writes the job to job.json in the job directory:
+the code to run, its globals, and the python path.  The child writes its
+result to a pipe that only the worker reads: the resulting globals, the
+formatted exception raised by the code, if any, and its output.  The
+result is never written to the job directory, where other jobs, which
+run as the same user, could write.
+
+A job line is a JSON object with the job directory, the limits to apply
+to the child, as in codejail.jail_code.LIMITS, and the seconds after which
+the child is killed, which are always set, so that the worker never waits
+for a job forever.  The response is a JSON object with the exit status of
+the child, negated signal number if it was killed, whether it was killed
+for running too long, the result of the child, or null if it was killed
+before writing it, and the maximum resident set size of the worker.
+
+This must run on both python 2 and 3.
+"""
+
+
+import json
+import os
+import random
+import resource
+import select
+import shutil
+import signal
+import sys
+import time
+import traceback
+
+try:
+    from StringIO import StringIO
+except ImportError:
+    from io import StringIO
+
+JOB_FILENAME = 'job.json'
+
+RESOURCE_LIMITS = {
+    'CPU': resource.RLIMIT_CPU,
+    'VMEM': resource.RLIMIT_AS,
+    'FSIZE': resource.RLIMIT_FSIZE,
+    'NPROC': resource.RLIMIT_NPROC,
+}
+
+
+def preload(module_names):
+    """
+    Imports the given modules, ignoring those that can't be imported.
+    """
+    for module_name in module_names:
+        try:
+            __import__(module_name)
+        except Exception:  # pylint: disable=broad-except
+            pass
+
+
+def jsonable(value):
+    """
+    Returns whether the given value can be returned as JSON.
+    """
+    try:
+        json.dumps(value)
+    except Exception:  # pylint: disable=broad-except
+        return False
+    return True
+
+
+def run_child(job_dir, limits, keep_fd):
+    """
+    Runs the job in the given directory, in the forked child, and writes its
+    result to the given file descriptor.  Never returns.
+    """
+    try:
+        # Detach from the worker's files, and start a process group that can
+        # be killed as a whole.
+        os.setsid()
+        devnull = os.open(os.devnull, os.O_RDWR)
+        os.dup2(devnull, 0)
+        os.dup2(devnull, 1)
+        os.dup2(devnull, 2)
+        os.closerange(3, keep_fd)
+        os.closerange(keep_fd + 1, 1024)
+
+        os.chdir(job_dir)
+        tmp_dir = os.path.join(job_dir, 'tmp')
+        os.environ['TMPDIR'] = tmp_dir
+        if 'tempfile' in sys.modules:
+            sys.modules['tempfile'].tempdir = None
+        with open(JOB_FILENAME) as job_file:
+            job = json.load(job_file)
+
+        # Don't share the random state of the worker between jobs.
+        random.seed()
+        if 'numpy' in sys.modules:
+            sys.modules['numpy'].random.seed()
+
+        for name, value in limits.items():
+            if name in RESOURCE_LIMITS and value:
+                resource.setrlimit(RESOURCE_LIMITS[name], (value, value))
+
+        sys.path.extend(job['python_path'])
+        stdout = sys.stdout = StringIO()
+        globals_dict = job['globals']
+        emsg = None
+        try:
+            exec(compile(job['code'], 'jailed_code', 'exec'), globals_dict)  # pylint: disable=exec-used
+        except BaseException:  # pylint: disable=broad-except
+            emsg = traceback.format_exc()
+        sys.stdout = sys.__stdout__
+
+        result = {
+            'globals': dict(
+                (name, value)
+                for name, value in globals_dict.items()
+                if name != '__builtins__' and jsonable(value)
+            ),
+            'emsg': emsg,
+            'stdout': stdout.getvalue(),
+        }
+        data = json.dumps(result).encode('utf-8')
+        while data:
+            data = data[os.write(keep_fd, data):]
+    finally:
+        os._exit(0)  # pylint: disable=protected-access
+
+
+def run_job(job_dir, limits, timeout):
+    """
+    Runs the job in the given directory in a forked child, killed after the
+    given number of seconds, and returns the response to the job.
+    """
+    result_read_fd, result_write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        os.close(result_read_fd)
+        run_child(job_dir, limits, result_write_fd)
+    os.close(result_write_fd)
+
+    # The pipe is closed once the child and any processes it started exit.
+    timed_out = False
+    deadline = time.time() + timeout
+    chunks = []
+    while True:
+        if not select.select([result_read_fd], [], [], max(deadline - time.time(), 0))[0]:
+            timed_out = True
+            break
+        chunk = os.read(result_read_fd, 65536)
+        if not chunk:
+            break
+        chunks.append(chunk)
+    os.close(result_read_fd)
+    try:
+        os.killpg(pid, signal.SIGKILL)
+    except OSError:
+        pass
+    _, status = os.waitpid(pid, 0)
+
+    # A result cut short by the child being killed is not valid JSON.
+    try:
+        result = json.loads(b''.join(chunks).decode('utf-8'))
+    except ValueError:
+        result = None
+
+    # Remove the files left by the job.
+    tmp_dir = os.path.join(job_dir, 'tmp')
+    for name in os.listdir(tmp_dir):
+        path = os.path.join(tmp_dir, name)
+        if os.path.isdir(path) and not os.path.islink(path):
+            shutil.rmtree(path, ignore_errors=True)
+        else:
+            os.remove(path)
+
+    return {
+        'status': -os.WTERMSIG(status) if os.WIFSIGNALED(status) else os.WEXITSTATUS(status),
+        'timed_out': timed_out,
+        'result': result,
+        'maxrss': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024,
+    }
+
+
+def main():
+    """
+    Runs jobs until stdin is closed.
+    """
+    out = sys.stdout
+    sys.stdout = sys.stderr
+    preload(sys.argv[1:])
+    out.write('ready\n')
+    out.flush()
+    while True:
+        line = sys.stdin.readline()
+        if not line:
+            break
+        job = json.loads(line)
+        try:
+            response = run_job(job['dir'], job['limits'], job['timeout'])
+        except Exception:  # pylint: disable=broad-except
+            response = {'error': traceback.format_exc()}
+        out.write(json.dumps(response) + '\n')
+        out.flush()
+
+
+if __name__ == '__main__':
+    main()
@@ -12,10 +12,17 @@ import pytest
 import six
 from codejail.jail_code import is_configured
 from codejail.safe_exec import SafeExecException
+from mock import patch
 from six import text_type, unichr
 from six.moves import range
 
-from capa.safe_exec import safe_exec, update_hash
+from capa.safe_exec import (
+    SafeExecResultCache,
+    clear_result_cache_stats,
+    result_cache_stats,
+    safe_exec,
+    update_hash
+)
 
 
 class TestSafeExec(unittest.TestCase):
@@ -170,6 +177,93 @@ class TestSafeExecCaching(unittest.TestCase):
         safe_exec(code, g, cache=DictCache(cache))
         self.assertEqual(g['a'], 17)
 
+    def test_cache_volatile_globals(self):
+        # Learners with different anonymous ids share results, unless the
+        # code uses them.
+        cache = {}
+        g = {'anonymous_student_id': 'learner_1', 'b': 2}
+        safe_exec("a = b * 2", g, cache=DictCache(cache))
+        self.assertEqual(list(cache.values())[0], (None, {'a': 4, 'b': 2}))
+
+        g = {'anonymous_student_id': 'learner_2', 'b': 2}
+        safe_exec("a = b * 2", g, cache=DictCache(cache))
+        self.assertEqual(len(cache), 1)
+        self.assertEqual(g, {'anonymous_student_id': 'learner_2', 'a': 4, 'b': 2})
+
+        safe_exec("a = anonymous_student_id", g, cache=DictCache(cache))
+        self.assertEqual(g['a'], 'learner_2')
+        g['anonymous_student_id'] = 'learner_1'
+        safe_exec("a = anonymous_student_id", g, cache=DictCache(cache))
+        self.assertEqual(g['a'], 'learner_1')
+        self.assertEqual(len(cache), 3)
+
+    def test_cache_compressed_results(self):
+        cache = {}
+        code = "a = 'x' * 10000"
+        safe_exec(code, {}, cache=DictCache(cache))
+        cache_exc_msg, cache_globals = list(cache.values())[0]
+        self.assertIsNone(cache_exc_msg)
+        self.assertIsInstance(cache_globals, bytes)
+        self.assertLess(len(cache_globals), 10000)
+
+        g = {}
+        safe_exec(code, g, cache=DictCache(cache))
+        self.assertEqual(g['a'], 'x' * 10000)
+
+    def test_cache_stats(self):
+        clear_result_cache_stats()
+        self.addCleanup(clear_result_cache_stats)
+        cache = SafeExecResultCache(DictCache({}), local=True)
+        for _ in range(3):
+            g = {}
+            safe_exec("a = 17", g, cache=cache, slug='problem_1')
+            self.assertEqual(g['a'], 17)
+
+        self.assertEqual(result_cache_stats()['hits'], 2)
+
+    def test_cache_metrics(self):
+        with patch('capa.safe_exec.safe_exec.newrelic') as mock_newrelic:
+            cache = DictCache({})
+            for _ in range(3):
+                safe_exec("a = 17", {}, cache=cache, slug='problem_1')
+        counts = [
+            metric_call[0][0] for metric_call in mock_newrelic.agent.record_custom_metric.call_args_list
+            if not metric_call[0][0].endswith('_seconds')
+        ]
+        self.assertEqual(counts.count('Custom/safe_exec/cache_hit'), 2)
+        self.assertEqual(counts.count('Custom/safe_exec/cache_miss'), 1)
+
+    def test_cache_transaction_metrics(self):
+        cache = DictCache({})
+        with patch('capa.safe_exec.safe_exec.set_custom_metric') as mock_set_custom_metric:
+            safe_exec("a = 17", {}, cache=cache, slug='problem_1')
+            mock_set_custom_metric.assert_any_call('safe_exec_slug', 'problem_1')
+            mock_set_custom_metric.assert_any_call('safe_exec_cache', 'miss')
+
+            mock_set_custom_metric.reset_mock()
+            safe_exec("a = 17", {}, cache=cache, slug='problem_2')
+            mock_set_custom_metric.assert_any_call('safe_exec_slug', 'problem_2')
+            mock_set_custom_metric.assert_any_call('safe_exec_cache', 'hit')
+
+    def test_cache_volatile_globals_referenced_indirectly(self):
+        cache = {}
+        for learner in ('learner_1', 'learner_2'):
+            # Neither the comment nor the string refers to the global, but
+            # globals() does.
+            g = {'anonymous_student_id': learner}
+            safe_exec(
+                "# anonymous_student_id\na = globals()['anonymous_' + 'student_id']",
+                g, cache=DictCache(cache),
+            )
+            self.assertEqual(g['a'], learner)
+        self.assertEqual(len(cache), 2)
+
+        g = {'anonymous_student_id': 'learner_1'}
+        safe_exec("a = 'anonymous_student_id'  # anonymous_student_id", g, cache=DictCache(cache))
+        g = {'anonymous_student_id': 'learner_2'}
+        safe_exec("a = 'anonymous_student_id'  # anonymous_student_id", g, cache=DictCache(cache))
+        self.assertEqual(len(cache), 3)
+
     def test_unicode_submission(self):
         # Check that using non-ASCII unicode does not raise an encoding error.
         # Try several non-ASCII unicode characters.
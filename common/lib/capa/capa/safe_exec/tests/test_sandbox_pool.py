@@ -0,0 +1,115 @@
+"""Test sandbox_pool.py"""
+
+
+import sys
+import textwrap
+import unittest
+
+from codejail import jail_code
+from codejail.safe_exec import SafeExecException
+from mock import patch
+
+from capa.safe_exec import sandbox_pool
+from capa.safe_exec.sandbox_pool import SandboxPool, SandboxWorker
+
+
+class TestSandboxPool(unittest.TestCase):
+    """
+    Tests for running code in warm workers.  The workers run this python,
+    without a sandbox.
+    """
+    def setUp(self):
+        super(TestSandboxPool, self).setUp()
+        self.pool = SandboxPool([sys.executable, '-E', '-B'], size=1, max_executions=3, preload=('math',))
+        self.addCleanup(self.pool.close)
+
+    def test_set_values(self):
+        g = {'b': 2}
+        self.pool.safe_exec("a = b * 21\nprint('not a result')", g)
+        self.assertEqual(g, {'a': 42, 'b': 2})
+
+    def test_executions_are_isolated(self):
+        g = {}
+        self.pool.safe_exec("import math\nmath.changed = True\nchanged = True", g)
+        g = {}
+        self.pool.safe_exec("import math\na = hasattr(math, 'changed')", g)
+        self.assertEqual(g, {'a': False})
+
+    def test_exceptions(self):
+        with self.assertRaises(SafeExecException) as context:
+            self.pool.safe_exec("1/0", {})
+        self.assertIn("ZeroDivisionError", str(context.exception))
+
+    @patch.dict(jail_code.LIMITS, {'CPU': 0, 'REALTIME': 1})
+    def test_realtime_limit(self):
+        with self.assertRaises(SafeExecException) as context:
+            self.pool.safe_exec("import time\ntime.sleep(10)", {})
+        self.assertIn("REALTIME", str(context.exception))
+
+    @patch.dict(jail_code.LIMITS, {'CPU': 0, 'REALTIME': 0})
+    @patch.object(sandbox_pool, 'MAX_REALTIME', 1)
+    @patch.object(sandbox_pool, 'codejail_safe_exec')
+    def test_no_realtime_limit(self, mock_codejail_safe_exec):
+        # The worker still kills the job, so the pool doesn't give up on it.
+        with self.assertRaises(SafeExecException) as context:
+            self.pool.safe_exec("import time\ntime.sleep(10)", {})
+        self.assertIn("REALTIME", str(context.exception))
+        self.assertFalse(mock_codejail_safe_exec.called)
+
+    @patch.dict(jail_code.LIMITS, {'NPROC': 3})
+    def test_nproc_limit_allows_for_workers(self):
+        # The idle workers and the worker running the job are processes of
+        # the sandbox user, so they are added to the NPROC limit.
+        with patch.object(SandboxWorker, 'run', autospec=True, side_effect=SandboxWorker.run) as mock_run:
+            g = {}
+            self.pool.safe_exec("a = 17", g)
+            self.assertEqual(g['a'], 17)
+            self.assertEqual(mock_run.call_args[0][2]['NPROC'], 3 + 2)
+
+            pool = SandboxPool([sys.executable, '-E', '-B'], size=1, preload=(), extra_nproc=10)
+            self.addCleanup(pool.close)
+            pool.safe_exec("a = 17", {})
+            self.assertEqual(mock_run.call_args[0][2]['NPROC'], 3 + 10)
+
+        # The limit of codejail is not changed.
+        self.assertEqual(jail_code.LIMITS['NPROC'], 3)
+
+    @patch.dict(jail_code.LIMITS, {'NPROC': 0})
+    def test_no_nproc_limit(self):
+        with patch.object(SandboxWorker, 'run', autospec=True, side_effect=SandboxWorker.run) as mock_run:
+            self.pool.safe_exec("a = 17", {})
+        self.assertEqual(mock_run.call_args[0][2]['NPROC'], 0)
+
+    def test_result_files_are_ignored(self):
+        # Jobs run as the same user and can write to one another's tmp
+        # directories, so results are never read from them.
+        g = {}
+        self.pool.safe_exec(
+            textwrap.dedent("""\
+                import json, os
+                with open(os.path.join(os.environ['TMPDIR'], 'result.json'), 'w') as result_file:
+                    json.dump({'globals': {'a': 'forged'}, 'emsg': None, 'stdout': ''}, result_file)
+                a = 42
+                """),
+            g,
+        )
+        self.assertEqual(g['a'], 42)
+
+    def test_extra_files(self):
+        g = {}
+        self.pool.safe_exec(
+            "import helpers\na = helpers.VALUE",
+            g,
+            python_path=['helpers.py'],
+            extra_files=[('helpers.py', b'VALUE = 17\n')],
+        )
+        self.assertEqual(g['a'], 17)
+
+    def test_workers_are_recycled(self):
+        worker = self.pool._idle[0]  # pylint: disable=protected-access
+        for i in range(4):
+            g = {}
+            self.pool.safe_exec("a = {}".format(i), g)
+            self.assertEqual(g['a'], i)
+        self.assertIsNotNone(worker.process.poll())
+        self.assertEqual(self.pool._idle[0].executions, 1)  # pylint: disable=protected-access
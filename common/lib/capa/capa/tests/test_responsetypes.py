@@ -22,8 +22,9 @@ from pytz import UTC
 from six import text_type
 
 import calc
+import calc.calc
 from capa.correctmap import CorrectMap
-from capa.responsetypes import LoncapaProblemError, ResponseError, StudentInputError
+from capa.responsetypes import FormulaResponse, LoncapaProblemError, ResponseError, StudentInputError
 from capa.tests.helpers import load_fixture, new_loncapa_problem, test_capa_system
 from capa.tests.response_xml_factory import (
     AnnotationResponseXMLFactory,
@@ -562,6 +563,46 @@ class FormulaResponseTest(ResponseTest):
         input_dict = {'1_2_1': '1/0'}
         self.assertRaises(StudentInputError, problem.grade_answers, input_dict)
 
+    def test_vectorized_samples(self):
+        """
+        Test that formulae are graded the same whether they are evaluated
+        at all sample points at once or once per sample point.
+        """
+        sample_dict = {'x': (1, 10), 'y': (1, 10)}
+        problem = self.build_problem(sample_dict=sample_dict,
+                                     num_samples=10,
+                                     tolerance=0.01,
+                                     answer="x^2+sqrt(y)")
+        formulae = [
+            ("x*x + y^0.5", "correct"),
+            ("(x+1)^2 - 2*x - 1 + sqrt(y)", "correct"),
+            ("fact(3)*x^2/6 + sqrt(y)", "correct"),
+            ("x^2 + y", "incorrect"),
+            ("1 || x", "incorrect"),
+        ]
+        for vectorize_samples in (True, False):
+            with mock.patch.object(FormulaResponse, 'vectorize_samples', vectorize_samples):
+                for input_formula, expected_correctness in formulae:
+                    self.assert_grade(problem, input_formula, expected_correctness)
+
+    @mock.patch.object(FormulaResponse, 'vectorize_samples', False)
+    def test_answer_parsed_once(self):
+        """
+        Test that the instructor answer is not parsed again for every sample
+        point and submission.
+        """
+        answer = "x^3 + 2*sqrt(y) + 7"
+        sample_dict = {'x': (1, 10), 'y': (1, 10)}
+        problem = self.build_problem(sample_dict=sample_dict,
+                                     num_samples=10,
+                                     tolerance=0.01,
+                                     answer=answer)
+        with mock.patch('capa.util.ParseAugmenter', wraps=calc.calc.ParseAugmenter) as mock_parse_augmenter:
+            self.assert_grade(problem, "x*x*x + 2*y^0.5 + 7", "correct")
+            self.assert_grade(problem, "x^3 + y", "incorrect")
+        parsed_expressions = [args[0] for args, _kwargs in mock_parse_augmenter.call_args_list]
+        self.assertLessEqual(parsed_expressions.count(answer), 1)
+
     def test_validate_answer(self):
         """
         Makes sure that validate_answer works.
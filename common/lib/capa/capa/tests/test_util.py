@@ -5,14 +5,21 @@ Tests capa util
 
 
 import unittest
+from cmath import isnan
 
 import ddt
+from calc import UndefinedVariable, evaluator
+from calc.calc import ParseAugmenter
 from lxml import etree
+from mock import call, patch
 
 from capa.tests.helpers import test_capa_system
 from capa.util import (
+    compare_arrays_with_tolerance,
     compare_with_tolerance,
     contextualize_text,
+    evaluate_constant,
+    evaluate_expression,
     get_inner_html_from_xpath,
     remove_markup,
     sanitize_html
@@ -27,6 +34,70 @@ class UtilTest(unittest.TestCase):
         super(UtilTest, self).setUp()
         self.system = test_capa_system()
 
+    def test_evaluate_constant(self):
+        with patch('capa.util.ParseAugmenter', wraps=ParseAugmenter) as mock_parse_augmenter:
+            self.assertEqual(evaluate_constant('3*2^10'), 3072)
+            self.assertEqual(evaluate_constant('3*2^10'), 3072)
+            self.assertEqual(mock_parse_augmenter.call_count, 1)
+
+    @ddt.data(
+        ({'x': 2.5, 'Y': 3}, 'x*y + sin(x)/Y', False),
+        ({'x': 2.5, 'Y': 3}, 'x*Y + sin(x)/Y', True),
+        ({'R1': 2, 'R2': 3}, 'R1||R2 + 10k', True),
+        ({}, '', False),
+    )
+    @ddt.unpack
+    def test_evaluate_expression(self, variables, expression, case_sensitive):
+        with patch('capa.util.ParseAugmenter', wraps=ParseAugmenter) as mock_parse_augmenter:
+            for scale in (1, 2):
+                values = {name: value * scale for name, value in variables.items()}
+                expected = evaluator(values, {}, expression, case_sensitive=case_sensitive)
+                value = evaluate_expression(values, {}, expression, case_sensitive=case_sensitive)
+                if expression:
+                    self.assertAlmostEqual(value, expected)
+                else:
+                    self.assertTrue(isnan(value) and isnan(expected))
+            self.assertLessEqual(mock_parse_augmenter.call_count, 1)
+
+    def test_evaluate_expression_errors(self):
+        with self.assertRaises(UndefinedVariable):
+            evaluate_expression({'x': 1}, {}, 'x + z')
+        # The same expression is checked again against other variables.
+        self.assertEqual(evaluate_expression({'x': 1, 'z': 2}, {}, 'x + z'), 3)
+        with self.assertRaises(UndefinedVariable):
+            evaluate_expression({'x': 1}, {}, 'x + z')
+
+    def test_parse_tree_cache_metrics(self):
+        with patch('capa.util.newrelic') as mock_newrelic:
+            evaluate_constant('7*2^11')
+            evaluate_constant('7*2^11')
+        mock_newrelic.agent.record_custom_metric.assert_has_calls([
+            call(u'Custom/capa/parse_tree_cache_miss', 1),
+            call(u'Custom/capa/parse_tree_cache_hit', 1),
+        ])
+
+    @ddt.data(
+        ('0.001%', False),
+        ('10%', False),
+        ('10%', True),
+        ('0.01', False),
+        (0.01, False),
+        (0.001, False),
+        (0.1, True),
+    )
+    @ddt.unpack
+    def test_compare_arrays_with_tolerance(self, tolerance, relative_tolerance):
+        infinity = float('Inf')
+        student_values = [100.0, 100.001, 100.01, 100.002, 109.9, 112.0, 0.4, infinity, infinity, 3 + 4j, float('nan')]
+        instructor_values = [100.0, 100.0, 100.0, 100.0, 100.0, 100.0, 0.44, 100.0, infinity, 3 + 4.001j, 1.0]
+        self.assertEqual(
+            list(compare_arrays_with_tolerance(student_values, instructor_values, tolerance, relative_tolerance)),
+            [
+                compare_with_tolerance(student, instructor, tolerance, relative_tolerance)
+                for student, instructor in zip(student_values, instructor_values)
+            ],
+        )
+
     def test_compare_with_tolerance(self):
         # Test default tolerance '0.001%' (it is relative)
         result = compare_with_tolerance(100.0, 100.0)
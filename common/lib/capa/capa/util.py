@@ -10,10 +10,27 @@ from cmath import isinf, isnan
 from decimal import Decimal
 
 import bleach
-from calc import evaluator
+import numpy
+from calc.calc import (
+    DEFAULT_FUNCTIONS,
+    DEFAULT_VARIABLES,
+    ParseAugmenter,
+    eval_atom,
+    eval_number,
+    eval_parallel,
+    eval_power,
+    eval_product,
+    eval_sum
+)
 from lxml import etree
 
 from openedx.core.djangolib.markup import HTML
+from openedx.core.lib.cache_utils import ByteSizeLRUCache
+
+try:
+    import newrelic.agent
+except ImportError:
+    newrelic = None  # pylint: disable=invalid-name
 
 #-----------------------------------------------------------------------------
 #
@@ -21,6 +38,84 @@ from openedx.core.djangolib.markup import HTML
 default_tolerance = '0.001%'
 log = logging.getLogger(__name__)
 
+# Maximum number of parse trees of math expressions, such as staff answers
+# and tolerances, to keep in the process-wide cache.
+PARSE_TREE_CACHE_SIZE = 4096
+
+# Each parse tree is accounted for as one byte, to bound the number of trees.
+_parse_tree_cache = ByteSizeLRUCache(PARSE_TREE_CACHE_SIZE)
+
+
+def evaluate_expression(variables, functions, expression, case_sensitive=False):
+    """
+    Returns the value of the given math expression, as
+    evaluator(variables, functions, expression, case_sensitive) does.
+
+    The parse tree of the expression, checked against the names of the
+    variables and functions, is kept in a process-wide cache, so that
+    staff answers and tolerances are not parsed again for every sample
+    point, submission and rescore.  Errors are not cached.
+    """
+    if expression.strip() == "":
+        return float('nan')
+
+    all_variables = _with_defaults(DEFAULT_VARIABLES, variables, case_sensitive)
+    all_functions = _with_defaults(DEFAULT_FUNCTIONS, functions, case_sensitive)
+    key = (expression, case_sensitive, tuple(sorted(variables)), tuple(sorted(functions)))
+    parse_tree = _parse_tree_cache.get(key)
+    if parse_tree is None:
+        _record_parse_tree_cache('miss')
+        parse_tree = ParseAugmenter(expression, case_sensitive)
+        parse_tree.parse_algebra()
+        parse_tree.check_variables(all_variables, all_functions)
+        _parse_tree_cache.set(key, parse_tree, size_in_bytes=1)
+    else:
+        _record_parse_tree_cache('hit')
+
+    if case_sensitive:
+        casify = lambda name: name
+    else:
+        casify = lambda name: name.lower()
+    return parse_tree.reduce_tree({
+        'number': eval_number,
+        'variable': lambda parse_result: all_variables[casify(parse_result[0])],
+        'function': lambda parse_result: all_functions[casify(parse_result[0])](parse_result[1]),
+        'atom': eval_atom,
+        'power': eval_power,
+        'parallel': eval_parallel,
+        'product': eval_product,
+        'sum': eval_sum,
+    })
+
+
+def evaluate_constant(expression, case_sensitive=False):
+    """
+    Returns the value of the given math expression, which has no variables,
+    as evaluator({}, {}, expression) does.
+    """
+    return evaluate_expression({}, {}, expression, case_sensitive=case_sensitive)
+
+
+def _with_defaults(defaults, names, case_sensitive):
+    """
+    Returns the given variables or functions added to the default ones, with
+    lowercase names unless case_sensitive, as calc expects them.
+    """
+    all_names = dict(defaults)
+    all_names.update(names)
+    if not case_sensitive:
+        all_names = {name.lower(): value for name, value in six.iteritems(all_names)}
+    return all_names
+
+
+def _record_parse_tree_cache(outcome):
+    """
+    Records a hit or miss of the process-wide cache of parse trees as a
+    custom metric.
+    """
+    if newrelic:
+        newrelic.agent.record_custom_metric(u'Custom/capa/parse_tree_cache_{}'.format(outcome), 1)
+
 
 def compare_with_tolerance(student_complex, instructor_complex, tolerance=default_tolerance, relative_tolerance=False):
     """
@@ -61,11 +156,11 @@ def compare_with_tolerance(student_complex, instructor_complex, tolerance=defaul
         if tolerance == default_tolerance:
             relative_tolerance = True
         if tolerance.endswith('%'):
-            tolerance = evaluator(dict(), dict(), tolerance[:-1]) * 0.01
+            tolerance = evaluate_constant(tolerance[:-1]) * 0.01
             if not relative_tolerance:
                 tolerance = tolerance * abs(instructor_complex)
         else:
-            tolerance = evaluator(dict(), dict(), tolerance)
+            tolerance = evaluate_constant(tolerance)
 
     if relative_tolerance:
         tolerance = tolerance * max(abs(student_complex), abs(instructor_complex))
@@ -98,6 +193,51 @@ def compare_with_tolerance(student_complex, instructor_complex, tolerance=defaul
         return abs(student_complex - instructor_complex) <= tolerance
 
 
+def compare_arrays_with_tolerance(student_values, instructor_values, tolerance=default_tolerance,
+                                  relative_tolerance=False):
+    """
+    Compare arrays of student and instructor results elementwise, as
+    compare_with_tolerance does, and return an array of booleans.
+
+    The comparisons are done with floats rather than Decimals, and elements
+    whose difference is within rounding error of the tolerance are compared
+    again with compare_with_tolerance, so that the results are the same.
+    """
+    student_values = numpy.atleast_1d(student_values)
+    instructor_values = numpy.atleast_1d(instructor_values)
+
+    tolerances = tolerance
+    if isinstance(tolerance, str):
+        if tolerance == default_tolerance:
+            relative_tolerance = True
+        if tolerance.endswith('%'):
+            tolerances = evaluate_constant(tolerance[:-1]) * 0.01
+            if not relative_tolerance:
+                tolerances = tolerances * numpy.abs(instructor_values)
+        else:
+            tolerances = evaluate_constant(tolerance)
+
+    with numpy.errstate(invalid='ignore', over='ignore'):
+        if relative_tolerance:
+            tolerances = tolerances * numpy.maximum(numpy.abs(student_values), numpy.abs(instructor_values))
+        differences = numpy.abs(student_values - instructor_values)
+        result = differences <= tolerances
+
+        # As in compare_with_tolerance, infinite inputs are compared directly.
+        infinite = numpy.isinf(student_values) | numpy.isinf(instructor_values)
+        result = numpy.where(infinite, student_values == instructor_values, result)
+
+        borderline = ~infinite & (
+            numpy.abs(differences - tolerances) <=
+            1e-9 * (numpy.abs(student_values) + numpy.abs(instructor_values) + numpy.abs(tolerances))
+        )
+    for index in numpy.flatnonzero(borderline):
+        result[index] = compare_with_tolerance(
+            student_values[index], instructor_values[index], tolerance, relative_tolerance,
+        )
+    return result
+
+
 def contextualize_text(text, context):  # private
     """
     Takes a string with variables. E.g. $a+$b.
@@ -25,6 +25,7 @@ from xblock.scorable import ScorableXBlockMixin, Score
 from capa.capa_problem import LoncapaProblem, LoncapaSystem
 from capa.inputtypes import Status
 from capa.responsetypes import LoncapaProblemError, ResponseError, StudentInputError
+from capa.safe_exec import SafeExecResultCache
 from capa.util import convert_files_to_filenames, get_inner_html_from_xpath
 from openedx.core.djangolib.markup import HTML, Text
 from xmodule.exceptions import NotFoundError
@@ -328,7 +329,10 @@ class CapaMixin(ScorableXBlockMixin, CapaFields):
         capa_system = LoncapaSystem(
             ajax_url=self.ajax_url,
             anonymous_student_id=self.runtime.anonymous_student_id,
-            cache=self.runtime.cache,
+            cache=SafeExecResultCache(
+                self.runtime.cache,
+                local=getattr(settings, 'SAFE_EXEC_LOCAL_RESULT_CACHE', False),
+            ),
             can_execute_unsafe_code=self.runtime.can_execute_unsafe_code,
             get_python_lib_zip=self.runtime.get_python_lib_zip,
             DEBUG=self.runtime.DEBUG,
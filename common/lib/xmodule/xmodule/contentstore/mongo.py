@@ -175,25 +175,37 @@ class MongoContentStore(ContentStore):
             else:
                 return None
 
-    def export(self, location, output_directory):
-        content = self.find(location)
+    def export(self, location, output_directory, output_fs=None):
+        """
+        Export the asset at `location` to `output_directory`, which is a path in `output_fs`
+        if given, in which case the asset's content is streamed into it rather than read into memory.
+        """
+        content = self.find(location, as_stream=output_fs is not None)
 
         filename = content.name
         if content.import_path is not None:
             output_directory = output_directory + '/' + os.path.dirname(content.import_path)
 
-        if not os.path.exists(output_directory):
-            os.makedirs(output_directory)
-
         # Escape invalid char from filename.
         export_name = escape_invalid_characters(name=filename, invalid_char_list=['/', '\\'])
 
+        if output_fs is not None:
+            try:
+                asset_dir = output_fs.makedirs(output_directory, recreate=True)
+                asset_dir.setbinfile(export_name, content._stream)  # pylint: disable=protected-access
+            finally:
+                content.close()
+            return
+
+        if not os.path.exists(output_directory):
+            os.makedirs(output_directory)
+
         disk_fs = OSFS(output_directory)
 
         with disk_fs.open(export_name, 'wb') as asset_file:
             asset_file.write(content.data)
 
-    def export_all_for_course(self, course_key, output_directory, assets_policy_file):
+    def export_all_for_course(self, course_key, output_directory, assets_policy_file, output_fs=None):
         """
         Export all of this course's assets to the output_directory. Export all of the assets'
         attributes to the policy file.
@@ -203,6 +215,8 @@ class MongoContentStore(ContentStore):
             output_directory: the directory under which to put all the asset files
             assets_policy_file: the filename for the policy file which should be in the same
                 directory as the other policy files.
+            output_fs: the filesystem in which output_directory and assets_policy_file are,
+                if they are not paths on disk.
         """
         policy = {}
         assets, __ = self.get_all_content_for_course(course_key)
@@ -216,11 +230,16 @@ class MongoContentStore(ContentStore):
             #
             # When debugging course exports, this might be a good place
             # to look. -- pmitros
-            self.export(asset['asset_key'], output_directory)
+            self.export(asset['asset_key'], output_directory, output_fs=output_fs)
             for attr, value in six.iteritems(asset):
                 if attr not in ['_id', 'md5', 'uploadDate', 'length', 'chunkSize', 'asset_key']:
                     policy.setdefault(asset['asset_key'].block_id, {})[attr] = value
 
+        if output_fs is not None:
+            with output_fs.open(assets_policy_file, 'wb') as f:
+                f.write(json.dumps(policy, sort_keys=True, indent=4).encode('utf-8'))
+            return
+
         with open(assets_policy_file, 'w') as f:
             json.dump(policy, f, sort_keys=True, indent=4)
 
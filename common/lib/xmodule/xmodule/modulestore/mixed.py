@@ -260,6 +260,29 @@ class MixedModuleStore(ModuleStoreDraftAndPublished, ModuleStoreWriteBase):
         store = self._get_modulestore_for_courselike(usage_key.course_key)
         return store.get_item(usage_key, depth, **kwargs)
 
+    def prefetch_definitions(self, usage_key, depth=None, **kwargs):
+        """
+        Fetches the definitions of the given block and of its descendants out
+        to depth in bulk, for modulestores that load definitions lazily.
+        Returns a DefinitionPrefetch, or None if the modulestore doesn't
+        support prefetching.
+        """
+        store = self._get_modulestore_for_courselike(usage_key.course_key)
+        if not hasattr(store, 'prefetch_definitions'):
+            return None
+        return store.prefetch_definitions(usage_key, depth=depth, **kwargs)
+
+    def get_structure_diff(self, course_key, from_version, **kwargs):
+        """
+        Returns a StructureDiff of the blocks that changed from the from_version
+        structure of the course to its current structure, or None if the
+        modulestore doesn't version structures or that version can't be found.
+        """
+        store = self._get_modulestore_for_courselike(course_key)
+        if not hasattr(store, 'get_structure_diff'):
+            return None
+        return store.get_structure_diff(course_key, from_version, **kwargs)
+
     @strip_key
     def get_items(self, course_key, **kwargs):
         """
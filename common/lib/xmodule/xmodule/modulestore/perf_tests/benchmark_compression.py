@@ -0,0 +1,133 @@
+#!/usr/bin/env python
+"""
+Compares the compression codecs available for the course_structure_cache
+on the split modulestore structures of exported test courses.
+
+The courses are imported into an isolated split modulestore, so a running
+mongo is required.  For each course and codec, reports the compressed size
+and the best encode and decode times of the pickled course structure.
+"""
+
+
+import timeit
+
+import six.moves.cPickle as pickle
+from path import Path as path
+
+from openedx.core.lib import compression
+from xmodule.modulestore.tests.utils import TEST_DATA_DIR, VersioningModulestoreBuilder
+from xmodule.modulestore.xml_importer import import_course_from_xml
+
+try:
+    import click
+except ImportError:
+    click = None
+
+# pylint: disable=invalid-name
+TEST_DATA_ROOT = path(__file__).dirname().parent.parent.parent.parent.parent.parent / TEST_DATA_DIR
+
+# Test courses to benchmark by default.
+COURSES = ('toy', 'simple', 'manual-testing-complete')
+
+
+def course_structures(data_dir, course_dirs):
+    """
+    Yields (course_dir, structure) for each of the given exported courses.
+    """
+    with VersioningModulestoreBuilder().build() as (contentstore, store):
+        for course_dir in course_dirs:
+            course_key = store.make_course_key('perf', course_dir, 'run')
+            import_course_from_xml(
+                store,
+                'perf_user',
+                data_dir,
+                source_dirs=[course_dir],
+                static_content_store=contentstore,
+                target_id=course_key,
+                create_if_not_present=True,
+                raise_on_failure=True,
+            )
+            structure = store._lookup_course(course_key).structure  # pylint: disable=protected-access
+            yield course_dir, structure
+
+
+def train_dictionary(structures):
+    """
+    Returns a zstd dictionary trained on the blocks of the given structures.
+    A few whole structures are too few samples to train on, but their
+    blocks share most of their content with the blocks of other courses.
+    """
+    return compression.train_dictionary([
+        pickle.dumps(block, 4)
+        for structure in structures
+        for block in structure['blocks'].values()
+    ])
+
+
+def benchmark(pickled_data, codec, dictionary=None, repeat=10):
+    """
+    Returns the (compressed size, encode seconds, decode seconds) of the
+    given data with the given codec.
+    """
+    level = 1 if codec == compression.ZLIB else None
+    compressed_data = compression.compress(pickled_data, codec, level=level, dictionary=dictionary)
+    encode_time = min(timeit.repeat(
+        lambda: compression.compress(pickled_data, codec, level=level, dictionary=dictionary),
+        repeat=repeat,
+        number=1,
+    ))
+    decode_time = min(timeit.repeat(
+        lambda: compression.decompress(compressed_data, dictionary),
+        repeat=repeat,
+        number=1,
+    ))
+    return len(compressed_data), encode_time, decode_time
+
+
+if click is not None:
+    # pylint: disable=bad-continuation
+    @click.command()
+    @click.argument('course_dirs', nargs=-1)
+    @click.option('--data_dir', default=TEST_DATA_ROOT, help='Directory containing the exported courses.')
+    @click.option('--repeat', default=10, help='Number of times to encode and decode each structure.')
+    @click.option('--dictionary_file', type=click.File('wb'), default=None,
+                  help='File to write a zstd dictionary trained on the structures to.')
+    def cli(course_dirs, data_dir, repeat, dictionary_file):
+        """
+        Main.
+        """
+        structures = list(course_structures(data_dir, course_dirs or COURSES))
+
+        dictionary = None
+        if compression.ZSTD in compression.available_codecs():
+            dictionary = train_dictionary([structure for _, structure in structures])
+            if dictionary_file is not None:
+                dictionary_file.write(dictionary)
+
+        codecs = [(codec, None) for codec in compression.available_codecs()]
+        if dictionary is not None:
+            codecs.append((compression.ZSTD + '+dict', dictionary))
+
+        for course_dir, structure in structures:
+            pickled_data = pickle.dumps(structure, 4)  # As in the course_structure_cache
+            for name, codec_dictionary in codecs:
+                size, encode_time, decode_time = benchmark(
+                    pickled_data, name.split('+')[0], codec_dictionary, repeat,
+                )
+                click.echo(
+                    u'{course}\t{codec}\tpickled: {pickled_size}\tcompressed: {size}\t'
+                    u'encode: {encode_ms:.2f} ms\tdecode: {decode_ms:.2f} ms'.format(
+                        course=course_dir,
+                        codec=name,
+                        pickled_size=len(pickled_data),
+                        size=size,
+                        encode_ms=encode_time * 1000,
+                        decode_ms=decode_time * 1000,
+                    )
+                )
+
+if __name__ == '__main__':
+    if click is not None:
+        cli()  # pylint: disable=no-value-for-parameter
+    else:
+        print("Aborted! Module 'click' is not installed.")
@@ -0,0 +1,77 @@
+"""
+Performance test for importing courses into the split modulestore.
+"""
+
+
+import datetime
+import itertools
+import time
+import unittest
+
+import ddt
+from mock import patch
+from path import Path as path
+from pymongo.collection import Collection
+
+from xmodule.modulestore.tests.utils import SPLIT_MODULESTORE_SETUP, TEST_DATA_DIR
+from xmodule.modulestore.xml_importer import STATIC_CONTENT_IMPORT_WORKERS, import_course_from_xml
+
+# The small and the large test courses.
+TEST_COURSES = ('toy', 'manual-testing-complete')
+
+# Number of static files saved concurrently: one at a time, and the default.
+STATIC_CONTENT_IMPORT_WORKERS_PER_TEST = (1, STATIC_CONTENT_IMPORT_WORKERS)
+
+# pylint: disable=invalid-name
+TEST_DIR = path(__file__).dirname()
+PLATFORM_ROOT = TEST_DIR.parent.parent.parent.parent.parent.parent
+TEST_DATA_ROOT = PLATFORM_ROOT / TEST_DATA_DIR
+
+
+@ddt.ddt
+@unittest.skip
+class CourseImportTimings(unittest.TestCase):
+    """
+    This class exists to time imports of the test courses into the split modulestore,
+    and count the writes they make to mongo.
+    """
+
+    # Use this attribute to skip this test on regular unittest CI runs.
+    perf_test = True
+
+    def setUp(self):
+        super(CourseImportTimings, self).setUp()
+        self.test_run_time = datetime.datetime.now()
+
+    @ddt.data(*itertools.product(TEST_COURSES, STATIC_CONTENT_IMPORT_WORKERS_PER_TEST))
+    @ddt.unpack
+    def test_import_timings(self, course_name, static_content_import_workers):
+        """
+        Generate timings of importing the course, with its static content.
+        """
+        with SPLIT_MODULESTORE_SETUP.build() as (contentstore, store):
+            course_key = store.make_course_key('perf', course_name, 'run')
+            with patch.object(Collection, 'insert_one', autospec=True, side_effect=Collection.insert_one) as insert_one:
+                with patch.object(
+                    Collection, 'insert_many', autospec=True, side_effect=Collection.insert_many
+                ) as insert_many:
+                    start = time.time()
+                    import_course_from_xml(
+                        store,
+                        'test_user',
+                        TEST_DATA_ROOT,
+                        source_dirs=[course_name],
+                        static_content_store=contentstore,
+                        target_id=course_key,
+                        create_if_not_present=True,
+                        raise_on_failure=True,
+                        static_content_import_workers=static_content_import_workers,
+                    )
+                    elapsed = time.time() - start
+
+        result_str = "{} - Course: {:<25} - Workers: {} - Inserts: {:>5} - Seconds: {:.2f}\n".format(
+            self.test_run_time, course_name, static_content_import_workers,
+            insert_one.call_count + insert_many.call_count, elapsed,
+        )
+        with open("import_timings.txt", "a") as f:
+            f.write(result_str)
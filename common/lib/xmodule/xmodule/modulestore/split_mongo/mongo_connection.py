@@ -3,11 +3,11 @@ Segregation of pymongo functions from the data modeling mechanisms for split mod
 """
 
 
+import copy
 import datetime
 import logging
 import math
 import re
-import zlib
 from contextlib import contextmanager
 from time import time
 
@@ -18,14 +18,17 @@ import six.moves.cPickle as pickle
 from contracts import check, new_contract
 from mongodb_proxy import autoretry_read
 # Import this just to export it
-from pymongo.errors import DuplicateKeyError  # pylint: disable=unused-import
+from pymongo.errors import BulkWriteError, DuplicateKeyError  # pylint: disable=unused-import
 
+from openedx.core.lib import compression
+from openedx.core.lib.cache_utils import ByteSizeLRUCache, process_cached
 from xmodule.exceptions import HeartbeatFailure
 from xmodule.modulestore import BlockData
 from xmodule.modulestore.split_mongo import BlockKey
 from xmodule.mongo_utils import connect_to_mongodb, create_collection_index
 
 try:
+    from django.conf import settings
     from django.core.cache import caches, InvalidCacheBackendError
     DJANGO_AVAILABLE = True
 except ImportError:
@@ -34,6 +37,11 @@ except ImportError:
 new_contract('BlockData', BlockData)
 log = logging.getLogger(__name__)
 
+# The code of the error raised when inserting a document whose _id is already in a collection.
+DUPLICATE_KEY_ERROR_CODE = 11000
+
+_PROCESS_STRUCTURE_CACHE = None
+
 
 def get_cache(alias):
     """
@@ -44,6 +52,75 @@ def get_cache(alias):
     return caches[alias]
 
 
+def process_structure_cache():
+    """
+    Returns the process-wide cache of decoded course structures, keyed by
+    structure id, or None if it is disabled.
+
+    Structures are immutable per id, but the split modulestore caches the
+    definition fields and the subtree edit info of blocks in the structures
+    it loads, so CourseStructureCache stores and returns copies of their
+    blocks (see copy_structure).
+    """
+    global _PROCESS_STRUCTURE_CACHE  # pylint: disable=global-statement
+    max_size_in_bytes = getattr(settings, 'COURSE_STRUCTURE_PROCESS_CACHE_MAX_SIZE_IN_BYTES', 0) if (
+        DJANGO_AVAILABLE and settings.configured
+    ) else 0
+    if not max_size_in_bytes:
+        return None
+    if _PROCESS_STRUCTURE_CACHE is None or _PROCESS_STRUCTURE_CACHE.max_size_in_bytes != max_size_in_bytes:
+        _PROCESS_STRUCTURE_CACHE = ByteSizeLRUCache(max_size_in_bytes)
+    return _PROCESS_STRUCTURE_CACHE
+
+
+def copy_structure(structure):
+    """
+    Returns a copy of the given decoded structure, with copies of its
+    blocks, their fields and their edit info, which the split modulestore
+    modifies in place when loading blocks.  Other values, such as lists of
+    children, are shared, since the split modulestore copies structures
+    deeply before editing them.  This is much cheaper than unpickling.
+    """
+    new_structure = dict(structure)
+    new_structure['blocks'] = {
+        block_key: _copy_block_data(block_data) for block_key, block_data in six.iteritems(structure['blocks'])
+    }
+    return new_structure
+
+
+def _copy_block_data(block_data):
+    """
+    Returns a copy of the given BlockData, with copies of its fields and edit info.
+    """
+    new_block_data = copy.copy(block_data)
+    new_block_data.fields = dict(block_data.fields)
+    new_block_data.edit_info = copy.copy(block_data.edit_info)
+    return new_block_data
+
+
+def course_structure_codec():
+    """
+    Returns the (codec, dictionary) with which to compress course
+    structures in the course_structure_cache.
+    """
+    if not (DJANGO_AVAILABLE and settings.configured):
+        return compression.ZLIB, None
+    dictionary_path = getattr(settings, 'COURSE_STRUCTURE_CACHE_COMPRESSION_DICTIONARY_PATH', None)
+    return (
+        getattr(settings, 'COURSE_STRUCTURE_CACHE_CODEC', compression.ZLIB),
+        _read_compression_dictionary(dictionary_path) if dictionary_path else None,
+    )
+
+
+@process_cached
+def _read_compression_dictionary(path):
+    """
+    Returns the contents of the compression dictionary at the given path.
+    """
+    with open(path, 'rb') as dictionary_file:
+        return dictionary_file.read()
+
+
 def round_power_2(value):
     """
     Return value rounded up to the nearest power of 2.
@@ -207,18 +284,27 @@ def structure_to_mongo(structure, course_context=None):
 class CourseStructureCache(object):
     """
     Wrapper around django cache object to cache course structure objects.
-    The course structures are pickled and compressed when cached.
+    The course structures are pickled and compressed, with the configured
+    codec, when cached.
+
+    Decoded structures are also kept in a bounded process-wide cache, if
+    enabled, so that they are only decompressed and unpickled once per
+    process.
 
     If the 'course_structure_cache' doesn't exist, then don't do anything for
     for set and get.
     """
     def __init__(self):
         self.cache = None
+        self.process_cache = None
         if DJANGO_AVAILABLE:
             try:
                 self.cache = get_cache('course_structure_cache')
             except InvalidCacheBackendError:
                 pass
+            else:
+                self.process_cache = process_structure_cache()
+                self.codec, self.dictionary = course_structure_codec()
 
     def get(self, key, course_context=None):
         """Pull the compressed, pickled struct data from cache and deserialize."""
@@ -226,6 +312,15 @@ class CourseStructureCache(object):
             return None
 
         with TIMER.timer("CourseStructureCache.get", course_context) as tagger:
+            if self.process_cache is not None:
+                cached = self.process_cache.get(key)
+                tagger.tag(from_process_cache=str(cached is not None).lower())
+                if cached is not None:
+                    structure, uncompressed_size = cached
+                    # Decompressing and unpickling this many bytes was avoided.
+                    tagger.measure('process_cache_saved_size', uncompressed_size)
+                    return copy_structure(structure)
+
             try:
                 compressed_pickled_data = self.cache.get(key)
                 tagger.tag(from_cache=str(compressed_pickled_data is not None).lower())
@@ -237,13 +332,15 @@ class CourseStructureCache(object):
 
                 tagger.measure('compressed_size', len(compressed_pickled_data))
 
-                pickled_data = zlib.decompress(compressed_pickled_data)
+                pickled_data = compression.decompress(compressed_pickled_data, self.dictionary)
                 tagger.measure('uncompressed_size', len(pickled_data))
 
                 if six.PY2:
-                    return pickle.loads(pickled_data)
+                    structure = pickle.loads(pickled_data)
                 else:
-                    return pickle.loads(pickled_data, encoding='latin-1')
+                    structure = pickle.loads(pickled_data, encoding='latin-1')
+                self._add_to_process_cache(key, structure, len(pickled_data))
+                return structure
             except Exception:
                 # The cached data is corrupt in some way, get rid of it.
                 log.warning("CourseStructureCache: Bad data in cache for %s", course_context)
@@ -259,12 +356,30 @@ class CourseStructureCache(object):
             pickled_data = pickle.dumps(structure, 4)  # Protocol can't be incremented until cache is cleared
             tagger.measure('uncompressed_size', len(pickled_data))
 
-            # 1 = Fastest (slightly larger results)
-            compressed_pickled_data = zlib.compress(pickled_data, 1)
+            # 1 = Fastest zlib level (slightly larger results)
+            compressed_pickled_data = compression.compress(
+                pickled_data,
+                self.codec,
+                level=1 if self.codec == compression.ZLIB else None,
+                dictionary=self.dictionary,
+            )
+            tagger.tag(codec=self.codec)
             tagger.measure('compressed_size', len(compressed_pickled_data))
 
             # Stuctures are immutable, so we set a timeout of "never"
             self.cache.set(key, compressed_pickled_data, None)
+            self._add_to_process_cache(key, structure, len(pickled_data))
+
+    def _add_to_process_cache(self, key, structure, uncompressed_size):
+        """
+        Adds the given decoded structure to the process cache, if enabled,
+        accounting for it by the size of its pickled data.  A copy is kept,
+        since the caller goes on using the given structure.
+        """
+        if self.process_cache is not None:
+            self.process_cache.set(
+                key, (copy_structure(structure), uncompressed_size), size_in_bytes=uncompressed_size
+            )
 
 
 class MongoConnection(object):
@@ -568,6 +683,23 @@ class MongoConnection(object):
             tagger.tag(block_type=definition['block_type'])
             self.definitions.insert_one(definition)
 
+    def insert_definitions(self, definitions, course_context=None):
+        """
+        Create the definitions in the db with unordered bulk writes. Definitions
+        that are already in the db are skipped, since they are never modified.
+        """
+        with TIMER.timer("insert_definitions", course_context) as tagger:
+            tagger.measure('definitions', len(definitions))
+            try:
+                self.definitions.insert_many(definitions, ordered=False)
+            except BulkWriteError as error:
+                details = error.details
+                if details.get('writeConcernErrors') or any(
+                        write_error['code'] != DUPLICATE_KEY_ERROR_CODE for write_error in details['writeErrors']
+                ):
+                    raise
+                log.debug("Skipped inserting %d duplicate definitions", len(details['writeErrors']))
+
     def ensure_indexes(self):
         """
         Ensure that all appropriate indexes are created that are needed by this modulestore, or raise
@@ -59,7 +59,7 @@ import copy
 import datetime
 import hashlib
 import logging
-from collections import defaultdict
+from collections import defaultdict, namedtuple
 from importlib import import_module
 
 import six
@@ -81,6 +81,7 @@ from pytz import UTC
 from xblock.core import XBlock
 from xblock.fields import Reference, ReferenceList, ReferenceValueDict, Scope
 
+from openedx.core.lib.cache_utils import ByteSizeLRUCache
 from xmodule.assetstore import AssetMetadata
 from xmodule.course_module import CourseSummary
 from xmodule.error_module import ErrorDescriptor
@@ -104,7 +105,7 @@ from xmodule.modulestore.exceptions import (
     VersionConflictError
 )
 from xmodule.modulestore.split_mongo import BlockKey, CourseEnvelope
-from xmodule.modulestore.split_mongo.mongo_connection import DuplicateKeyError, MongoConnection
+from xmodule.modulestore.split_mongo.mongo_connection import TIMER, DuplicateKeyError, MongoConnection
 from xmodule.modulestore.store_utilities import DETACHED_XBLOCK_TYPES
 from xmodule.partitions.partitions_service import PartitionService
 
@@ -139,6 +140,121 @@ new_contract('BlockUsageLocator', BlockUsageLocator)
 new_contract('BlockKey', BlockKey)
 new_contract('XBlock', XBlock)
 
+# Maximum number of definitions to fetch with each query.
+DEFINITION_QUERY_CHUNK_SIZE = 500
+
+
+class DefinitionPrefetch(namedtuple('DefinitionPrefetch', ['definitions', 'queries'])):
+    """
+    The number of definitions fetched by prefetch_definitions, and the
+    number of queries it took.
+    """
+    __slots__ = ()
+
+    @property
+    def round_trips_saved(self):
+        """
+        The number of queries saved over fetching the definitions one by one.
+        """
+        return self.definitions - self.queries
+
+
+class StructureDiff(namedtuple('StructureDiff', ['changed', 'changed_subtrees', 'ancestors', 'deleted'])):
+    """
+    The blocks of a course that differ between two versions of its
+    structure, as sets of version agnostic usage keys, returned by
+    get_structure_diff.  Only blocks reachable from the root are compared.
+
+    changed holds the blocks whose content changed, changed_subtrees the
+    blocks that were added or moved, or whose settings changed, which can
+    affect their descendants too, ancestors the other blocks that have any
+    of those as descendants, and deleted the blocks that were removed.
+    """
+    __slots__ = ()
+
+
+def _reachable_parents(structure):
+    """
+    Returns the parent of each block reachable from the root of the given
+    structure, keyed by BlockKey, with None for the root.
+    """
+    parents = {structure['root']: None}
+    stack = [structure['root']]
+    while stack:
+        block_key = stack.pop()
+        block_data = structure['blocks'].get(block_key)
+        if block_data is None:
+            continue
+        for child_key in block_data.fields.get('children', []):
+            if child_key not in parents:
+                parents[child_key] = block_key
+                stack.append(child_key)
+    return parents
+
+
+def _settings(fields):
+    """
+    Returns the given block fields other than its children.
+    """
+    return {name: value for name, value in six.iteritems(fields) if name != 'children'}
+
+
+# Maximum total number of blocks of the structures whose StructureIndexes
+# are kept in each process.
+STRUCTURE_INDEX_CACHE_MAX_BLOCKS = 500000
+
+# StructureIndexes keyed by structure id.  Structures are immutable once
+# saved, so their indexes never need to be invalidated.
+_STRUCTURE_INDEX_CACHE = ByteSizeLRUCache(STRUCTURE_INDEX_CACHE_MAX_BLOCKS)
+
+
+class StructureIndex(namedtuple('StructureIndex', ['by_type', 'by_field'])):
+    """
+    Inverted index of the blocks of a structure, used by get_items to only
+    check the blocks that can match a query.
+
+    by_type maps each block type to the keys of the blocks of that type, and
+    by_field maps each field name to the keys of the blocks that have that
+    field set in the persisted structure.  Keys are listed in the order of
+    the structure's blocks.
+    """
+    __slots__ = ()
+
+    @classmethod
+    def build(cls, structure):
+        """
+        Returns the index of the given structure.
+        """
+        by_type = defaultdict(list)
+        by_field = defaultdict(list)
+        for block_key, block_data in six.iteritems(structure['blocks']):
+            by_type[block_data.block_type].append(block_key)
+            for field_name in block_data.fields:
+                by_field[field_name].append(block_key)
+        return cls(dict(by_type), dict(by_field))
+
+    def candidates(self, qualifiers, settings):
+        """
+        Returns the keys of the blocks that can match the given get_items
+        qualifiers and settings, or None if the index can't narrow them down.
+        """
+        candidate_lists = []
+        block_type = qualifiers.get('block_type')
+        if isinstance(block_type, six.string_types):
+            candidate_lists.append(self.by_type.get(block_type, []))
+        for field_name, criteria in six.iteritems(settings):
+            # All criteria other than {'$exists': False} require the field
+            # to be set.
+            if not (isinstance(criteria, dict) and not criteria.get('$exists', True)):
+                if field_name not in self.by_field:
+                    # Not a field of the persisted structure; it may be a
+                    # definition field cached in the loaded blocks' fields.
+                    return None
+                candidate_lists.append(self.by_field[field_name])
+        if not candidate_lists:
+            return None
+        return min(candidate_lists, key=len)
+
 
 class SplitBulkWriteRecord(BulkOpsRecord):
     def __init__(self):
@@ -211,6 +327,10 @@ class SplitBulkWriteMixin(BulkOperationsMixin):
     """
     _bulk_ops_record_type = SplitBulkWriteRecord
 
+    # Set by the modulestore.  Definitions prefetched outside of bulk
+    # operations are kept in it.
+    request_cache = None
+
     def _get_bulk_ops_record(self, course_key, ignore_case=False):
         """
         Return the :class:`.SplitBulkWriteRecord` for this course.
@@ -274,16 +394,18 @@ class SplitBulkWriteMixin(BulkOperationsMixin):
                 # append only, so if it's already been written, we can just keep going.
                 log.debug("Attempted to insert duplicate structure %s", _id)
 
-        for _id in six.viewkeys(bulk_write_record.definitions) - bulk_write_record.definitions_in_db:
+        new_definitions = [
+            bulk_write_record.definitions[_id]
+            for _id in six.viewkeys(bulk_write_record.definitions) - bulk_write_record.definitions_in_db
+        ]
+        if new_definitions:
             dirty = True
 
-            try:
-                self.db_connection.insert_definition(bulk_write_record.definitions[_id], bulk_write_record.course_key)
-            except DuplicateKeyError:
-                # We may not have looked up this definition inside this bulk operation, and thus
-                # didn't realize that it was already in the database. That's OK, the store is
-                # append only, so if it's already been written, we can just keep going.
-                log.debug("Attempted to insert duplicate definition %s", _id)
+            # Insert the definitions in bulk, rather than one round trip each, which matters
+            # for course imports. We may not have looked up some of them inside this bulk
+            # operation, and thus didn't realize that they were already in the database.
+            # That's OK, the store is append only, so those are skipped.
+            self.db_connection.insert_definitions(new_definitions, bulk_write_record.course_key)
 
         if bulk_write_record.index is not None and bulk_write_record.index != bulk_write_record.initial_index:
             dirty = True
@@ -424,6 +546,9 @@ class SplitBulkWriteMixin(BulkOperationsMixin):
         else:
             # cast string to ObjectId if necessary
             definition_guid = course_key.as_object_id(definition_guid)
+            definition = self._prefetched_definitions().get(definition_guid)
+            if definition is not None:
+                return definition
             return self.db_connection.get_definition(definition_guid, course_key)
 
     def get_definitions(self, course_key, ids):
@@ -452,7 +577,7 @@ class SplitBulkWriteMixin(BulkOperationsMixin):
 
         if len(ids):
             # Query the db for the definitions.
-            defs_from_db = list(self.db_connection.get_definitions(list(ids), course_key))
+            defs_from_db = self._query_definitions(course_key, list(ids))
             defs_dict = {d.get('_id'): d for d in defs_from_db}
             # Add the retrieved definitions to the cache.
             bulk_write_record.definitions_in_db.update(six.iterkeys(defs_dict))
@@ -460,6 +585,28 @@ class SplitBulkWriteMixin(BulkOperationsMixin):
             definitions.extend(defs_from_db)
         return definitions
 
+    def _query_definitions(self, course_key, ids):
+        """
+        Returns the definitions with the given ids from the db, fetched with
+        one query per DEFINITION_QUERY_CHUNK_SIZE ids.
+        """
+        definitions = []
+        for start in range(0, len(ids), DEFINITION_QUERY_CHUNK_SIZE):
+            definitions.extend(
+                self.db_connection.get_definitions(ids[start:start + DEFINITION_QUERY_CHUNK_SIZE], course_key)
+            )
+        return definitions
+
+    def _prefetched_definitions(self):
+        """
+        Returns the dict of the definitions fetched by prefetch_definitions
+        outside of bulk operations during this request, keyed by id.
+        Definitions are immutable, so they can be shared by all courses.
+        """
+        if self.request_cache is None:
+            return {}
+        return self.request_cache.data.setdefault('prefetched_definitions', {})
+
     def update_definition(self, course_key, definition):
         """
         Update a definition, respecting the current bulk operation status
@@ -816,6 +963,103 @@ class SplitMongoModuleStore(SplitBulkWriteMixin, ModuleStoreWriteBase):
             system.module_data.update(new_module_data)
             return system.module_data
 
+    def prefetch_definitions(self, usage_key, depth=None):
+        """
+        Fetches the definitions of the given block and of its descendants out
+        to depth (all of them if None), with one query per
+        DEFINITION_QUERY_CHUNK_SIZE definitions, so that loading them lazily
+        later on doesn't query them one by one.
+
+        The definitions are kept in the active bulk operation on the course,
+        if any, or else for the rest of the request.
+
+        Returns a DefinitionPrefetch.
+        """
+        course_key = usage_key.course_key
+        bulk_write_record = self._get_bulk_ops_record(course_key)
+        if not bulk_write_record.active and self.request_cache is None:
+            # There is nowhere to keep the definitions.
+            return DefinitionPrefetch(0, 0)
+
+        with TIMER.timer("prefetch_definitions", course_key) as tagger:
+            structure = self._lookup_course(course_key).structure
+            blocks = self.descendants(structure['blocks'], BlockKey.from_usage_key(usage_key), depth, {})
+            if bulk_write_record.active:
+                fetched = bulk_write_record.definitions
+            else:
+                fetched = self._prefetched_definitions()
+            ids = list({
+                block.definition
+                for block in six.itervalues(blocks)
+                if block.definition is not None and not block.definition_loaded and block.definition not in fetched
+            })
+
+            definitions = {definition['_id']: definition for definition in self._query_definitions(course_key, ids)}
+            fetched.update(definitions)
+            if bulk_write_record.active:
+                bulk_write_record.definitions_in_db.update(definitions)
+
+            num_queries = (len(ids) + DEFINITION_QUERY_CHUNK_SIZE - 1) // DEFINITION_QUERY_CHUNK_SIZE
+            prefetch = DefinitionPrefetch(len(definitions), num_queries)
+            tagger.measure('definitions', prefetch.definitions)
+            tagger.measure('round_trips_saved', prefetch.round_trips_saved)
+            return prefetch
+
+    def get_structure_diff(self, course_key, from_version):
+        """
+        Returns a StructureDiff of the blocks that changed from the from_version
+        structure of the course to its current structure on the course_key's
+        branch, or None if there is no such structure.
+
+        Blocks whose edit_info shows that they weren't edited since then are not
+        compared field by field.
+        """
+        with TIMER.timer("get_structure_diff", course_key) as tagger:
+            new_structure = self._lookup_course(course_key).structure
+            diff = StructureDiff(set(), set(), set(), set())
+            if new_structure['_id'] == from_version:
+                return diff
+            old_structure = self.get_structure(course_key, from_version)
+            if old_structure is None or old_structure['original_version'] != new_structure['original_version']:
+                return None
+
+            old_parents = _reachable_parents(old_structure)
+            new_parents = _reachable_parents(new_structure)
+            usage_course_key = course_key.version_agnostic().replace(branch=None)
+
+            def usage_key(block_key):
+                return usage_course_key.make_usage_key(block_key.type, block_key.id)
+
+            changed_keys = []
+            for block_key, parent_key in six.iteritems(new_parents):
+                new_block = new_structure['blocks'].get(block_key)
+                old_block = old_structure['blocks'].get(block_key)
+                if new_block is None:
+                    continue
+                if old_block is None or block_key not in old_parents or old_parents[block_key] != parent_key:
+                    diff.changed_subtrees.add(usage_key(block_key))
+                elif old_block.edit_info.update_version == new_block.edit_info.update_version:
+                    continue
+                elif _settings(old_block.fields) != _settings(new_block.fields):
+                    diff.changed_subtrees.add(usage_key(block_key))
+                elif old_block.definition != new_block.definition:
+                    diff.changed.add(usage_key(block_key))
+                else:
+                    continue
+                changed_keys.append(block_key)
+            for block_key in changed_keys:
+                parent_key = new_parents[block_key]
+                while parent_key is not None and usage_key(parent_key) not in diff.ancestors:
+                    diff.ancestors.add(usage_key(parent_key))
+                    parent_key = new_parents[parent_key]
+            diff.ancestors.difference_update(diff.changed, diff.changed_subtrees)
+            for block_key in six.viewkeys(old_parents) - six.viewkeys(new_parents):
+                diff.deleted.add(usage_key(block_key))
+
+            tagger.measure('changed', len(diff.changed) + len(diff.changed_subtrees))
+            tagger.measure('deleted', len(diff.deleted))
+            return diff
+
     @contract(course_entry=CourseEnvelope, block_keys="list(BlockKey)", depth="int | None")
     def _load_items(self, course_entry, block_keys, depth=0, **kwargs):
         """
@@ -1321,8 +1565,16 @@ class SplitMongoModuleStore(SplitBulkWriteMixin, ModuleStoreWriteBase):
             path_cache = {}
             parents_cache = self.build_block_key_to_parents_mapping(course.structure)
 
-        for block_id, value in six.iteritems(course.structure['blocks']):
-            if _block_matches_all(value):
+        blocks = course.structure['blocks']
+        block_ids = None
+        structure_index = self._get_structure_index(course_locator, course.structure)
+        if structure_index is not None:
+            block_ids = structure_index.candidates(qualifiers, settings)
+        if block_ids is None:
+            block_ids = six.iterkeys(blocks)
+
+        for block_id in block_ids:
+            if _block_matches_all(blocks[block_id]):
                 if not include_orphans:
                     if (  # pylint: disable=bad-continuation
                         block_id.type in DETACHED_XBLOCK_TYPES or
@@ -1337,6 +1589,25 @@ class SplitMongoModuleStore(SplitBulkWriteMixin, ModuleStoreWriteBase):
         else:
             return []
 
+    def _get_structure_index(self, course_key, structure):
+        """
+        Returns the StructureIndex of the given structure, or None if it is a
+        new structure of a bulk operation, which is modified in place until
+        it is saved.
+        """
+        bulk_write_record = self._get_bulk_ops_record(course_key)
+        if bulk_write_record.active and structure['_id'] not in bulk_write_record.structures_in_db:
+            return None
+        structure_index = _STRUCTURE_INDEX_CACHE.get(structure['_id'])
+        if structure_index is None:
+            if any(block_data.definition_loaded for block_data in six.itervalues(structure['blocks'])):
+                # cache_items merged definition fields into the fields of
+                # some blocks, so index the persisted structure instead.
+                structure = self.db_connection.get_structure(structure['_id'], course_key)
+            structure_index = StructureIndex.build(structure)
+            _STRUCTURE_INDEX_CACHE.set(structure['_id'], structure_index, size_in_bytes=len(structure['blocks']))
+        return structure_index
+
     def build_block_key_to_parents_mapping(self, structure):
         """
         Given a structure, builds block_key to parents mapping for all block keys in structure
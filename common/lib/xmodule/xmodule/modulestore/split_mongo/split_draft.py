@@ -283,6 +283,22 @@ class DraftVersioningModuleStore(SplitMongoModuleStore, ModuleStoreDraftAndPubli
         usage_key = self._map_revision_to_branch(usage_key, revision=revision)
         return super(DraftVersioningModuleStore, self).get_item(usage_key, depth=depth, **kwargs)
 
+    def prefetch_definitions(self, usage_key, depth=None, revision=None):
+        """
+        Prefetches the definitions of the given block and its descendants in
+        the given revision.
+        """
+        usage_key = self._map_revision_to_branch(usage_key, revision=revision)
+        return super(DraftVersioningModuleStore, self).prefetch_definitions(usage_key, depth=depth)
+
+    def get_structure_diff(self, course_key, from_version, revision=None):
+        """
+        Returns a StructureDiff of the blocks that changed from the from_version
+        structure of the course to its current structure in the given revision.
+        """
+        course_key = self._map_revision_to_branch(course_key, revision=revision)
+        return super(DraftVersioningModuleStore, self).get_structure_diff(course_key, from_version)
+
     def get_items(self, course_locator, revision=None, **kwargs):
         """
         Returns a list of XModuleDescriptor instances for the matching items within the course with
@@ -0,0 +1,243 @@
+"""
+A write-only filesystem that streams the files written to it into a
+gzipped tarball.
+
+Exporting a course to a tarball used to mean exporting it to a temporary
+directory, then reading every file back to compress it into the tarball,
+which doubled the disk space used by the export and the time spent
+writing it.  A StreamingTarFS instead adds each file to the tarball as
+soon as it is closed, so nothing is staged on disk.  Compressing and
+writing the entries is done by a writer thread, so that it overlaps the
+serialization of the blocks that are exported next.
+
+Files written with `open` are kept in memory until they are closed, which
+is fine for OLX.  Files written with `setbinfile`, such as static assets,
+are copied from the given file object straight into the tarball.
+
+Since the tarball is written sequentially, files can't be read, removed or
+renamed once written.  Writing a file again adds a new entry, which
+replaces the previous one when the tarball is extracted.
+"""
+
+
+import io
+import logging
+import os
+import tarfile
+import threading
+import time
+
+from fs import errors
+from fs.base import FS
+from fs.info import Info
+from fs.mode import Mode
+from fs.path import basename, dirname
+from fs.subfs import SubFS
+from six.moves.queue import Queue
+
+log = logging.getLogger(__name__)
+
+# Number of entries waiting to be written to the tarball before writes block.
+WRITE_QUEUE_SIZE = 64
+
+
+class _EntryFile(io.BytesIO):
+    """
+    A file being written to a StreamingTarFS, which adds it to the tarball
+    when closed.
+    """
+
+    def __init__(self, tar_fs, path):
+        super(_EntryFile, self).__init__()
+        self._tar_fs = tar_fs
+        self._path = path
+
+    def close(self):
+        if not self.closed:
+            data = self.getvalue()
+            super(_EntryFile, self).close()
+            self._tar_fs._add_file(self._path, len(data), io.BytesIO(data))  # pylint: disable=protected-access
+
+
+class StreamingTarFS(FS):
+    """
+    A write-only filesystem that writes a gzipped tarball to the given
+    binary file object.  The tarball is complete once the filesystem is
+    closed, which does not close the file object.
+    """
+
+    _meta = {
+        'case_insensitive': False,
+        'invalid_path_chars': '\0',
+        'max_path_length': None,
+        'max_sys_path_length': None,
+        'network': False,
+        'read_only': False,
+        'supports_rename': False,
+        'thread_safe': True,
+        'unicode_paths': True,
+        'virtual': False,
+    }
+
+    def __init__(self, fileobj, queue_size=WRITE_QUEUE_SIZE):
+        super(StreamingTarFS, self).__init__()
+        self._tar = tarfile.open(fileobj=fileobj, mode='w|gz')
+        self._dirs = {u'/'}
+        self._files = set()
+        self._error = None
+        self._queue = Queue(queue_size)
+        self._writer = threading.Thread(target=self._write_entries)
+        self._writer.daemon = True
+        self._writer.start()
+
+    def __repr__(self):
+        return u'StreamingTarFS({!r})'.format(self._tar.fileobj)
+
+    def _write_entries(self):
+        """
+        Writes the queued entries to the tarball, until None is queued.
+        Entries queued after an error are discarded.
+        """
+        while True:
+            entry = self._queue.get()
+            if entry is None:
+                return
+            tarinfo, fileobj, written = entry
+            try:
+                if self._error is None:
+                    self._tar.addfile(tarinfo, fileobj)
+            except Exception as error:  # pylint: disable=broad-except
+                log.exception(u'Could not write %s to the tarball', tarinfo.name)
+                self._error = error
+            finally:
+                if written is not None:
+                    written.set()
+
+    def _check_error(self):
+        """
+        Raises the error that the writer thread failed with, if any.
+        """
+        if self._error is not None:
+            raise errors.OperationFailed(exc=self._error, msg=u'writing the tarball failed: {details}')
+
+    def _queue_entry(self, path, entry_type, size=0, fileobj=None, wait=False):
+        """
+        Queues an entry of the given type at the given path to be written
+        to the tarball, and waits for it to be written if `wait` is set.
+        """
+        self._check_error()
+        tarinfo = tarfile.TarInfo(path.lstrip(u'/'))
+        tarinfo.type = entry_type
+        tarinfo.mode = 0o755 if entry_type == tarfile.DIRTYPE else 0o644
+        tarinfo.mtime = int(time.time())
+        tarinfo.size = size
+        written = threading.Event() if wait else None
+        self._queue.put((tarinfo, fileobj, written))
+        if written is not None:
+            written.wait()
+            self._check_error()
+
+    def _add_file(self, path, size, fileobj, wait=False):
+        self._queue_entry(path, tarfile.REGTYPE, size, fileobj, wait)
+
+    def _new_file(self, path):
+        """
+        Validates that a file can be written at the given path, and returns
+        its normalized path.
+        """
+        self.check()
+        _path = self.validatepath(path)
+        with self._lock:
+            if _path in self._dirs:
+                raise errors.FileExpected(path)
+            if dirname(_path) not in self._dirs:
+                raise errors.ResourceNotFound(path)
+            self._files.add(_path)
+        return _path
+
+    def getinfo(self, path, namespaces=None):
+        _path = self.validatepath(path)
+        with self._lock:
+            if _path in self._dirs:
+                is_dir = True
+            elif _path in self._files:
+                is_dir = False
+            else:
+                raise errors.ResourceNotFound(path)
+        return Info({'basic': {'name': basename(_path), 'is_dir': is_dir}})
+
+    def listdir(self, path):
+        self.check()
+        _path = self.validatepath(path)
+        with self._lock:
+            if _path not in self._dirs:
+                if _path in self._files:
+                    raise errors.DirectoryExpected(path)
+                raise errors.ResourceNotFound(path)
+            return [
+                basename(entry_path)
+                for entry_path in sorted(self._dirs | self._files)
+                if entry_path != _path and dirname(entry_path) == _path
+            ]
+
+    def makedir(self, path, permissions=None, recreate=False):
+        self.check()
+        _path = self.validatepath(path)
+        with self._lock:
+            if _path in self._dirs:
+                if not recreate:
+                    raise errors.DirectoryExists(path)
+            else:
+                if _path in self._files:
+                    raise errors.DirectoryExists(path)
+                if dirname(_path) not in self._dirs:
+                    raise errors.ResourceNotFound(path)
+                self._dirs.add(_path)
+                self._queue_entry(_path, tarfile.DIRTYPE)
+        return SubFS(self, _path)
+
+    def openbin(self, path, mode='r', buffering=-1, **options):
+        _mode = Mode(mode)
+        _mode.validate_bin()
+        if _mode.reading or _mode.appending:
+            raise errors.Unsupported(path, msg=u'files in a tarball being streamed can only be written')
+        return _EntryFile(self, self._new_file(path))
+
+    def setbinfile(self, path, file):
+        """
+        Copies the given binary file object to the tarball, without reading
+        it into memory if its size can be found by seeking.
+        """
+        try:
+            start = file.tell()
+            file.seek(0, os.SEEK_END)
+            size = file.tell() - start
+            file.seek(start)
+        except (AttributeError, IOError, OSError, ValueError):
+            super(StreamingTarFS, self).setbinfile(path, file)
+            return
+        self._add_file(self._new_file(path), size, file, wait=True)
+
+    def remove(self, path):
+        raise errors.Unsupported(path, msg=u'files in a tarball being streamed cannot be removed')
+
+    def removedir(self, path):
+        raise errors.Unsupported(path, msg=u'directories in a tarball being streamed cannot be removed')
+
+    def setinfo(self, path, info):
+        self.getinfo(path)
+
+    def close(self):
+        """
+        Writes the remaining entries, and completes the tarball.
+        """
+        if self.isclosed():
+            return
+        try:
+            self._queue.put(None)
+            self._writer.join()
+            if self._error is None:
+                self._tar.close()
+        finally:
+            super(StreamingTarFS, self).close()
+        self._check_error()
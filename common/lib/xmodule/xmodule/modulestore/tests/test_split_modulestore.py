@@ -12,9 +12,11 @@ from importlib import import_module
 
 import ddt
 import six
+from bson.objectid import ObjectId
 from ccx_keys.locator import CCXBlockUsageLocator
 from contracts import contract
 from django.core.cache import InvalidCacheBackendError, caches
+from django.test.utils import override_settings
 from mock import patch
 from opaque_keys.edx.locator import BlockUsageLocator, CourseKey, CourseLocator, LocalId, VersionTree
 from path import Path as path
@@ -22,6 +24,7 @@ from six.moves import range
 from xblock.fields import Reference, ReferenceList, ReferenceValueDict
 
 from openedx.core.lib import tempdir
+from openedx.core.lib.cache_utils import ByteSizeLRUCache
 from openedx.core.lib.tests import attr
 from xmodule.course_module import CourseDescriptor
 from xmodule.fields import Date, Timedelta
@@ -35,8 +38,8 @@ from xmodule.modulestore.exceptions import (
     VersionConflictError
 )
 from xmodule.modulestore.inheritance import InheritanceMixin
-from xmodule.modulestore.split_mongo import BlockKey
-from xmodule.modulestore.split_mongo.split import SplitMongoModuleStore
+from xmodule.modulestore.split_mongo import BlockKey, mongo_connection
+from xmodule.modulestore.split_mongo.split import SplitMongoModuleStore, StructureIndex
 from xmodule.modulestore.tests.factories import check_mongo_calls
 from xmodule.modulestore.tests.mongo_connection import MONGO_HOST, MONGO_PORT_NUM
 from xmodule.modulestore.tests.test_modulestore import check_has_course_method
@@ -986,6 +989,41 @@ class TestCourseStructureCache(SplitModuleTest):
         # now make sure that you get the same structure
         self.assertEqual(not_corrupt_structure, not_cached_structure)
 
+    @override_settings(COURSE_STRUCTURE_PROCESS_CACHE_MAX_SIZE_IN_BYTES=10 * 1024 * 1024)
+    @patch('xmodule.modulestore.split_mongo.mongo_connection._PROCESS_STRUCTURE_CACHE', None)
+    @patch('xmodule.modulestore.split_mongo.mongo_connection.get_cache')
+    def test_course_structure_process_cache(self, mock_get_cache):
+        mock_get_cache.return_value = self.cache
+
+        with check_mongo_calls(1):
+            not_cached_structure = self._get_structure(self.new_course)
+
+        # the decoded structure is kept in the process, even once it is
+        # evicted from the django cache
+        self.cache.clear()
+        with check_mongo_calls(0):
+            cached_structure = self._get_structure(self.new_course)
+        self.assertEqual(cached_structure, not_cached_structure)
+
+        # changes to the blocks of a structure, as made when loading them,
+        # don't leak into the cached structure
+        for structure in (not_cached_structure, cached_structure):
+            for block_data in structure['blocks'].values():
+                block_data.fields['leaked'] = True
+                block_data.definition_loaded = True
+                block_data.edit_info._subtree_edited_on = datetime.datetime.now()  # pylint: disable=protected-access
+        self.cache.clear()
+        with check_mongo_calls(0):
+            cached_structure = self._get_structure(self.new_course)
+        for block_data in cached_structure['blocks'].values():
+            self.assertNotIn('leaked', block_data.fields)
+            self.assertFalse(block_data.definition_loaded)
+            self.assertIsNone(block_data.edit_info._subtree_edited_on)  # pylint: disable=protected-access
+
+        mongo_connection.process_structure_cache().clear()
+        with check_mongo_calls(1):
+            self._get_structure(self.new_course)
+
     @patch('xmodule.modulestore.split_mongo.mongo_connection.get_cache')
     def test_course_structure_cache_no_cache_configured(self, mock_get_cache):
         mock_get_cache.side_effect = InvalidCacheBackendError
@@ -1235,6 +1273,114 @@ class SplitModuleItemTests(SplitModuleTest):
         matches = modulestore().get_items(locator, settings={'group_access': {'$exists': False}})
         self.assertEqual(len(matches), 7)
 
+    @patch('xmodule.modulestore.split_mongo.split._STRUCTURE_INDEX_CACHE', ByteSizeLRUCache(1000))
+    def test_get_items_structure_index(self):
+        locator = CourseLocator(org='testx', course='GreekHero', run="run", branch=BRANCH_NAME_DRAFT)
+        with patch.object(StructureIndex, 'build', wraps=StructureIndex.build) as mock_build:
+            matches = modulestore().get_items(locator, qualifiers={'category': 'chapter'})
+            self.assertEqual(len(matches), 4)
+            matches = modulestore().get_items(locator, settings={'group_access': {'$exists': True}})
+            self.assertEqual(len(matches), 1)
+            matches = modulestore().get_items(locator, settings={'group_access': {'$exists': False}})
+            self.assertEqual(len(matches), 7)
+            # The index is built once per structure.
+            self.assertEqual(mock_build.call_count, 1)
+
+        # Blocks created in a bulk operation are found before it ends, and
+        # in the new structure once it ends.
+        course = modulestore().get_course(locator)
+        with modulestore().bulk_operations(locator):
+            modulestore().create_child(self.user_id, course.location, 'chapter', fields={'display_name': 'New'})
+            matches = modulestore().get_items(locator, qualifiers={'category': 'chapter'})
+            self.assertEqual(len(matches), 5)
+        matches = modulestore().get_items(locator, qualifiers={'category': 'chapter'})
+        self.assertEqual(len(matches), 5)
+
+        # The index of a persisted structure is used in bulk operations too.
+        with patch.object(StructureIndex, 'build', wraps=StructureIndex.build) as mock_build:
+            with modulestore().bulk_operations(locator):
+                matches = modulestore().get_items(locator, qualifiers={'category': 'chapter'})
+                self.assertEqual(len(matches), 5)
+            self.assertEqual(mock_build.call_count, 1)
+
+    @patch('xmodule.modulestore.split_mongo.split._STRUCTURE_INDEX_CACHE', ByteSizeLRUCache(1000))
+    def test_get_items_structure_index_matches_scan(self):
+        locator = CourseLocator(org='testx', course='GreekHero', run="run", branch=BRANCH_NAME_DRAFT)
+        queries = [
+            {'qualifiers': {'category': 'chapter'}},
+            {'settings': {'display_name': re.compile(r'Hera')}},
+            {'settings': {'group_access': {'$exists': True}}},
+            {'settings': {'group_access': {'$exists': False}}},
+            # A content field, which is only in the fields of blocks whose
+            # definitions were loaded.
+            {'settings': {'data': {'$exists': True}}},
+        ]
+
+        def get_all_items():
+            """ Returns the locations of the items matching each query """
+            return [
+                sorted(six.text_type(item.location) for item in modulestore().get_items(locator, **query))
+                for query in queries
+            ]
+
+        with modulestore().bulk_operations(locator):
+            # Load the definitions of every block into the structure.
+            modulestore().get_course(locator, depth=None)
+            indexed_items = get_all_items()
+            with patch.object(SplitMongoModuleStore, '_get_structure_index', return_value=None):
+                self.assertEqual(indexed_items, get_all_items())
+
+    @patch('xmodule.modulestore.split_mongo.split.DEFINITION_QUERY_CHUNK_SIZE', 3)
+    def test_prefetch_definitions(self):
+        locator = CourseLocator(org='testx', course='GreekHero', run="run", branch=BRANCH_NAME_DRAFT)
+        course = modulestore().get_course(locator)
+        # Without a bulk operation or a request cache, there is nowhere to
+        # keep the definitions.
+        self.assertEqual(modulestore().prefetch_definitions(course.location), (0, 0))
+
+        with modulestore().bulk_operations(locator):
+            prefetch = modulestore().prefetch_definitions(course.location)
+            self.assertGreater(prefetch.definitions, 3)
+            self.assertEqual(prefetch.queries, (prefetch.definitions + 2) // 3)
+            self.assertEqual(prefetch.round_trips_saved, prefetch.definitions - prefetch.queries)
+
+            structure = modulestore()._lookup_course(locator).structure  # pylint: disable=protected-access
+            blocks = modulestore().descendants(structure['blocks'], structure['root'], None, {})
+            with check_mongo_calls(0):
+                for block in blocks.values():
+                    self.assertIsNotNone(modulestore().get_definition(locator, block.definition))
+
+    def test_get_structure_diff(self):
+        locator = CourseLocator(org='testx', course='GreekHero', run="run", branch=BRANCH_NAME_DRAFT)
+        course = modulestore().get_course(locator)
+        pre_version_guid = course.location.version_guid
+        self.assertEqual(modulestore().get_structure_diff(locator, pre_version_guid), (set(), set(), set(), set()))
+        self.assertIsNone(modulestore().get_structure_diff(locator, ObjectId()))
+
+        problem = modulestore().get_item(BlockUsageLocator(locator, 'problem', block_id="problem3_2"))
+        problem.max_attempts = 4
+        problem.save()
+        modulestore().update_item(problem, self.user_id)
+        diff = modulestore().get_structure_diff(locator, pre_version_guid)
+
+        def usage_key(location):
+            return location.version_agnostic().replace(branch=None)
+
+        self.assertEqual(diff.changed, set())
+        self.assertEqual(diff.changed_subtrees, {usage_key(problem.location)})
+        ancestors = set()
+        parent_location = modulestore().get_parent_location(problem.location)
+        while parent_location is not None:
+            ancestors.add(usage_key(parent_location))
+            parent_location = modulestore().get_parent_location(parent_location)
+        self.assertEqual(diff.ancestors, ancestors)
+        self.assertEqual(diff.deleted, set())
+
+        post_version_guid = modulestore().get_course(locator).location.version_guid
+        modulestore().delete_item(problem.location.version_agnostic(), self.user_id)
+        diff = modulestore().get_structure_diff(locator, post_version_guid)
+        self.assertEqual(diff.deleted, {usage_key(problem.location)})
+
     def test_get_parents(self):
         '''
         get_parent_location(locator): BlockUsageLocator
@@ -10,7 +10,7 @@ import unittest
 import six
 import ddt
 from bson.objectid import ObjectId
-from mock import MagicMock, Mock, call
+from mock import ANY, MagicMock, Mock, call
 from opaque_keys.edx.locator import CourseLocator
 from six.moves import range
 
@@ -47,6 +47,13 @@ class TestBulkWriteMixin(unittest.TestCase):
     def assertCacheNotCleared(self):
         self.assertFalse(self.clear_cache.called)
 
+    def assertInsertedDefinitions(self, *definitions):
+        """
+        Assert that the given definitions were inserted in a single bulk insert.
+        """
+        self.conn.insert_definitions.assert_called_once_with(ANY, self.course_key)
+        six.assertCountEqual(self, definitions, self.conn.insert_definitions.call_args[0][0])
+
 
 class TestBulkWriteMixinPreviousTransaction(TestBulkWriteMixin):
     """
@@ -189,7 +196,7 @@ class TestBulkWriteMixinClosed(TestBulkWriteMixin):
         self.assertConnCalls()
         self.bulk._end_bulk_operation(self.course_key)
         self.assertConnCalls(
-            call.insert_definition(self.definition, self.course_key),
+            call.insert_definitions([self.definition], self.course_key),
             call.update_course_index(
                 {'versions': {self.course_key.branch: self.definition['_id']}},
                 from_index=original_index,
@@ -207,19 +214,12 @@ class TestBulkWriteMixinClosed(TestBulkWriteMixin):
         self.bulk.update_definition(self.course_key.replace(branch='b'), other_definition)
         self.bulk.insert_course_index(self.course_key, {'versions': {'a': self.definition['_id'], 'b': other_definition['_id']}})
         self.bulk._end_bulk_operation(self.course_key)
-        six.assertCountEqual(
-            self,
-            [
-                call.insert_definition(self.definition, self.course_key),
-                call.insert_definition(other_definition, self.course_key),
-                call.update_course_index(
-                    {'versions': {'a': self.definition['_id'], 'b': other_definition['_id']}},
-                    from_index=original_index,
-                    course_context=self.course_key,
-                )
-            ],
-            self.conn.mock_calls
+        self.conn.update_course_index.assert_called_once_with(
+            {'versions': {'a': self.definition['_id'], 'b': other_definition['_id']}},
+            from_index=original_index,
+            course_context=self.course_key,
         )
+        self.assertInsertedDefinitions(self.definition, other_definition)
 
     def test_write_definition_on_close(self):
         self.conn.get_course_index.return_value = None
@@ -228,7 +228,7 @@ class TestBulkWriteMixinClosed(TestBulkWriteMixin):
         self.bulk.update_definition(self.course_key, self.definition)
         self.assertConnCalls()
         self.bulk._end_bulk_operation(self.course_key)
-        self.assertConnCalls(call.insert_definition(self.definition, self.course_key))
+        self.assertConnCalls(call.insert_definitions([self.definition], self.course_key))
 
     def test_write_multiple_definitions_on_close(self):
         self.conn.get_course_index.return_value = None
@@ -239,14 +239,7 @@ class TestBulkWriteMixinClosed(TestBulkWriteMixin):
         self.bulk.update_definition(self.course_key.replace(branch='b'), other_definition)
         self.assertConnCalls()
         self.bulk._end_bulk_operation(self.course_key)
-        six.assertCountEqual(
-            self,
-            [
-                call.insert_definition(self.definition, self.course_key),
-                call.insert_definition(other_definition, self.course_key)
-            ],
-            self.conn.mock_calls
-        )
+        self.assertInsertedDefinitions(self.definition, other_definition)
 
     def test_write_index_and_structure_on_close(self):
         original_index = {'versions': {}}
@@ -485,6 +478,7 @@ class TestBulkWriteMixinFindMethods(TestBulkWriteMixin):
         self.bulk.get_definitions(self.course_key, test_ids)
         self.bulk._end_bulk_operation(self.course_key)
         self.assertFalse(self.conn.insert_definition.called)
+        self.assertFalse(self.conn.insert_definitions.called)
 
     def test_no_bulk_find_structures_derived_from(self):
         ids = [Mock(name='id')]
@@ -3,11 +3,11 @@
 
 import unittest
 
-from mock import patch
-from pymongo.errors import ConnectionFailure
+from mock import Mock, patch
+from pymongo.errors import BulkWriteError, ConnectionFailure
 
 from xmodule.exceptions import HeartbeatFailure
-from xmodule.modulestore.split_mongo.mongo_connection import MongoConnection
+from xmodule.modulestore.split_mongo.mongo_connection import DUPLICATE_KEY_ERROR_CODE, MongoConnection
 
 
 class TestHeartbeatFailureException(unittest.TestCase):
@@ -23,3 +23,33 @@ class TestHeartbeatFailureException(unittest.TestCase):
 
             with self.assertRaises(HeartbeatFailure):
                 useless_conn.heartbeat()
+
+
+class TestInsertDefinitions(unittest.TestCase):
+    """ Test that definitions are inserted in bulk, skipping those already in the db """
+
+    def setUp(self):
+        super(TestInsertDefinitions, self).setUp()
+        with patch('pymongo.MongoClient'), patch('pymongo.database.Database'), patch('mongodb_proxy.MongoProxy'):
+            self.conn = MongoConnection('useless', 'useless', 'useless')
+        self.conn.definitions = Mock()
+        self.definitions = [{'_id': 1, 'fields': {}}, {'_id': 2, 'fields': {}}]
+
+    def _bulk_write_error(self, *codes):
+        return BulkWriteError({
+            'writeErrors': [{'index': index, 'code': code} for index, code in enumerate(codes)],
+            'writeConcernErrors': [],
+        })
+
+    def test_insert_definitions(self):
+        self.conn.insert_definitions(self.definitions)
+        self.conn.definitions.insert_many.assert_called_once_with(self.definitions, ordered=False)
+
+    def test_skip_duplicate_definitions(self):
+        self.conn.definitions.insert_many.side_effect = self._bulk_write_error(DUPLICATE_KEY_ERROR_CODE)
+        self.conn.insert_definitions(self.definitions)
+
+    def test_raise_other_errors(self):
+        self.conn.definitions.insert_many.side_effect = self._bulk_write_error(DUPLICATE_KEY_ERROR_CODE, 2)
+        with self.assertRaises(BulkWriteError):
+            self.conn.insert_definitions(self.definitions)
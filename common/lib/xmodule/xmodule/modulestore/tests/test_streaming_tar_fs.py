@@ -0,0 +1,96 @@
+"""
+Tests for streaming_tar_fs.py
+"""
+
+
+import io
+import os
+import tarfile
+import unittest
+
+from fs import errors
+
+from xmodule.modulestore.streaming_tar_fs import StreamingTarFS
+
+
+class TestStreamingTarFS(unittest.TestCase):
+    """
+    Tests of StreamingTarFS.
+    """
+
+    def _read_tarball(self, fileobj):
+        """
+        Returns the contents of the files in the given tarball, keyed by name,
+        and the names of its directories.
+        """
+        fileobj.seek(0)
+        files = {}
+        dirs = set()
+        with tarfile.open(fileobj=fileobj, mode='r:gz') as tar_file:
+            for member in tar_file.getmembers():
+                if member.isdir():
+                    dirs.add(member.name)
+                else:
+                    files[member.name] = tar_file.extractfile(member).read()
+        return files, dirs
+
+    def test_write(self):
+        output = io.BytesIO()
+        with StreamingTarFS(output) as tar_fs:
+            course_fs = tar_fs.makedir(u'course')
+            with course_fs.open(u'course.xml', 'wb') as course_xml:
+                course_xml.write(b'<course/>')
+            html_fs = course_fs.makedirs(u'html/nested', recreate=True)
+            with html_fs.open(u'intro.html', 'w') as html_file:
+                html_file.write(u'<p>é</p>')
+            self.assertTrue(tar_fs.isfile(u'course/course.xml'))
+            self.assertTrue(tar_fs.isdir(u'course/html'))
+            self.assertEqual(sorted(course_fs.listdir(u'/')), [u'course.xml', u'html'])
+
+        files, dirs = self._read_tarball(output)
+        self.assertEqual(files, {
+            u'course/course.xml': b'<course/>',
+            u'course/html/nested/intro.html': u'<p>é</p>'.encode('utf-8'),
+        })
+        self.assertEqual(dirs, {u'course', u'course/html', u'course/html/nested'})
+
+    def test_setbinfile(self):
+        contents = b'0123456789' * 100000
+        output = io.BytesIO()
+        with StreamingTarFS(output) as tar_fs:
+            static_fs = tar_fs.makedirs(u'course/static')
+            source = io.BytesIO(contents)
+            static_fs.setbinfile(u'video.mp4', source)
+            self.assertFalse(source.closed)
+
+        files, __ = self._read_tarball(output)
+        self.assertEqual(files[u'course/static/video.mp4'], contents)
+
+    def test_write_only(self):
+        output = io.BytesIO()
+        with StreamingTarFS(output) as tar_fs:
+            with tar_fs.open(u'policy.json', 'wb') as policy:
+                policy.write(b'{}')
+            with self.assertRaises(errors.Unsupported):
+                tar_fs.open(u'policy.json', 'rb')
+            with self.assertRaises(errors.Unsupported):
+                tar_fs.remove(u'policy.json')
+            with self.assertRaises(errors.ResourceNotFound):
+                tar_fs.open(u'missing/policy.json', 'wb')
+            with self.assertRaises(errors.DirectoryExists):
+                tar_fs.makedir(u'policy.json')
+
+    def test_write_error(self):
+        class FailingFile(io.BytesIO):
+            """
+            A file that can't be written to.
+            """
+            def write(self, data):
+                raise IOError('disk full')
+
+        tar_fs = StreamingTarFS(FailingFile())
+        with tar_fs.open(u'video.mp4', 'wb') as video:
+            video.write(os.urandom(100000))
+        with self.assertRaises(errors.OperationFailed):
+            tar_fs.close()
+        self.assertTrue(tar_fs.isclosed())
@@ -4,7 +4,6 @@ Methods for exporting course data to XML
 
 
 import logging
-import os
 from abc import abstractmethod
 from json import dumps
 
@@ -22,6 +21,7 @@ from xmodule.modulestore import LIBRARY_ROOT, EdxJSONEncoder, ModuleStoreEnum
 from xmodule.modulestore.draft_and_published import DIRECT_ONLY_CATEGORIES
 from xmodule.modulestore.inheritance import own_metadata
 from xmodule.modulestore.store_utilities import draft_node_constructor, get_draft_subtree_roots
+from xmodule.modulestore.streaming_tar_fs import StreamingTarFS
 
 DRAFT_DIR = "drafts"
 PUBLISHED_DIR = "published"
@@ -155,9 +155,22 @@ class ExportManager(object):
         """
         Perform the export given the parameters handed to this class at init.
         """
+        self.export_to_fs(OSFS(self.root_dir))
+
+    def export_to_tarball(self, fileobj):
+        """
+        Perform the export into a gzipped tarball written to the binary file object `fileobj`,
+        without staging the exported files on disk. `root_dir` is not used.
+        """
+        with StreamingTarFS(fileobj) as tar_fs:
+            self.export_to_fs(tar_fs)
+
+    def export_to_fs(self, fsm):
+        """
+        Perform the export into the `target_dir` directory of the filesystem `fsm`.
+        """
         with self.modulestore.bulk_operations(self.courselike_key):
 
-            fsm = OSFS(self.root_dir)
             root = lxml.etree.Element('unknown')
 
             # export only the published content
@@ -175,7 +188,7 @@ class ExportManager(object):
             self.process_root(root, export_fs)
 
             # Process extra items-- drafts, assets, etc
-            root_courselike_dir = self.root_dir + '/' + self.target_dir
+            root_courselike_dir = self.root_dir + '/' + self.target_dir if self.root_dir else None
             self.process_extra(root, courselike, root_courselike_dir, xml_centric_courselike_key, export_fs)
 
             # Any last pass adjustments
@@ -205,16 +218,14 @@ class CourseExportManager(ExportManager):
 
     def process_extra(self, root, courselike, root_courselike_dir, xml_centric_courselike_key, export_fs):
         # Export the modulestore's asset metadata.
-        asset_dir = root_courselike_dir + '/' + AssetMetadata.EXPORTED_ASSET_DIR + '/'
-        if not os.path.isdir(asset_dir):
-            os.makedirs(asset_dir)
+        asset_dir = export_fs.makedir(AssetMetadata.EXPORTED_ASSET_DIR, recreate=True)
         asset_root = lxml.etree.Element(AssetMetadata.ALL_ASSETS_XML_TAG)
         course_assets = self.modulestore.get_all_asset_metadata(self.courselike_key, None)
         for asset_md in course_assets:
             # All asset types are exported using the "asset" tag - but their asset type is specified in each asset key.
             asset = lxml.etree.SubElement(asset_root, AssetMetadata.ASSET_XML_TAG)
             asset_md.to_xml(asset)
-        with OSFS(asset_dir).open(AssetMetadata.EXPORTED_ASSET_FILENAME, 'wb') as asset_xml_file:
+        with asset_dir.open(AssetMetadata.EXPORTED_ASSET_FILENAME, 'wb') as asset_xml_file:
             lxml.etree.ElementTree(asset_root).write(asset_xml_file, encoding='utf-8')
 
         # export the static assets
@@ -222,8 +233,9 @@ class CourseExportManager(ExportManager):
         if self.contentstore:
             self.contentstore.export_all_for_course(
                 self.courselike_key,
-                root_courselike_dir + '/static/',
-                root_courselike_dir + '/policies/assets.json',
+                u'static',
+                u'policies/assets.json',
+                output_fs=export_fs,
             )
 
             # If we are using the default course image, export it to the
@@ -239,10 +251,8 @@ class CourseExportManager(ExportManager):
                 except NotFoundError:
                     pass
                 else:
-                    output_dir = root_courselike_dir + '/static/images/'
-                    if not os.path.isdir(output_dir):
-                        os.makedirs(output_dir)
-                    with OSFS(output_dir).open(u'course_image.jpg', 'wb') as course_image_file:
+                    output_dir = export_fs.makedirs(u'static/images', recreate=True)
+                    with output_dir.open(u'course_image.jpg', 'wb') as course_image_file:
                         course_image_file.write(course_image.data)
 
         # export the static tabs
@@ -321,8 +331,9 @@ class LibraryExportManager(ExportManager):
         if self.contentstore:
             self.contentstore.export_all_for_course(
                 self.courselike_key,
-                self.root_dir + '/' + self.target_dir + '/static/',
-                self.root_dir + '/' + self.target_dir + '/policies/assets.json',
+                u'static',
+                u'policies/assets.json',
+                output_fs=export_fs,
             )
 
     def post_process(self, root, export_fs):
@@ -352,6 +363,22 @@ def export_library_to_xml(modulestore, contentstore, library_key, root_dir, libr
     LibraryExportManager(modulestore, contentstore, library_key, root_dir, library_dir).export()
 
 
+def export_course_to_tarball(modulestore, contentstore, course_key, fileobj, course_dir):
+    """
+    Thin wrapper for the Course Export Manager, which streams the export into a gzipped tarball
+    written to `fileobj`. See ExportManager.export_to_tarball for details.
+    """
+    CourseExportManager(modulestore, contentstore, course_key, None, course_dir).export_to_tarball(fileobj)
+
+
+def export_library_to_tarball(modulestore, contentstore, library_key, fileobj, library_dir):
+    """
+    Thin wrapper for the Library Export Manager, which streams the export into a gzipped tarball
+    written to `fileobj`. See ExportManager.export_to_tarball for details.
+    """
+    LibraryExportManager(modulestore, contentstore, library_key, None, library_dir).export_to_tarball(fileobj)
+
+
 def adapt_references(subtree, destination_course_key, export_fs):
     """
     Map every reference in the subtree into destination_course_key and set it back into the xblock fields
@@ -29,6 +29,7 @@ import mimetypes
 import os
 import re
 from abc import abstractmethod
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 
 import six
 import xblock
@@ -61,6 +62,9 @@ log = logging.getLogger(__name__)
 
 DEFAULT_STATIC_CONTENT_SUBDIR = 'static'
 
+# Number of static files saved to the content store concurrently during import.
+STATIC_CONTENT_IMPORT_WORKERS = 4
+
 
 class LocationMixin(XBlockMixin):
     """
@@ -84,10 +88,11 @@ class LocationMixin(XBlockMixin):
 
 
 class StaticContentImporter:
-    def __init__(self, static_content_store, course_data_path, target_id):
+    def __init__(self, static_content_store, course_data_path, target_id, max_workers=STATIC_CONTENT_IMPORT_WORKERS):
         self.static_content_store = static_content_store
         self.target_id = target_id
         self.course_data_path = course_data_path
+        self.max_workers = max_workers
         try:
             with open(course_data_path / 'policies/assets.json') as f:
                 self.policy = json.load(f)
@@ -101,9 +106,38 @@ class StaticContentImporter:
         self.mimetypes_list = list(mimetypes.types_map.values())
 
     def import_static_content_directory(self, content_subdir=DEFAULT_STATIC_CONTENT_SUBDIR, verbose=False):
+        """
+        Import the static files in the given subdirectory of the course, saving up to
+        `max_workers` of them concurrently.
+
+        Returns the asset key of each imported file, keyed by its path in the directory.
+        """
         remap_dict = {}
 
         static_dir = self.course_data_path / content_subdir
+        file_paths = self._static_file_paths(static_dir, verbose)
+        if self.max_workers > 1:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                # Only read the files that are about to be saved, to bound memory use.
+                pending = set()
+                for file_path in file_paths:
+                    if len(pending) >= 2 * self.max_workers:
+                        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                        self._update_remap_dict(remap_dict, (future.result() for future in done))
+                    pending.add(executor.submit(self.import_static_file, file_path, base_dir=static_dir))
+                self._update_remap_dict(remap_dict, (future.result() for future in wait(pending).done))
+        else:
+            self._update_remap_dict(
+                remap_dict,
+                (self.import_static_file(file_path, base_dir=static_dir) for file_path in file_paths),
+            )
+
+        return remap_dict
+
+    def _static_file_paths(self, static_dir, verbose):
+        """
+        Yields the path of each static file to import in the given directory.
+        """
         for dirname, _, filenames in os.walk(static_dir):
             for filename in filenames:
 
@@ -117,14 +151,18 @@ class StaticContentImporter:
                 if verbose:
                     log.debug('importing static content %s...', file_path)
 
-                imported_file_attrs = self.import_static_file(file_path, base_dir=static_dir)
-
-                if imported_file_attrs:
-                    # store the remapping information which will be needed
-                    # to subsitute in the module data
-                    remap_dict[imported_file_attrs[0]] = imported_file_attrs[1]
+                yield file_path
 
-        return remap_dict
+    @staticmethod
+    def _update_remap_dict(remap_dict, imported_files_attrs):
+        """
+        Adds the results of import_static_file to the remap dict.
+        """
+        for imported_file_attrs in imported_files_attrs:
+            if imported_file_attrs:
+                # store the remapping information which will be needed
+                # to subsitute in the module data
+                remap_dict[imported_file_attrs[0]] = imported_file_attrs[1]
 
     def import_static_file(self, full_file_path, base_dir):
         filename = os.path.basename(full_file_path)
@@ -221,6 +259,8 @@ class ImportManager(object):
         python_lib_filename: The filename of the courselike's python library. Course authors can optionally
             create this file to implement custom logic in their course.
 
+        static_content_import_workers: The number of static files saved to static_content_store concurrently.
+
         default_class, load_error_modules: are arguments for constructing the XMLModuleStore (see its doc)
     """
     store_class = XMLModuleStore
@@ -234,6 +274,7 @@ class ImportManager(object):
             create_if_not_present=False, raise_on_failure=False,
             static_content_subdir=DEFAULT_STATIC_CONTENT_SUBDIR,
             python_lib_filename='python_lib.zip',
+            static_content_import_workers=STATIC_CONTENT_IMPORT_WORKERS,
     ):
         self.store = store
         self.user_id = user_id
@@ -245,6 +286,7 @@ class ImportManager(object):
         self.verbose = verbose
         self.static_content_subdir = static_content_subdir
         self.python_lib_filename = python_lib_filename
+        self.static_content_import_workers = static_content_import_workers
         self.do_import_static = do_import_static
         self.do_import_python_lib = do_import_python_lib
         self.create_if_not_present = create_if_not_present
@@ -280,7 +322,8 @@ class ImportManager(object):
         static_content_importer = StaticContentImporter(
             self.static_content_store,
             course_data_path=data_path,
-            target_id=dest_id
+            target_id=dest_id,
+            max_workers=self.static_content_import_workers,
         )
         if self.do_import_static:
             if self.verbose:
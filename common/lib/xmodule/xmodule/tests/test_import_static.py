@@ -54,3 +54,25 @@ class IgnoredFilesTestCase(unittest.TestCase):
         self.assertNotIn("._example.txt", name_val)
         self.assertNotIn(".DS_Store", name_val)
         self.assertNotIn("example.txt~", name_val)
+
+    def test_concurrent_import(self):
+        """
+        Test that saving the static files concurrently imports the same files as saving them one at a time.
+        """
+        course_id = CourseLocator("edX", "toy", "2012_Fall")
+        results = []
+        for max_workers in (1, 4):
+            content_store = Mock()
+            content_store.generate_thumbnail.return_value = (None, None)
+            static_content_importer = StaticContentImporter(
+                static_content_store=content_store,
+                course_data_path=DATA_DIR / "toy",
+                target_id=course_id,
+                max_workers=max_workers,
+            )
+            remap_dict = static_content_importer.import_static_content_directory()
+            saved_names = sorted(call[0][0].import_path for call in content_store.save.call_args_list)
+            self.assertEqual(saved_names, sorted(remap_dict))
+            results.append(remap_dict)
+        self.assertTrue(results[0])
+        self.assertEqual(results[0], results[1])
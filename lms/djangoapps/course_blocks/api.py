@@ -4,6 +4,7 @@ get_course_blocks function.
 """
 
 
+import six
 from django.conf import settings
 from edx_when import field_data
 
@@ -97,3 +98,42 @@ def get_course_blocks(
         starting_block_usage_key,
         collected_block_structure,
     )
+
+
+def get_course_blocks_for_users(
+        users,
+        starting_block_usage_key,
+        collected_block_structure=None,
+):
+    """
+    A higher order function implemented on top of the
+    block_structure.get_transformed_for_each function yielding a
+    (user, transformed block structure) pair for each of the given users,
+    as get_course_blocks would return with the default transformers.
+
+    The collected block structure is retrieved at most once and shared
+    across users, with each user's transformation applied to a cheap copy
+    of it.  See BlockStructureManager.get_transformed_for_each.
+
+    Arguments:
+        users (iterable(django.contrib.auth.models.User)) - User objects
+            for which the block structure is to be transformed.
+
+        starting_block_usage_key (UsageKey) - See get_course_blocks.
+
+        collected_block_structure (BlockStructureBlockData) - See
+            get_course_blocks.
+    """
+    users = list(users)
+    transformers_list = []
+    for user in users:
+        transformers = BlockStructureTransformers(get_course_block_access_transformers(user))
+        transformers.usage_info = CourseUsageInfo(starting_block_usage_key.course_key, user)
+        transformers_list.append(transformers)
+
+    block_structures = get_block_structure_manager(starting_block_usage_key.course_key).get_transformed_for_each(
+        transformers_list,
+        starting_block_usage_key,
+        collected_block_structure,
+    )
+    return six.moves.zip(users, block_structures)
@@ -0,0 +1,54 @@
+"""
+Tests for the Course Blocks API.
+"""
+
+
+from openedx.core.djangoapps.content.block_structure.api import get_course_in_cache
+from student.tests.factories import CourseEnrollmentFactory, UserFactory
+from xmodule.modulestore.tests.django_utils import ModuleStoreTestCase
+from xmodule.modulestore.tests.factories import CourseFactory, ItemFactory
+
+from ..api import get_course_blocks, get_course_blocks_for_users
+
+
+class GetCourseBlocksForUsersTestCase(ModuleStoreTestCase):
+    """
+    Tests for get_course_blocks_for_users.
+    """
+    def setUp(self):
+        super(GetCourseBlocksForUsersTestCase, self).setUp()
+        self.course = CourseFactory.create()
+        chapter = ItemFactory.create(parent_location=self.course.location, category='chapter')
+        self.visible_block = ItemFactory.create(parent_location=chapter.location, category='sequential')
+        self.staff_only_block = ItemFactory.create(
+            parent_location=chapter.location,
+            category='sequential',
+            metadata={'visible_to_staff_only': True},
+        )
+        self.student = UserFactory.create()
+        self.staff = UserFactory.create(is_staff=True)
+        for user in (self.student, self.staff):
+            CourseEnrollmentFactory.create(user=user, course_id=self.course.id)
+
+    def test_get_course_blocks_for_users(self):
+        collected_block_structure = get_course_in_cache(self.course.id)
+        users = [self.student, self.staff, self.student]
+        user_block_structures = list(get_course_blocks_for_users(
+            users,
+            self.course.location,
+            collected_block_structure=collected_block_structure,
+        ))
+
+        self.assertEqual([user for user, _ in user_block_structures], users)
+        for user, block_structure in user_block_structures:
+            self.assertSetEqual(
+                set(block_structure.get_block_keys()),
+                set(get_course_blocks(user, self.course.location).get_block_keys()),
+            )
+            self.assertIn(self.visible_block.location, block_structure)
+        self.assertNotIn(self.staff_only_block.location, user_block_structures[0][1])
+        self.assertIn(self.staff_only_block.location, user_block_structures[1][1])
+        self.assertNotIn(self.staff_only_block.location, user_block_structures[2][1])
+
+        # The collected block structure is left untransformed.
+        self.assertIn(self.staff_only_block.location, collected_block_structure)
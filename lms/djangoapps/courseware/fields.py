@@ -3,7 +3,15 @@ Custom fields
 """
 
 
-from django.db.models.fields import AutoField
+import base64
+import zlib
+
+from django.conf import settings
+from django.db.models.fields import AutoField, TextField
+
+# Prefix of text compressed by CompactTextField: the version of the encoding.
+# Stored JSON text can never start with it.
+COMPACT_TEXT_PREFIX = u'z1:'
 
 
 class UnsignedBigIntAutoField(AutoField):
@@ -34,3 +42,43 @@ class UnsignedBigIntAutoField(AutoField):
             return "BIGSERIAL"
         else:
             return None
+
+
+class CompactTextField(TextField):
+    """
+    A TextField whose values can be stored compressed.
+
+    Values at least settings.COMPACT_STUDENT_MODULE_STATE['COMPRESSION_MIN_LENGTH']
+    long are stored zlib compressed and base64 encoded, behind a prefix
+    identifying the version of the encoding.  Values are always returned
+    decoded, whether or not they are stored compressed, so that rows can
+    be converted gradually.
+    """
+    def from_db_value(self, value, expression, connection, context):  # pylint: disable=unused-argument
+        return decode_compact_text(value)
+
+    def to_python(self, value):
+        return decode_compact_text(super(CompactTextField, self).to_python(value))
+
+    def get_prep_value(self, value):
+        value = super(CompactTextField, self).get_prep_value(value)
+        min_length = settings.COMPACT_STUDENT_MODULE_STATE.get('COMPRESSION_MIN_LENGTH')
+        if value is not None and min_length is not None and len(value) >= min_length:
+            return encode_compact_text(value)
+        return value
+
+
+def encode_compact_text(value):
+    """
+    Returns the compressed encoding of the given text.
+    """
+    return COMPACT_TEXT_PREFIX + base64.b64encode(zlib.compress(value.encode('utf-8'))).decode('ascii')
+
+
+def decode_compact_text(value):
+    """
+    Returns the given text, decoded if it is compressed.
+    """
+    if value is not None and value.startswith(COMPACT_TEXT_PREFIX):
+        return zlib.decompress(base64.b64decode(value[len(COMPACT_TEXT_PREFIX):])).decode('utf-8')
+    return value
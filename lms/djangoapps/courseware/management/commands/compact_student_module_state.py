@@ -0,0 +1,176 @@
+"""
+Convert existing StudentModule states and their history to the compact
+encodings configured in settings.COMPACT_STUDENT_MODULE_STATE.
+
+StudentModule states at least COMPRESSION_MIN_LENGTH long are rewritten
+compressed.  With --history, and HISTORY_DELTAS enabled, the history
+entries of the converted StudentModules are rewritten as deltas against
+earlier full entries where that makes them smaller.  Entries that deltas
+are against, and the latest entry of each StudentModule, which new
+entries may be written as deltas against meanwhile, are kept full.
+
+Rows are converted in batches of StudentModule ids, so the command can be
+stopped and resumed from the last reported id with --start-id.
+"""
+
+
+import logging
+import time
+from itertools import groupby
+from textwrap import dedent
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Case, F, Max, Value, When
+
+from coursewarehistoryextended.models import StudentModuleHistoryExtended
+from lms.djangoapps.courseware.fields import COMPACT_TEXT_PREFIX
+from lms.djangoapps.courseware.models import StudentModule, StudentModuleHistory
+
+log = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    """
+    Example usage:
+        $ ./manage.py lms compact_student_module_state --history --batch-size 1000 --sleep 0.5
+    """
+    help = dedent(__doc__).strip()
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help=u'Number of StudentModule ids to convert at a time.',
+        )
+        parser.add_argument(
+            '--sleep',
+            type=float,
+            default=0,
+            help=u'Seconds to sleep between batches.',
+        )
+        parser.add_argument(
+            '--start-id',
+            type=int,
+            default=0,
+            help=u'StudentModule id to start from.',
+        )
+        parser.add_argument(
+            '--history',
+            action='store_true',
+            help=u'Also convert the history entries of the StudentModules.',
+        )
+
+    def handle(self, *args, **options):
+        min_length = settings.COMPACT_STUDENT_MODULE_STATE.get('COMPRESSION_MIN_LENGTH')
+        history_deltas = options['history'] and settings.COMPACT_STUDENT_MODULE_STATE.get('HISTORY_DELTAS')
+        if min_length is None and not history_deltas:
+            raise CommandError(u'No compact encoding is enabled in COMPACT_STUDENT_MODULE_STATE.')
+
+        history_models = [StudentModuleHistoryExtended, StudentModuleHistory] if options['history'] else []
+        batch_size = options['batch_size']
+        max_id = StudentModule.objects.aggregate(Max('id'))['id__max'] or 0
+
+        for start_id in range(options['start_id'], max_id + 1, batch_size):
+            end_id = start_id + batch_size
+            num_states = 0
+            if min_length is not None:
+                num_states = self._compress_states(start_id, end_id, min_length)
+            num_entries = sum(
+                self._compact_history(history_model, start_id, end_id, min_length, history_deltas)
+                for history_model in history_models
+            )
+            log.info(
+                u'Converted %d states and %d history entries of StudentModules %d to %d.',
+                num_states, num_entries, start_id, end_id - 1,
+            )
+            if options['sleep']:
+                time.sleep(options['sleep'])
+
+    def _compress_states(self, start_id, end_id, min_length):
+        """
+        Rewrites the uncompressed states of the StudentModules in the given
+        range of ids that are long enough to be compressed, and returns
+        their number.  States modified since they were read are left as is.
+        """
+        student_modules = [
+            student_module
+            for student_module in StudentModule.objects.filter(
+                id__gte=start_id,
+                id__lt=end_id,
+            ).exclude(
+                state__startswith=COMPACT_TEXT_PREFIX,
+            ).only('id', 'state', 'modified')
+            if student_module.state is not None and len(student_module.state) >= min_length
+        ]
+        if student_modules:
+            state_field = StudentModule._meta.get_field('state')  # pylint: disable=protected-access
+            # Neither the modification date nor the history of the rows is
+            # updated, since their states are unchanged.
+            StudentModule.objects.filter(
+                id__in=[student_module.id for student_module in student_modules],
+            ).update(
+                state=Case(
+                    *[
+                        When(
+                            id=student_module.id,
+                            modified=student_module.modified,
+                            then=Value(student_module.state, output_field=state_field),
+                        )
+                        for student_module in student_modules
+                    ],
+                    default=F('state'),
+                    output_field=state_field
+                ),
+            )
+        return len(student_modules)
+
+    def _compact_history(self, history_model, start_id, end_id, min_length, history_deltas):
+        """
+        Rewrites the history entries of the StudentModules in the given
+        range of ids, as deltas against earlier full entries where enabled
+        and smaller, and compressed otherwise, and returns their number.
+        """
+        entries = history_model.objects.filter(
+            student_module_id__gte=start_id,
+            student_module_id__lt=end_id,
+        ).only('id', 'student_module_id', 'state').order_by('student_module_id', 'id')
+
+        new_states = {}
+        for _, module_entries in groupby(entries, lambda entry: entry.student_module_id):
+            module_entries = list(module_entries)
+            # Entries that deltas are against must stay full, and so must
+            # the latest entry, which live writes may use as a base.
+            base_ids = {
+                history_model._delta_base_id(entry.state)  # pylint: disable=protected-access
+                for entry in module_entries
+                if history_model.is_delta(entry.state)
+            }
+            base_ids.add(module_entries[-1].id)
+            base_entry = None
+            for entry in module_entries:
+                if entry.state is None or history_model.is_delta(entry.state):
+                    continue
+                delta = None
+                if history_deltas and base_entry is not None and entry.id not in base_ids:
+                    delta = history_model.encode_delta(base_entry.id, base_entry.state, entry.state)
+                if delta is not None:
+                    new_states[entry.id] = delta
+                else:
+                    base_entry = entry
+                    if min_length is not None and len(entry.state) >= min_length:
+                        new_states[entry.id] = entry.state
+
+        if new_states:
+            state_field = history_model._meta.get_field('state')  # pylint: disable=protected-access
+            history_model.objects.filter(id__in=list(new_states)).update(
+                state=Case(
+                    *[
+                        When(id=entry_id, then=Value(state, output_field=state_field))
+                        for entry_id, state in new_states.items()
+                    ],
+                    output_field=state_field
+                ),
+            )
+        return len(new_states)
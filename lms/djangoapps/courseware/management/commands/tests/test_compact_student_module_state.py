@@ -0,0 +1,117 @@
+"""
+Tests for the compact_student_module_state management command.
+"""
+
+
+import json
+
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+from django.test.utils import override_settings
+
+from coursewarehistoryextended.models import StudentModuleHistoryExtended
+from lms.djangoapps.courseware.fields import COMPACT_TEXT_PREFIX
+from lms.djangoapps.courseware.models import BaseStudentModuleHistory, StudentModule
+from lms.djangoapps.courseware.tests.factories import StudentModuleFactory
+
+COMPACT_SETTINGS = dict(COMPRESSION_MIN_LENGTH=100, HISTORY_DELTAS=True)
+
+
+class CompactStudentModuleStateTest(TestCase):
+    """
+    Tests for converting StudentModule states and history to their compact encodings.
+    """
+    # Tell Django to clean out all databases, not just default
+    multi_db = True
+
+    def setUp(self):
+        super(CompactStudentModuleStateTest, self).setUp()
+        self.states = [
+            json.dumps({'input_state': {'input_1': 'x' * 500}, 'attempts': attempts})
+            for attempts in range(3)
+        ]
+        self.student_module = StudentModuleFactory(state=self.states[0])
+        for state in self.states[1:]:
+            self.student_module.state = state
+            self.student_module.save()
+
+    def assert_history(self):
+        """
+        Asserts that the full states of the StudentModule are read back,
+        latest first, from its history.
+        """
+        self.assertEqual(
+            [json.loads(entry.state) for entry in BaseStudentModuleHistory.get_history([self.student_module])],
+            [json.loads(state) for state in reversed(self.states)],
+        )
+
+    def test_no_encoding_enabled(self):
+        with self.assertRaises(CommandError):
+            call_command('compact_student_module_state')
+
+    @override_settings(COMPACT_STUDENT_MODULE_STATE=COMPACT_SETTINGS)
+    def test_compact_state(self):
+        call_command('compact_student_module_state', '--history', '--batch-size', '1')
+
+        # The rows are stored compressed, but read back decoded.
+        self.assertTrue(StudentModule.objects.filter(state__startswith=COMPACT_TEXT_PREFIX).exists())
+        self.assertEqual(StudentModule.objects.get(id=self.student_module.id).state, self.states[-1])
+
+        history_entries = StudentModuleHistoryExtended.objects.filter(student_module_id=self.student_module.id)
+        self.assertEqual(
+            [StudentModuleHistoryExtended.is_delta(entry.state) for entry in history_entries.order_by('id')],
+            [False, True, False],
+        )
+        self.assert_history()
+
+    @override_settings(COMPACT_STUDENT_MODULE_STATE=COMPACT_SETTINGS)
+    def test_compact_history_with_deltas(self):
+        # Written as a delta against the latest entry, which the command
+        # must then keep full.
+        self.states.append(json.dumps({'input_state': {'input_1': 'x' * 500}, 'attempts': 3}))
+        self.student_module.state = self.states[-1]
+        self.student_module.save()
+
+        call_command('compact_student_module_state', '--history')
+
+        history_entries = StudentModuleHistoryExtended.objects.filter(student_module_id=self.student_module.id)
+        self.assertEqual(
+            [StudentModuleHistoryExtended.is_delta(entry.state) for entry in history_entries.order_by('id')],
+            [False, True, False, True],
+        )
+        self.assert_history()
+
+    def test_resolve_delta_chain(self):
+        entries = list(
+            StudentModuleHistoryExtended.objects.filter(student_module_id=self.student_module.id).order_by('id')
+        )
+        # Entries rewritten as deltas against entries that are deltas themselves.
+        for base_entry, entry in zip(entries, entries[1:]):
+            delta = StudentModuleHistoryExtended.encode_delta(base_entry.id, base_entry.state, entry.state)
+            StudentModuleHistoryExtended.objects.filter(id=entry.id).update(state=delta)
+        self.assert_history()
+
+    def test_resolve_missing_delta_base(self):
+        entries = list(
+            StudentModuleHistoryExtended.objects.filter(student_module_id=self.student_module.id).order_by('id')
+        )
+        delta = StudentModuleHistoryExtended.encode_delta(entries[0].id, entries[0].state, entries[1].state)
+        StudentModuleHistoryExtended.objects.filter(id=entries[1].id).update(state=delta)
+        entries[0].delete()
+
+        self.assertEqual(
+            [entry.state for entry in BaseStudentModuleHistory.get_history([self.student_module])],
+            [self.states[2], None],
+        )
+
+    @override_settings(COMPACT_STUDENT_MODULE_STATE=COMPACT_SETTINGS)
+    def test_new_history_entries(self):
+        self.states.append(json.dumps({'input_state': {'input_1': 'x' * 500}, 'attempts': 3}))
+        self.student_module.state = self.states[-1]
+        self.student_module.save()
+
+        latest_entry = StudentModuleHistoryExtended.objects.filter(
+            student_module_id=self.student_module.id,
+        ).latest('id')
+        self.assertTrue(StudentModuleHistoryExtended.is_delta(latest_entry.state))
+        self.assert_history()
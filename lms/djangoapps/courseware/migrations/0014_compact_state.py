@@ -0,0 +1,26 @@
+# -*- coding: utf-8 -*-
+
+
+from django.db import migrations
+
+import lms.djangoapps.courseware.fields
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courseware', '0013_auto_20191001_1858'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='studentmodule',
+            name='state',
+            field=lms.djangoapps.courseware.fields.CompactTextField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='studentmodulehistory',
+            name='state',
+            field=lms.djangoapps.courseware.fields.CompactTextField(blank=True, null=True),
+        ),
+    ]
@@ -19,17 +19,24 @@ UserStateSummaryCache: A cache for Scope.user_state_summary
 PreferencesCache: A cache for Scope.preferences
 UserInfoCache: A cache for Scope.user_info
 DjangoOrmFieldCache: A base-class for single-row-per-field caches.
+
+:func:`deferred_user_state_writes`: A context manager in which the user state
+    set through FieldDataCaches is written once, on exit, rather than on each
+    change.
 """
 
 
 import json
 import logging
+import sys
 from abc import ABCMeta, abstractmethod
 from collections import defaultdict, namedtuple
+from contextlib import contextmanager
 
 import six
 from contracts import contract, new_contract
 from django.db import DatabaseError, IntegrityError, transaction
+from edx_django_utils.cache import RequestCache
 from opaque_keys.edx.asides import AsideUsageKeyV1, AsideUsageKeyV2
 from opaque_keys.edx.block_types import BlockTypeKeyV1
 from opaque_keys.edx.keys import LearningContextKey
@@ -45,6 +52,8 @@ from .models import StudentModule, XModuleStudentInfoField, XModuleStudentPrefsF
 
 log = logging.getLogger(__name__)
 
+WRITE_BEHIND_NAMESPACE = u'courseware.model_data.write_behind'
+
 
 class InvalidWriteError(Exception):
     """
@@ -69,6 +78,64 @@ def _all_usage_keys(descriptors, aside_types):
     return usage_ids
 
 
+@contextmanager
+def deferred_user_state_writes(enabled=True):
+    """
+    Context manager in which the user state set through the FieldDataCaches
+    created within it is buffered, and written once for each FieldDataCache
+    on exit, rather than on each change.  The state of scorable blocks is
+    still written on each change, along with any buffered state.
+
+    Every FieldDataCache is flushed, even if flushing another one fails, or
+    the code within the context raised, in which case that exception is
+    raised rather than any flush error.
+
+    Arguments:
+        enabled (bool): If False, writes are not deferred.
+
+    Raises: KeyValueMultiSaveError if the state of any FieldDataCache fails to save
+    """
+    if not enabled:
+        yield
+        return
+
+    request_cache = RequestCache(WRITE_BEHIND_NAMESPACE).data
+    outer_field_data_caches = request_cache.get('field_data_caches')
+    field_data_caches = request_cache['field_data_caches'] = []
+    try:
+        yield
+    except BaseException:
+        exc_info = sys.exc_info()
+        request_cache['field_data_caches'] = outer_field_data_caches
+        _flush_field_data_caches(field_data_caches)
+        six.reraise(*exc_info)
+    request_cache['field_data_caches'] = outer_field_data_caches
+    if _flush_field_data_caches(field_data_caches):
+        raise KeyValueMultiSaveError([])
+
+
+def _flush_field_data_caches(field_data_caches):
+    """
+    Flushes each of the given FieldDataCaches, and returns the
+    KeyValueMultiSaveErrors raised by those that failed.
+    """
+    errors = []
+    for field_data_cache in field_data_caches:
+        try:
+            field_data_cache.flush()
+        except KeyValueMultiSaveError as exc:
+            errors.append(exc)
+    return errors
+
+
+def _write_behind_field_data_caches():
+    """
+    Returns the list of FieldDataCaches to flush on exit of the innermost
+    deferred_user_state_writes context, or None if there is none.
+    """
+    return RequestCache(WRITE_BEHIND_NAMESPACE).data.get('field_data_caches')
+
+
 def _all_block_types(descriptors, aside_types):
     """
     Return a set of all block_types for the supplied `descriptors` and for
@@ -345,12 +412,19 @@ class DjangoOrmFieldCache(six.with_metaclass(ABCMeta, object)):
 class UserStateCache(object):
     """
     Cache for Scope.user_state xblock field data.
+
+    In write-behind mode, the state set for blocks other than the given
+    scorable locations is buffered until the next call to flush, or until
+    state is set for a scorable block.
     """
-    def __init__(self, user, course_id):
+    def __init__(self, user, course_id, write_behind=False, scorable_locations=()):
         self._cache = defaultdict(dict)
         self.course_id = course_id
         self.user = user
         self._client = DjangoXBlockUserStateClient(self.user)
+        self._write_behind = write_behind
+        self._scorable_locations = scorable_locations
+        self._pending_updates = defaultdict(dict)
 
     def cache_fields(self, fields, xblocks, aside_types):  # pylint: disable=unused-argument
         """
@@ -390,6 +464,7 @@ class UserStateCache(object):
 
         Returns: datetime if there was a modified date, or None otherwise
         """
+        self.flush()
         try:
             return self._client.get(
                 self.user.username,
@@ -414,6 +489,32 @@ class UserStateCache(object):
 
             pending_updates[cache_key][kvs_key.field_name] = value
 
+        if self._write_behind:
+            for cache_key, field_state in six.iteritems(pending_updates):
+                self._cache[cache_key].update(field_state)
+                self._pending_updates[cache_key].update(field_state)
+            if any(cache_key in self._scorable_locations for cache_key in pending_updates):
+                self.flush()
+            return
+
+        try:
+            self._write(pending_updates)
+        finally:
+            self._cache.update(pending_updates)
+
+    def flush(self):
+        """
+        Writes the state buffered in write-behind mode.
+        """
+        if not self._pending_updates:
+            return
+        pending_updates, self._pending_updates = self._pending_updates, defaultdict(dict)
+        self._write(pending_updates)
+
+    def _write(self, pending_updates):
+        """
+        Writes the given field states, keyed by block.
+        """
         try:
             self._client.set_many(
                 self.user.username,
@@ -422,8 +523,6 @@ class UserStateCache(object):
         except DatabaseError:
             log.exception(u"Saving user state failed for %s", self.user.username)
             raise KeyValueMultiSaveError([])
-        finally:
-            self._cache.update(pending_updates)
 
     @contract(kvs_key=DjangoKeyValueStore.Key)
     def get(self, kvs_key):
@@ -461,6 +560,7 @@ class UserStateCache(object):
         if kvs_key.field_name not in field_state:
             raise KeyError(kvs_key.field_name)
 
+        self.flush()
         self._client.delete(self.user.username, cache_key, fields=[kvs_key.field_name])
         del field_state[kvs_key.field_name]
 
@@ -706,11 +806,19 @@ class FieldDataCache(object):
         self.course_id = course_id
         self.user = user
         self.read_only = read_only
+        self.scorable_locations = set()
+
+        write_behind_field_data_caches = _write_behind_field_data_caches()
+        write_behind = write_behind_field_data_caches is not None and not read_only
+        if write_behind:
+            write_behind_field_data_caches.append(self)
 
         self.cache = {
             Scope.user_state: UserStateCache(
                 self.user,
                 self.course_id,
+                write_behind=write_behind,
+                scorable_locations=self.scorable_locations,
             ),
             Scope.user_info: UserInfoCache(
                 self.user,
@@ -722,7 +830,6 @@ class FieldDataCache(object):
                 self.course_id,
             ),
         }
-        self.scorable_locations = set()
         self.add_descriptors_to_cache(descriptors)
 
     def add_descriptors_to_cache(self, descriptors):
@@ -863,6 +970,14 @@ class FieldDataCache(object):
                 log.exception(u'Error saving fields %r', [key.field_name for key in set_many_data])
                 raise KeyValueMultiSaveError(saved_fields + exc.saved_field_names)
 
+    def flush(self):
+        """
+        Writes the user state buffered within deferred_user_state_writes.
+
+        Raises: KeyValueMultiSaveError if the state fails to save
+        """
+        self.cache[Scope.user_state].flush()
+
     @contract(key=DjangoKeyValueStore.Key)
     def delete(self, key):
         """
@@ -989,6 +1104,30 @@ class ScoresClient(object):
         client.fetch_scores(scorable_locations)
         return client
 
+    @classmethod
+    def create_for_users(cls, course_id, user_ids, scorable_locations):
+        """
+        Create a ScoresClient for each of the given users, with data for the
+        given locations pre-fetched in a single query. Returns a dict of the
+        ScoresClients keyed by user id.
+        """
+        clients = {user_id: cls(course_id, user_id) for user_id in user_ids}
+        scores_qset = StudentModule.objects.filter(
+            student_id__in=list(clients),
+            course_id=course_id,
+            module_state_key__in=set(scorable_locations),
+        )
+        for user_id, location, correct, total, created in scores_qset.values_list(
+            'student_id', 'module_state_key', 'grade', 'max_grade', 'created'
+        ):
+            # pylint: disable=protected-access
+            clients[user_id]._locations_to_scores[location.map_into_course(course_id)] = cls.Score(
+                correct, total, created
+            )
+        for client in six.itervalues(clients):
+            client._has_fetched = True  # pylint: disable=protected-access
+        return clients
+
 
 # @contract(user_id=int, usage_key=UsageKey, score="number|None", max_score="number|None")
 def set_score(user_id, usage_key, score, max_score):
@@ -15,6 +15,7 @@ ASSUMPTIONS: modules have unique IDs, even across different module_types
 
 
 import itertools
+import json
 import logging
 
 import six
@@ -27,7 +28,7 @@ from django.utils.encoding import python_2_unicode_compatible
 from django.utils.translation import ugettext_lazy as _
 from model_utils.models import TimeStampedModel
 from opaque_keys.edx.django.models import BlockTypeKeyField, CourseKeyField, LearningContextKeyField, UsageKeyField
-from lms.djangoapps.courseware.fields import UnsignedBigIntAutoField
+from lms.djangoapps.courseware.fields import CompactTextField, UnsignedBigIntAutoField
 from six import text_type
 from six.moves import range
 
@@ -106,7 +107,7 @@ class StudentModule(models.Model):
         unique_together = (('student', 'module_state_key', 'course_id'),)
 
     # Internal state of the object
-    state = models.TextField(null=True, blank=True)
+    state = CompactTextField(null=True, blank=True)
 
     # Grade, and are we done?
     grade = models.FloatField(null=True, blank=True, db_index=True)
@@ -188,6 +189,15 @@ class BaseStudentModuleHistory(models.Model):
     objects = ChunkingManager()
     HISTORY_SAVING_TYPES = {'problem'}
 
+    # Prefix of the state of history entries that are stored as a delta
+    # against an earlier, full entry of the same StudentModule.
+    DELTA_PREFIX = u'd1:'
+
+    # Maximum number of deltas followed to resolve the state of an entry.
+    # Deltas are written against full entries, but an entry that other
+    # deltas are against may itself have been rewritten as a delta.
+    MAX_DELTA_CHAIN_LENGTH = 10
+
     class Meta(object):
         abstract = True
 
@@ -195,7 +205,7 @@ class BaseStudentModuleHistory(models.Model):
 
     # This should be populated from the modified field in StudentModule
     created = models.DateTimeField(db_index=True)
-    state = models.TextField(null=True, blank=True)
+    state = CompactTextField(null=True, blank=True)
     grade = models.FloatField(null=True, blank=True)
     max_grade = models.FloatField(null=True, blank=True)
 
@@ -217,22 +227,153 @@ class BaseStudentModuleHistory(models.Model):
         history_entries = []
 
         if settings.FEATURES.get('ENABLE_CSMH_EXTENDED'):
-            history_entries += coursewarehistoryextended.models.StudentModuleHistoryExtended.objects.filter(
+            history_model = coursewarehistoryextended.models.StudentModuleHistoryExtended
+            history_entries += history_model.resolve_deltas(history_model.objects.filter(
                 # Django will sometimes try to join to courseware_studentmodule
                 # so just do an in query
                 student_module__in=[module.id for module in student_modules]
-            ).order_by('-id')
+            ).order_by('-id'))
 
         # If we turn off reading from multiple history tables, then we don't want to read from
         # StudentModuleHistory anymore, we believe that all history is in the Extended table.
         if settings.FEATURES.get('ENABLE_READING_FROM_MULTIPLE_HISTORY_TABLES'):
             # we want to save later SQL queries on the model which allows us to prefetch
-            history_entries += StudentModuleHistory.objects.prefetch_related('student_module').filter(
-                student_module__in=student_modules
-            ).order_by('-id')
+            history_entries += StudentModuleHistory.resolve_deltas(
+                StudentModuleHistory.objects.prefetch_related('student_module').filter(
+                    student_module__in=student_modules
+                ).order_by('-id')
+            )
+
+        return history_entries
+
+    @classmethod
+    def state_for_new_entry(cls, student_module):
+        """
+        Returns the state to store in a new history entry of the given
+        StudentModule: its full state or, if history deltas are enabled,
+        a delta against the latest full entry of the StudentModule when the
+        delta is less than half the size of the full state.
+        """
+        state = student_module.state
+        if state is None or not settings.COMPACT_STUDENT_MODULE_STATE.get('HISTORY_DELTAS'):
+            return state
+
+        entries = cls.objects.filter(student_module_id=student_module.id).only('id', 'state')
+        latest_entry = entries.order_by('-id').first()
+        if latest_entry is None or latest_entry.state is None:
+            return state
+        if cls.is_delta(latest_entry.state):
+            base_entry = cls.objects.filter(id=cls._delta_base_id(latest_entry.state)).only('id', 'state').first()
+        else:
+            base_entry = latest_entry
+        if base_entry is None:
+            return state
+        return cls.encode_delta(base_entry.id, base_entry.state, state) or state
+
+    @classmethod
+    def encode_delta(cls, base_id, base_state, state):
+        """
+        Returns the given state encoded as a delta against the given full
+        state of the history entry with the given id, or None if the delta
+        would not be less than half the size of the state.
+        """
+        try:
+            base_state = json.loads(base_state)
+            new_state = json.loads(state)
+        except (TypeError, ValueError):
+            return None
+        if not isinstance(base_state, dict) or not isinstance(new_state, dict):
+            return None
+
+        delta = cls.DELTA_PREFIX + json.dumps(
+            {
+                'base': base_id,
+                'set': {
+                    key: value
+                    for key, value in six.iteritems(new_state)
+                    if key not in base_state or base_state[key] != value
+                },
+                'unset': [key for key in base_state if key not in new_state],
+            },
+            separators=(',', ':'),
+        )
+        return delta if len(delta) * 2 < len(state) else None
 
+    @classmethod
+    def is_delta(cls, state):
+        """
+        Returns whether the given state of a history entry is a delta.
+        """
+        return state is not None and state.startswith(cls.DELTA_PREFIX)
+
+    @classmethod
+    def resolve_deltas(cls, history_entries):
+        """
+        Returns a list of the given history entries of this model, with the
+        states of the entries stored as deltas replaced by their full states.
+        The states of entries whose deltas can't be resolved are replaced by
+        None.
+        """
+        history_entries = list(history_entries)
+        states = {entry.id: entry.state for entry in history_entries}
+        # Fetch the entries that deltas are against, and in turn the
+        # entries that those are against if they are deltas themselves.
+        new_states = states
+        for _ in range(cls.MAX_DELTA_CHAIN_LENGTH):
+            missing_base_ids = {
+                cls._delta_base_id(state) for state in six.itervalues(new_states) if cls.is_delta(state)
+            } - set(states)
+            if not missing_base_ids:
+                break
+            new_states = dict(cls.objects.filter(id__in=missing_base_ids).values_list('id', 'state'))
+            states.update(new_states)
+
+        full_states = {}
+        for entry in history_entries:
+            if cls.is_delta(entry.state):
+                try:
+                    entry.state = cls._full_state(entry.id, states, full_states)
+                except (AttributeError, KeyError, TypeError, ValueError):
+                    log.warning(u'Could not resolve the delta state of %s entry %d', cls.__name__, entry.id)
+                    entry.state = None
         return history_entries
 
+    @classmethod
+    def _delta_base_id(cls, delta):
+        """
+        Returns the id of the entry that the given delta is against, or None
+        if the delta is invalid.
+        """
+        try:
+            return json.loads(delta[len(cls.DELTA_PREFIX):])['base']
+        except (KeyError, TypeError, ValueError):
+            return None
+
+    @classmethod
+    def _full_state(cls, entry_id, states, full_states, chain_length=0):
+        """
+        Returns the full state of the entry with the given id, given the
+        stored states of history entries, keyed by id, and caches it in
+        full_states.
+
+        Raises KeyError if an entry is missing, and ValueError if the chain
+        of deltas is too long.
+        """
+        if entry_id in full_states:
+            return full_states[entry_id]
+        state = states[entry_id]
+        if cls.is_delta(state):
+            if chain_length >= cls.MAX_DELTA_CHAIN_LENGTH:
+                raise ValueError(u'Too many deltas to resolve')
+            delta = json.loads(state[len(cls.DELTA_PREFIX):])
+            full_state = json.loads(cls._full_state(delta['base'], states, full_states, chain_length + 1))
+            full_state.update(delta['set'])
+            for key in delta['unset']:
+                full_state.pop(key, None)
+            state = json.dumps(full_state)
+        full_states[entry_id] = state
+        return state
+
 
 @python_2_unicode_compatible
 class StudentModuleHistory(BaseStudentModuleHistory):
@@ -259,7 +400,7 @@ class StudentModuleHistory(BaseStudentModuleHistory):
             history_entry = StudentModuleHistory(student_module=instance,
                                                  version=None,
                                                  created=instance.modified,
-                                                 state=instance.state,
+                                                 state=StudentModuleHistory.state_for_new_entry(instance),
                                                  grade=instance.grade,
                                                  max_grade=instance.max_grade)
             history_entry.save()
@@ -53,10 +53,11 @@ from lms.djangoapps.courseware.masquerade import (
     is_masquerading_as_specific_student,
     setup_masquerade
 )
-from lms.djangoapps.courseware.model_data import DjangoKeyValueStore, FieldDataCache
+from lms.djangoapps.courseware.model_data import DjangoKeyValueStore, FieldDataCache, deferred_user_state_writes
 from edxmako.shortcuts import render_to_string
 from lms.djangoapps.courseware.field_overrides import OverrideFieldData
 from lms.djangoapps.courseware.services import UserStateService
+from lms.djangoapps.courseware.toggles import DEFER_USER_STATE_WRITES
 from lms.djangoapps.grades.api import GradesUtilService
 from lms.djangoapps.grades.api import signals as grades_signals
 from lms.djangoapps.lms_xblock.field_data import LmsFieldData
@@ -1158,7 +1159,8 @@ def _invoke_xblock_handler(request, course_id, usage_id, handler, suffix, course
 
     set_custom_metrics_for_course_key(course_key)
 
-    with modulestore().bulk_operations(course_key):
+    with modulestore().bulk_operations(course_key), \
+            deferred_user_state_writes(DEFER_USER_STATE_WRITES.is_enabled(course_key)):
         try:
             usage_key = UsageKey.from_string(unquote_slashes(usage_id))
         except InvalidKeyError:
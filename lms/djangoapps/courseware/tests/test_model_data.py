@@ -13,7 +13,12 @@ from xblock.core import XBlock
 from xblock.exceptions import KeyValueMultiSaveError
 from xblock.fields import BlockScope, Scope, ScopeIds
 
-from lms.djangoapps.courseware.model_data import DjangoKeyValueStore, FieldDataCache, InvalidScopeError
+from lms.djangoapps.courseware.model_data import (
+    DjangoKeyValueStore,
+    FieldDataCache,
+    InvalidScopeError,
+    deferred_user_state_writes
+)
 from lms.djangoapps.courseware.models import (
     StudentModule,
     XModuleStudentInfoField,
@@ -228,6 +233,76 @@ class TestStudentModuleStorage(OtherUserFailureTestMixin, TestCase):
         self.assertEqual(exception_context.exception.saved_field_names, [])
 
 
+class TestDeferredUserStateWrites(TestCase):
+    """Tests for user_state storage within deferred_user_state_writes"""
+    # Tell Django to clean out all databases, not just default
+    multi_db = True
+
+    def setUp(self):
+        super(TestDeferredUserStateWrites, self).setUp()
+        student_module = StudentModuleFactory(state=json.dumps({'a_field': 'a_value'}))
+        self.user = student_module.student
+        self.assertEqual(self.user.id, 1)   # check our assumption hard-coded in the key functions above.
+
+    def create_kvs(self, has_score):
+        """Returns a DjangoKeyValueStore for a descriptor that may be scorable"""
+        descriptor = mock_descriptor([mock_field(Scope.user_state, 'a_field')])
+        descriptor.has_score = has_score
+        descriptor.location = location('usage_id')
+        return DjangoKeyValueStore(FieldDataCache([descriptor], course_id, self.user))
+
+    def stored_state(self):
+        """Returns the user state stored in the StudentModule"""
+        return json.loads(StudentModule.objects.get(student=self.user).state)
+
+    def test_deferred_writes(self):
+        with deferred_user_state_writes():
+            kvs = self.create_kvs(has_score=False)
+            with self.assertNumQueries(0):
+                kvs.set(user_state_key('a_field'), 'new_value')
+                kvs.set(user_state_key('b_field'), 'b_value')
+            self.assertEqual('new_value', kvs.get(user_state_key('a_field')))
+            self.assertEqual({'a_field': 'a_value'}, self.stored_state())
+
+        self.assertEqual({'a_field': 'new_value', 'b_field': 'b_value'}, self.stored_state())
+
+    def test_scorable_writes(self):
+        with deferred_user_state_writes():
+            kvs = self.create_kvs(has_score=True)
+            kvs.set(user_state_key('a_field'), 'new_value')
+            self.assertEqual({'a_field': 'new_value'}, self.stored_state())
+
+    def test_not_enabled(self):
+        with deferred_user_state_writes(enabled=False):
+            kvs = self.create_kvs(has_score=False)
+            kvs.set(user_state_key('a_field'), 'new_value')
+            self.assertEqual({'a_field': 'new_value'}, self.stored_state())
+
+    def test_flush_error(self):
+        with self.assertRaises(KeyValueMultiSaveError):
+            with deferred_user_state_writes():
+                failing_kvs = self.create_kvs(has_score=False)
+                failing_kvs.set(user_state_key('a_field'), 'failing_value')
+                kvs = self.create_kvs(has_score=False)
+                kvs.set(user_state_key('a_field'), 'new_value')
+                # Only the first FieldDataCache fails to write
+                failing_kvs._field_data_cache.cache[Scope.user_state]._client = Mock(  # pylint: disable=protected-access
+                    set_many=Mock(side_effect=DatabaseError)
+                )
+        self.assertEqual({'a_field': 'new_value'}, self.stored_state())
+
+    def test_flush_error_after_exception(self):
+        with patch(
+            'lms.djangoapps.courseware.model_data.DjangoXBlockUserStateClient.set_many',
+            side_effect=DatabaseError,
+        ):
+            with self.assertRaises(ValueError):
+                with deferred_user_state_writes():
+                    kvs = self.create_kvs(has_score=False)
+                    kvs.set(user_state_key('a_field'), 'new_value')
+                    raise ValueError
+
+
 class TestMissingStudentModule(TestCase):
     # Tell Django to clean out all databases, not just default
     multi_db = True
@@ -6,7 +6,11 @@ defined in edx_user_state_client.
 
 from collections import defaultdict
 
+import ddt
+from django.test import TestCase
+from django.test.utils import override_settings
 from edx_user_state_client.tests import UserStateClientTestBase
+from opaque_keys.edx.locator import CourseLocator
 
 from lms.djangoapps.courseware.tests.factories import UserFactory
 from lms.djangoapps.courseware.user_state_client import DjangoXBlockUserStateClient
@@ -34,3 +38,55 @@ class TestDjangoUserStateClient(UserStateClientTestBase, ModuleStoreTestCase):
         super(TestDjangoUserStateClient, self).setUp()
         self.client = DjangoXBlockUserStateClient()
         self.users = defaultdict(UserFactory.create)
+
+
+@ddt.ddt
+class TestDjangoUserStateClientQueries(TestCase):
+    """
+    Tests of the number of queries made by the DjangoUserStateClient.
+    """
+    # Tell Django to clean out all databases, not just default
+    multi_db = True
+
+    def setUp(self):
+        super(TestDjangoUserStateClientQueries, self).setUp()
+        self.user = UserFactory.create()
+        self.client = DjangoXBlockUserStateClient(self.user)
+        self.course_key = CourseLocator('org', 'course', 'run')
+
+    @ddt.data(2, 10)
+    def test_set_many_queries(self, num_blocks):
+        block_keys = [self.course_key.make_usage_key('problem', 'problem_{}'.format(i)) for i in range(num_blocks)]
+
+        # SELECT of the existing rows, INSERT of the new rows in a
+        # savepoint and SELECT of their ids, plus a history row per block.
+        with self.assertNumQueries(5, using='default'):
+            with self.assertNumQueries(num_blocks, using='student_module_history'):
+                self.client.set_many(self.user.username, {block_key: {'a': 1} for block_key in block_keys})
+
+        # SELECT of the existing rows and UPDATE of all of them in a
+        # savepoint, plus a history row per block.
+        with self.assertNumQueries(4, using='default'):
+            with self.assertNumQueries(num_blocks, using='student_module_history'):
+                self.client.set_many(self.user.username, {block_key: {'b': 2} for block_key in block_keys})
+
+        self.assertEqual(
+            {state.block_key: state.state for state in self.client.get_many(self.user.username, block_keys)},
+            {block_key: {'a': 1, 'b': 2} for block_key in block_keys},
+        )
+
+    @override_settings(USER_STATE_BATCH_SIZE=2)
+    def test_iter_all_for_course_queries(self):
+        block_keys = [self.course_key.make_usage_key('problem', 'problem_{}'.format(i)) for i in range(5)]
+        self.client.set_many(
+            self.user.username,
+            {block_key: {'student_answers': i, 'input_state': i} for i, block_key in enumerate(block_keys)},
+        )
+
+        # One query per batch of rows.
+        with self.assertNumQueries(3):
+            user_states = list(self.client.iter_all_for_course(self.course_key, fields=['student_answers']))
+        self.assertEqual(
+            {user_state.block_key: user_state.state for user_state in user_states},
+            {block_key: {'student_answers': i} for i, block_key in enumerate(block_keys)},
+        )
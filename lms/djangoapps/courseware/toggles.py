@@ -38,6 +38,24 @@ REDIRECT_TO_COURSEWARE_MICROFRONTEND = CourseWaffleFlag(WAFFLE_FLAG_NAMESPACE, '
 COURSEWARE_MICROFRONTEND_COURSE_TEAM_PREVIEW = CourseWaffleFlag(WAFFLE_FLAG_NAMESPACE, 'microfrontend_course_team_preview')
 
 
+# Waffle flag to defer the writes of learner state made by XBlock handlers until the handler returns.
+#
+# .. toggle_name: courseware.defer_user_state_writes
+# .. toggle_implementation: CourseWaffleFlag
+# .. toggle_default: False
+# .. toggle_description: Coalesces the Scope.user_state writes of an XBlock handler call into a single write when the
+#   handler returns, rather than writing to courseware_studentmodule on each change. The state of scorable blocks is
+#   still written as soon as it changes.
+# .. toggle_category: courseware
+# .. toggle_use_cases: incremental_release, open_edx
+# .. toggle_creation_date: 2026-10-18
+# .. toggle_expiration_date: None
+# .. toggle_warnings: None
+# .. toggle_tickets: None
+# .. toggle_status: supported
+DEFER_USER_STATE_WRITES = CourseWaffleFlag(WAFFLE_FLAG_NAMESPACE, 'defer_user_state_writes')
+
+
 def should_redirect_to_courseware_microfrontend(course_key):
     return (
         settings.FEATURES.get('ENABLE_COURSEWARE_MICROFRONTEND') and
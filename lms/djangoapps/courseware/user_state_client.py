@@ -12,9 +12,11 @@ from time import time
 import six
 from django.conf import settings
 from django.contrib.auth.models import User
-from django.core.paginator import Paginator
 from django.db import transaction
+from django.db.models import Case, Value, When
+from django.db.models.signals import post_save
 from django.db.utils import IntegrityError
+from django.utils import timezone
 from edx_django_utils import monitoring as monitoring_utils
 from edx_user_state_client.interface import XBlockUserState, XBlockUserStateClient
 from xblock.fields import Scope
@@ -227,10 +229,6 @@ class DjangoXBlockUserStateClient(XBlockUserStateClient):
         # count how many times this function gets called
         self._nr_stat_increment('set_many', 'calls')
 
-        # We do a find_or_create for every block (rather than re-using field objects
-        # that were queried in get_many) so that if the score has
-        # been changed by some other piece of the code, we don't overwrite
-        # that score.
         if self.user is not None and self.user.username == username:
             user = self.user
         else:
@@ -243,6 +241,29 @@ class DjangoXBlockUserStateClient(XBlockUserStateClient):
 
         evt_time = time()
 
+        if len(block_keys_to_state) > 1:
+            set_state = self._bulk_set_state
+        else:
+            set_state = self._set_state
+        if not set_state(user, block_keys_to_state):
+            return
+
+        # Events for the entire set_many call.
+        finish_time = time()
+        duration = (finish_time - evt_time) * 1000  # milliseconds
+        self._nr_stat_accumulate('set_many', 'duration', duration)
+
+    def _set_state(self, user, block_keys_to_state):
+        """
+        Overlays the given states over the stored states of the given
+        blocks, one block at a time.
+
+        Returns False if a new row could not be created.
+        """
+        # We do a find_or_create for every block (rather than re-using field objects
+        # that were queried in get_many) so that if the score has
+        # been changed by some other piece of the code, we don't overwrite
+        # that score.
         for usage_key, state in block_keys_to_state.items():
             try:
                 student_module, created = StudentModule.objects.get_or_create(
@@ -262,18 +283,14 @@ class DjangoXBlockUserStateClient(XBlockUserStateClient):
                 log.warning(u"set_many: IntegrityError for student {} - course_id {} - usage key {}".format(
                     user, repr(six.text_type(usage_key.course_key)), usage_key
                 ))
-                return
+                return False
 
-            num_fields_before = num_fields_after = num_new_fields_set = len(state)
-            num_fields_updated = 0
             if not created:
                 if student_module.state is None:
                     current_state = {}
                 else:
                     current_state = json.loads(student_module.state)
-                num_fields_before = len(current_state)
                 current_state.update(state)
-                num_fields_after = len(current_state)
                 student_module.state = json.dumps(current_state)
                 try:
                     with transaction.atomic():
@@ -289,27 +306,124 @@ class DjangoXBlockUserStateClient(XBlockUserStateClient):
                         len(block_keys_to_state), list(block_keys_to_state.keys())
                     ))
 
-            # DataDog and New Relic reporting
+            self._nr_set_many_block_stats(usage_key, student_module, created)
+        return True
 
-            # record the size of state modifications
-            self._nr_block_stat_accumulate('set_many', usage_key.block_type, 'size', len(student_module.state))
+    def _bulk_set_state(self, user, block_keys_to_state):
+        """
+        Overlays the given states over the stored states of the given
+        blocks, with a fixed number of queries regardless of the number of
+        blocks: a SELECT of the existing rows, a single UPDATE of all of
+        them, and a single INSERT of the new rows followed by a SELECT of
+        their ids.
 
-            # Record whether a state row has been created or updated.
-            if created:
-                self._nr_block_stat_increment('set_many', usage_key.block_type, 'blocks_created')
-            else:
-                self._nr_block_stat_increment('set_many', usage_key.block_type, 'blocks_updated')
+        As no rows are saved individually, post_save is sent for each
+        updated and created row, so that the state history is still kept.
 
-            # Event to record number of new fields set in set/set_many.
-            num_new_fields_set = num_fields_after - num_fields_before
+        Returns False if the new rows could not be created.
+        """
+        # We read every block (rather than re-using field objects that were
+        # queried in get_many) so that if the score has been changed by some
+        # other piece of the code, we don't overwrite that score.
+        student_modules = {
+            usage_key: student_module
+            for student_module, usage_key in self._get_student_modules(user.username, list(block_keys_to_state))
+        }
 
-            # Event to record number of existing fields updated in set/set_many.
-            num_fields_updated = max(0, len(state) - num_new_fields_set)
+        if student_modules:
+            modified = timezone.now()
+            for usage_key, student_module in six.iteritems(student_modules):
+                if student_module.state is None:
+                    current_state = {}
+                else:
+                    current_state = json.loads(student_module.state)
+                current_state.update(block_keys_to_state[usage_key])
+                student_module.state = json.dumps(current_state)
+                student_module.modified = modified
+            # The state field is given as the output field so that the
+            # states are stored in its encoding.
+            state_field = StudentModule._meta.get_field('state')  # pylint: disable=protected-access
+            try:
+                with transaction.atomic():
+                    StudentModule.objects.filter(
+                        id__in=[student_module.id for student_module in student_modules.values()],
+                    ).update(
+                        state=Case(
+                            *[
+                                When(id=student_module.id, then=Value(student_module.state, output_field=state_field))
+                                for student_module in student_modules.values()
+                            ],
+                            output_field=state_field
+                        ),
+                        modified=modified,
+                    )
+            except IntegrityError:
+                # The UPDATE above failed. Log information - but ignore the error.
+                # See https://openedx.atlassian.net/browse/TNL-5365
+                log.warning(u"set_many: IntegrityError for student {} - usage keys {}".format(
+                    user, list(student_modules)
+                ))
+                log.warning(u"set_many: All {} block keys: {}".format(
+                    len(block_keys_to_state), list(block_keys_to_state.keys())
+                ))
+            else:
+                for usage_key, student_module in six.iteritems(student_modules):
+                    post_save.send(sender=StudentModule, instance=student_module, created=False, raw=False,
+                                   using=student_module._state.db, update_fields=None)  # pylint: disable=protected-access
 
-        # Events for the entire set_many call.
-        finish_time = time()
-        duration = (finish_time - evt_time) * 1000  # milliseconds
-        self._nr_stat_accumulate('set_many', 'duration', duration)
+        new_block_keys = [usage_key for usage_key in block_keys_to_state if usage_key not in student_modules]
+        created_modules = {}
+        if new_block_keys:
+            try:
+                with transaction.atomic():
+                    StudentModule.objects.bulk_create([
+                        StudentModule(
+                            student=user,
+                            course_id=usage_key.course_key,
+                            module_state_key=usage_key,
+                            module_type=usage_key.block_type,
+                            state=json.dumps(block_keys_to_state[usage_key]),
+                        )
+                        for usage_key in new_block_keys
+                    ])
+            except IntegrityError:
+                # PLAT-1109 - Until we switch to read committed, we cannot rely
+                # on the SELECT above to be able to see rows created in another
+                # process. This seems to happen frequently, and ignoring it is the
+                # best course of action for now
+                log.warning(u"set_many: IntegrityError for student {} - usage keys {}".format(
+                    user, new_block_keys
+                ))
+                return False
+
+            # bulk_create does not set the ids of the new rows on all
+            # databases, and the history of the rows needs them.
+            created_modules = {
+                usage_key: student_module
+                for student_module, usage_key in self._get_student_modules(user.username, new_block_keys)
+            }
+            for student_module in created_modules.values():
+                post_save.send(sender=StudentModule, instance=student_module, created=True, raw=False,
+                               using=student_module._state.db, update_fields=None)  # pylint: disable=protected-access
+
+        for usage_key, student_module in six.iteritems(student_modules):
+            self._nr_set_many_block_stats(usage_key, student_module, created=False)
+        for usage_key, student_module in six.iteritems(created_modules):
+            self._nr_set_many_block_stats(usage_key, student_module, created=True)
+        return True
+
+    def _nr_set_many_block_stats(self, usage_key, student_module, created):
+        """
+        Report the NR stats of a block saved in set_many.
+        """
+        # record the size of state modifications
+        self._nr_block_stat_accumulate('set_many', usage_key.block_type, 'size', len(student_module.state))
+
+        # Record whether a state row has been created or updated.
+        if created:
+            self._nr_block_stat_increment('set_many', usage_key.block_type, 'blocks_created')
+        else:
+            self._nr_block_stat_increment('set_many', usage_key.block_type, 'blocks_updated')
 
     def delete_many(self, username, block_keys, scope=Scope.user_state, fields=None):
         """
@@ -395,7 +509,7 @@ class DjangoXBlockUserStateClient(XBlockUserStateClient):
 
             yield XBlockUserState(username, block_key, state, history_entry.created, scope)
 
-    def iter_all_for_block(self, block_key, scope=Scope.user_state):
+    def iter_all_for_block(self, block_key, scope=Scope.user_state, fields=None):
         """
         Return an iterator over the data stored in the block (e.g. a problem block).
 
@@ -405,6 +519,7 @@ class DjangoXBlockUserStateClient(XBlockUserStateClient):
         Arguments:
             block_key: an XBlock's locator (e.g. :class:`~BlockUsageLocator`)
             scope (Scope): must be `Scope.user_state`
+            fields: A list of field values to retrieve. If None, retrieve all stored fields.
 
         Returns:
             an iterator over all data. Each invocation returns the next :class:`~XBlockUserState`
@@ -413,21 +528,11 @@ class DjangoXBlockUserStateClient(XBlockUserStateClient):
         if scope != Scope.user_state:
             raise ValueError("Only Scope.user_state is supported")
 
-        results = StudentModule.objects.order_by('id').filter(module_state_key=block_key)
-        p = Paginator(results, settings.USER_STATE_BATCH_SIZE)
-
-        for page_number in p.page_range:
-            page = p.page(page_number)
-
-            for sm in page.object_list:
-                state = json.loads(sm.state)
-
-                if state == {}:
-                    continue
+        results = StudentModule.objects.filter(module_state_key=block_key)
+        for user_state in self._iter_all(results, scope, fields):
+            yield user_state
 
-                yield XBlockUserState(sm.student.username, sm.module_state_key, state, sm.modified, scope)
-
-    def iter_all_for_course(self, course_key, block_type=None, scope=Scope.user_state):
+    def iter_all_for_course(self, course_key, block_type=None, scope=Scope.user_state, fields=None):
         """
         Return an iterator over all data stored in a course's blocks.
 
@@ -436,7 +541,9 @@ class DjangoXBlockUserStateClient(XBlockUserStateClient):
 
         Arguments:
             course_key: a course locator
+            block_type: the type of the blocks to return the data of, or None for all blocks
             scope (Scope): must be `Scope.user_state`
+            fields: A list of field values to retrieve. If None, retrieve all stored fields.
 
         Returns:
             an iterator over all data. Each invocation returns the next :class:`~XBlockUserState`
@@ -445,19 +552,41 @@ class DjangoXBlockUserStateClient(XBlockUserStateClient):
         if scope != Scope.user_state:
             raise ValueError("Only Scope.user_state is supported")
 
-        results = StudentModule.objects.order_by('id').filter(course_id=course_key)
+        results = StudentModule.objects.filter(course_id=course_key)
         if block_type:
             results = results.filter(module_type=block_type)
+        for user_state in self._iter_all(results, scope, fields):
+            yield user_state
 
-        p = Paginator(results, settings.USER_STATE_BATCH_SIZE)
+    def _iter_all(self, student_modules, scope, fields=None):
+        """
+        Yields XBlockUserStates for the given StudentModule queryset.
 
-        for page_number in p.page_range:
-            page = p.page(page_number)
+        The rows are streamed in batches of settings.USER_STATE_BATCH_SIZE,
+        paginated by id rather than by offset, and only the columns needed
+        are fetched, so that the whole table can be read in bounded memory.
+        If fields is given, only those fields are kept from each state.
+        """
+        batch_size = settings.USER_STATE_BATCH_SIZE
+        rows = None
+        while rows is None or len(rows) == batch_size:
+            last_id = rows[-1][0] if rows else 0
+            rows = list(student_modules.filter(id__gt=last_id).order_by('id').values_list(
+                'id', 'student__username', 'module_state_key', 'state', 'modified',
+            )[:batch_size])
 
-            for sm in page.object_list:
-                state = json.loads(sm.state)
+            for _, username, module_state_key, state, modified in rows:
+                if state is None:
+                    continue
 
+                state = json.loads(state)
                 if state == {}:
                     continue
 
-                yield XBlockUserState(sm.student.username, sm.module_state_key, state, sm.modified, scope)
+                if fields is not None:
+                    state = {
+                        field: state[field]
+                        for field in fields
+                        if field in state
+                    }
+                yield XBlockUserState(username, module_state_key, state, modified, scope)
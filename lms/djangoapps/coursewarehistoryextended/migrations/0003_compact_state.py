@@ -0,0 +1,21 @@
+# -*- coding: utf-8 -*-
+
+
+from django.db import migrations
+
+import lms.djangoapps.courseware.fields
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('coursewarehistoryextended', '0002_force_studentmodule_index'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='studentmodulehistoryextended',
+            name='state',
+            field=lms.djangoapps.courseware.fields.CompactTextField(blank=True, null=True),
+        ),
+    ]
@@ -50,10 +50,11 @@ class StudentModuleHistoryExtended(BaseStudentModuleHistory):
         we save.
         """
         if instance.module_type in StudentModuleHistoryExtended.HISTORY_SAVING_TYPES:
+            state = StudentModuleHistoryExtended.state_for_new_entry(instance)
             history_entry = StudentModuleHistoryExtended(student_module=instance,
                                                          version=None,
                                                          created=instance.modified,
-                                                         state=instance.state,
+                                                         state=state,
                                                          grade=instance.grade,
                                                          max_grade=instance.max_grade)
             history_entry.save()
@@ -13,6 +13,8 @@ from six import text_type
 
 # Public Grades Modules
 from lms.djangoapps.grades import constants, context, course_data, events
+from lms.djangoapps.grades.bulk_scores import BulkProblemScores
+from lms.djangoapps.grades.config import should_persist_grades
 # Grades APIs that should NOT belong within the Grades subsystem
 # TODO move Gradebook to be an external feature outside of core Grades
 from lms.djangoapps.grades.config.waffle import is_writable_gradebook_enabled, gradebook_can_see_bulk_management
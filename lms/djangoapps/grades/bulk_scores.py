@@ -0,0 +1,164 @@
+"""
+Bulk retrieval of the persisted grades and problem scores of many users.
+"""
+
+
+from collections import defaultdict
+
+from lazy import lazy
+from submissions import api as submissions_api
+
+from lms.djangoapps.course_blocks.api import get_course_blocks_for_users
+from lms.djangoapps.courseware.model_data import ScoresClient
+from lms.djangoapps.grades.models import BlockRecordList, PersistentCourseGrade, PersistentSubsectionGrade, VisibleBlocks
+from lms.djangoapps.grades.scores import get_score, possibly_scored
+from student.models import anonymous_id_for_user
+
+
+class BulkProblemScores(object):
+    """
+    Problem scores of a batch of users in a course, read from the persisted
+    grades and the courseware student module with a few set-based queries,
+    rather than by computing a CourseGrade for each user.
+
+    When the grade of a problem's subsection was persisted for a user, the
+    problem is scored against the collected course structure, and is only
+    treated as unavailable to the user if it was not visible to them then.
+    Otherwise, it is scored against the user's own course structure, as
+    CourseGradeFactory would score it.
+    """
+    def __init__(self, course_key, collected_block_structure, users):
+        self.course_key = course_key
+        self.course_structure = collected_block_structure
+        self.users = users
+        self._submissions_scores_by_user = {}
+        self._user_structures = {}
+
+    @lazy
+    def course_grades(self):
+        """
+        Returns the persisted course grades of the users, keyed by user id.
+        """
+        return {
+            grade.user_id: grade
+            for grade in PersistentCourseGrade.objects.filter(
+                user_id__in=[user.id for user in self.users],
+                course_id=self.course_key,
+            )
+        }
+
+    def problem_scores(self, block_key, users):
+        """
+        Returns a list of the ProblemScores of the given users for the given
+        block, in the order of the users, with None for users that have no
+        score for the block.
+        """
+        subsection_key = self._subsection_key(block_key)
+        self._load_user_structures([
+            user for user in users if subsection_key not in self._persisted_records[user.id]
+        ])
+        scores = []
+        for user in users:
+            persisted_block = None
+            persisted_records = self._persisted_records[user.id].get(subsection_key)
+            if persisted_records is not None:
+                persisted_block = persisted_records.get(block_key)
+                if persisted_block is None:
+                    # The block was not visible to the user when the
+                    # subsection grade was persisted.
+                    scores.append(None)
+                    continue
+                block = self.course_structure[block_key]
+            else:
+                user_structure = self._user_structures[user.id]
+                if block_key not in user_structure:
+                    # The block is not available to the user.
+                    scores.append(None)
+                    continue
+                block = user_structure[block_key]
+            scores.append(get_score(
+                self._submissions_scores(user),
+                self._csm_scores[user.id],
+                persisted_block,
+                block,
+            ))
+        return scores
+
+    @lazy
+    def _persisted_records(self):
+        """
+        Returns the BlockRecords of the persisted subsection grades of the
+        users, as dicts of {block_key: record} keyed by user id and then by
+        subsection key. Users commonly share the same visible blocks, so each
+        set of visible blocks is only read and parsed once.
+        """
+        subsection_grades = list(PersistentSubsectionGrade.objects.filter(
+            user_id__in=[user.id for user in self.users],
+            course_id=self.course_key,
+        ).values_list('user_id', 'usage_key', 'visible_blocks_id'))
+
+        records_by_visible_blocks_id = {
+            visible_blocks_id: {
+                record.locator: record
+                for record in BlockRecordList.from_json(blocks_json)
+            }
+            for visible_blocks_id, blocks_json in VisibleBlocks.objects.filter(
+                id__in={visible_blocks_id for _, _, visible_blocks_id in subsection_grades},
+            ).values_list('id', 'blocks_json')
+        }
+
+        persisted_records = defaultdict(dict)
+        for user_id, usage_key, visible_blocks_id in subsection_grades:
+            persisted_records[user_id][usage_key.map_into_course(self.course_key)] = (
+                records_by_visible_blocks_id[visible_blocks_id]
+            )
+        return persisted_records
+
+    @lazy
+    def _csm_scores(self):
+        """
+        Returns the ScoresClients of the users, keyed by user id, for all the
+        scores stored in the user state (in CSM) for the course.
+        """
+        scorable_locations = [block_key for block_key in self.course_structure if possibly_scored(block_key)]
+        return ScoresClient.create_for_users(
+            self.course_key, [user.id for user in self.users], scorable_locations,
+        )
+
+    def _submissions_scores(self, user):
+        """
+        Returns the scores stored by the Submissions API for the given user
+        in the course, while caching the result.
+        """
+        if user.id not in self._submissions_scores_by_user:
+            anonymous_user_id = anonymous_id_for_user(user, self.course_key)
+            self._submissions_scores_by_user[user.id] = submissions_api.get_scores(
+                str(self.course_key), anonymous_user_id,
+            )
+        return self._submissions_scores_by_user[user.id]
+
+    def _load_user_structures(self, users):
+        """
+        Transforms the course structure for each of the given users whose
+        structure is not loaded yet, in a single pass over them, and caches
+        the results.
+        """
+        users = [user for user in users if user.id not in self._user_structures]
+        for user, user_structure in get_course_blocks_for_users(
+                users,
+                self.course_structure.root_block_usage_key,
+                collected_block_structure=self.course_structure,
+        ):
+            self._user_structures[user.id] = user_structure
+
+    def _subsection_key(self, block_key):
+        """
+        Returns the key of the subsection that contains the given block.
+        """
+        block_keys = [block_key]
+        while block_keys:
+            block_key = block_keys.pop()
+            if block_key.block_type == 'sequential':
+                return block_key
+            block_keys.extend(self.course_structure.get_parents(block_key))
+        return None
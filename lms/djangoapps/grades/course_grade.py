@@ -15,9 +15,10 @@ from lazy import lazy
 from openedx.core.lib.grade_utils import round_away_from_zero
 from xmodule import block_metadata_utils
 
+from . import course_grade_snapshot
 from .config import assume_zero_if_absent
 from .scores import compute_percent
-from .subsection_grade import ZeroSubsectionGrade
+from .subsection_grade import SnapshotSubsectionGrade, ZeroSubsectionGrade
 from .subsection_grade_factory import SubsectionGradeFactory
 
 
@@ -247,8 +248,13 @@ class ZeroCourseGrade(CourseGradeBase):
 class CourseGrade(CourseGradeBase):
     """
     Course Grade class when grades are updated or read from storage.
+
+    When read from storage, the persisted course grade may be given as
+    the persistent_grade keyword argument, so that the subsection grades
+    can be read from its snapshot, if any.
     """
     def __init__(self, user, course_data, *args, **kwargs):
+        self._persistent_grade = kwargs.pop('persistent_grade', None)
         super(CourseGrade, self).__init__(user, course_data, *args, **kwargs)
         self._subsection_grade_factory = SubsectionGradeFactory(user, course_data=course_data)
 
@@ -284,10 +290,23 @@ class CourseGrade(CourseGradeBase):
                     return True
         return False
 
+    @lazy
+    def _snapshot(self):
+        """
+        Returns the entries of the snapshot of the subsection grades of
+        this course grade, keyed by subsection location, or None.
+        """
+        if self._persistent_grade is None:
+            return None
+        return course_grade_snapshot.read(self.user.id, self.course_data, self._persistent_grade)
+
     def _get_subsection_grade(self, subsection, force_update_subsections=False):
         if self.force_update_subsections:
             return self._subsection_grade_factory.update(subsection, force_update_subsections=force_update_subsections)
         else:
+            snapshot_entry = self._snapshot.get(subsection.location) if self._snapshot else None
+            if snapshot_entry is not None:
+                return SnapshotSubsectionGrade(subsection, snapshot_entry, self.course_data.structure)
             # Pass read_only here so the subsection grades can be persisted in bulk at the end.
             return self._subsection_grade_factory.create(subsection, read_only=True)
 
@@ -15,6 +15,7 @@ from openedx.core.djangoapps.signals.signals import (
     COURSE_GRADE_NOW_PASSED
 )
 
+from . import course_grade_snapshot
 from .config import assume_zero_if_absent, should_persist_grades
 from .course_data import CourseData
 from .course_grade import CourseGrade, ZeroCourseGrade
@@ -162,7 +163,8 @@ class CourseGradeFactory(object):
             course_data,
             persistent_grade.percent_grade,
             persistent_grade.letter_grade,
-            persistent_grade.letter_grade != u''
+            persistent_grade.letter_grade != u'',
+            persistent_grade=persistent_grade,
         )
 
     @staticmethod
@@ -188,7 +190,7 @@ class CourseGradeFactory(object):
         should_persist = should_persist and course_grade.attempted
         if should_persist:
             course_grade._subsection_grade_factory.bulk_create_unsaved()
-            PersistentCourseGrade.update_or_create(
+            persistent_grade = PersistentCourseGrade.update_or_create(
                 user_id=user.id,
                 course_id=course_data.course_key,
                 course_version=course_data.version,
@@ -198,6 +200,7 @@ class CourseGradeFactory(object):
                 letter_grade=course_grade.letter_grade or "",
                 passed=course_grade.passed,
             )
+            course_grade_snapshot.update(user.id, course_grade, persistent_grade)
 
         COURSE_GRADE_CHANGED.send_robust(
             sender=None,
@@ -0,0 +1,133 @@
+"""
+Snapshots of the subsection grades of learners' course grades.
+
+Reading the subsection grades of a course grade from storage recomputes
+the problem scores of each subsection from its persisted visible blocks
+and the learner's scores, which the progress page and the grades APIs
+otherwise do on every request.  When COURSE_GRADE_SNAPSHOT_CACHE_TIMEOUT
+is set, the subsection grades are also stored in the cache, compressed,
+whenever the persisted course grade is updated, including by the
+recalculate_subsection_grade_v3 task, so that they can be read back
+with a single cache lookup.
+
+A snapshot is only valid for the version of the course content and the
+modification time of the persisted course grade it was taken for, which
+changes whenever any of the learner's scores does.  When a snapshot is
+updated, the entries of the subsections whose persisted grades are
+unchanged are carried over from the previous snapshot.
+"""
+
+
+from collections import OrderedDict, namedtuple
+from logging import getLogger
+
+import six
+from django.conf import settings
+from django.core.cache import cache
+
+from openedx.core.lib.cache_utils import zpickle, zunpickle
+
+log = getLogger(__name__)
+
+SnapshotEntry = namedtuple('SnapshotEntry', ['modified', 'all_total', 'graded_total', 'problem_scores'])
+
+
+def is_enabled():
+    """
+    Returns whether course grade snapshots are enabled.
+    """
+    return bool(getattr(settings, 'COURSE_GRADE_SNAPSHOT_CACHE_TIMEOUT', 0))
+
+
+def read(user_id, course_data, persistent_grade):
+    """
+    Returns the SnapshotEntry of each subsection, keyed by subsection
+    location, from the snapshot of the given persisted course grade, or
+    None if there is no valid snapshot.  Subsections with grade overrides
+    are never included in snapshots.
+    """
+    if not is_enabled():
+        return None
+    snapshot = _get(user_id, course_data.course_key)
+    course_version = _course_version(course_data)
+    if (
+            snapshot is None or
+            course_version is None or
+            snapshot['course_version'] != course_version or
+            snapshot['grade_modified'] != persistent_grade.modified
+    ):
+        return None
+    return snapshot['subsections']
+
+
+def update(user_id, course_grade, persistent_grade):
+    """
+    Stores a snapshot of the subsection grades of the given course grade,
+    which was just persisted as the given persisted course grade.
+    """
+    if not is_enabled():
+        return
+    course_data = course_grade.course_data
+    course_version = _course_version(course_data)
+    if course_version is None:
+        return
+
+    previous_entries = {}
+    previous_snapshot = _get(user_id, course_data.course_key)
+    if previous_snapshot is not None and previous_snapshot['course_version'] == course_version:
+        previous_entries = previous_snapshot['subsections']
+
+    entries = {}
+    for location, subsection_grade in six.iteritems(course_grade.subsection_grades):
+        if subsection_grade.override is not None:
+            continue
+        # Only subsection grades read from storage have a model.
+        model = getattr(subsection_grade, 'model', None)
+        modified = model.modified if model is not None else None
+        entry = previous_entries.get(location)
+        if entry is None or modified is None or entry.modified != modified:
+            entry = SnapshotEntry(
+                modified,
+                subsection_grade.all_total,
+                subsection_grade.graded_total,
+                OrderedDict(subsection_grade.problem_scores),
+            )
+        entries[location] = entry
+
+    snapshot = {
+        'course_version': course_version,
+        'grade_modified': persistent_grade.modified,
+        'subsections': entries,
+    }
+    cache.set(
+        _cache_key(user_id, course_data.course_key),
+        zpickle(snapshot),
+        settings.COURSE_GRADE_SNAPSHOT_CACHE_TIMEOUT,
+    )
+
+
+def _get(user_id, course_key):
+    """
+    Returns the stored snapshot for the given user and course, or None.
+    """
+    zdata = cache.get(_cache_key(user_id, course_key))
+    if zdata is None:
+        return None
+    try:
+        return zunpickle(zdata)
+    except Exception:  # pylint: disable=broad-except
+        log.exception(u'Grades: Could not read course grade snapshot, course: %s, user: %s', course_key, user_id)
+        return None
+
+
+def _course_version(course_data):
+    """
+    Returns the version of the content of the course, or None for courses
+    that are not versioned.
+    """
+    version = course_data.version
+    return six.text_type(version) if version else None
+
+
+def _cache_key(user_id, course_key):
+    return u'course_grade_snapshot.{}.{}'.format(course_key, user_id)
@@ -4,3 +4,14 @@ def plugin_settings(settings):
 
     # Queue to use for updating grades due to grading policy change
     settings.POLICY_CHANGE_GRADES_ROUTING_KEY = settings.DEFAULT_PRIORITY_QUEUE
+
+    # Seconds for which to delay subsection grade recalculations, so that
+    # the score changes of the problems of the same subsection for the same
+    # learner within them are recalculated only once.  Recalculations are
+    # not coalesced when 0.
+    settings.RECALCULATE_GRADES_COALESCE_SECONDS = 0
+
+    # Seconds to keep snapshots of the subsection grades of course grades
+    # in the cache, for the progress page and the grades APIs.  Snapshots
+    # are not used when 0.
+    settings.COURSE_GRADE_SNAPSHOT_CACHE_TIMEOUT = 0
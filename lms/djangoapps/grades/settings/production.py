@@ -12,3 +12,13 @@ def plugin_settings(settings):
     settings.POLICY_CHANGE_GRADES_ROUTING_KEY = settings.ENV_TOKENS.get(
         'POLICY_CHANGE_GRADES_ROUTING_KEY', settings.DEFAULT_PRIORITY_QUEUE,
     )
+
+    # Seconds for which to coalesce subsection grade recalculations
+    settings.RECALCULATE_GRADES_COALESCE_SECONDS = settings.ENV_TOKENS.get(
+        'RECALCULATE_GRADES_COALESCE_SECONDS', settings.RECALCULATE_GRADES_COALESCE_SECONDS,
+    )
+
+    # Seconds to keep snapshots of the subsection grades of course grades in the cache
+    settings.COURSE_GRADE_SNAPSHOT_CACHE_TIMEOUT = settings.ENV_TOKENS.get(
+        'COURSE_GRADE_SNAPSHOT_CACHE_TIMEOUT', settings.COURSE_GRADE_SNAPSHOT_CACHE_TIMEOUT,
+    )
@@ -7,6 +7,7 @@ from contextlib import contextmanager
 from logging import getLogger
 
 import six
+from django.conf import settings
 from django.dispatch import receiver
 from opaque_keys.edx.keys import LearningContextKey
 from submissions.models import score_reset, score_set
@@ -26,6 +27,7 @@ from ..course_grade_factory import CourseGradeFactory
 from ..scores import weighted_score
 from ..tasks import (
     RECALCULATE_GRADE_DELAY_SECONDS,
+    coalesce_subsection_grade_recalculation,
     recalculate_course_and_subsection_grades_for_user,
     recalculate_subsection_grade_v3
 )
@@ -224,22 +226,27 @@ def enqueue_subsection_update(sender, **kwargs):  # pylint: disable=unused-argum
     context_key = LearningContextKey.from_string(kwargs['course_id'])
     if not context_key.is_course:
         return  # If it's not a course, it has no subsections, so skip the subsection grading update
-    recalculate_subsection_grade_v3.apply_async(
-        kwargs=dict(
-            user_id=kwargs['user_id'],
-            anonymous_user_id=kwargs.get('anonymous_user_id'),
-            course_id=kwargs['course_id'],
-            usage_id=kwargs['usage_id'],
-            only_if_higher=kwargs.get('only_if_higher'),
-            expected_modified_time=to_timestamp(kwargs['modified']),
-            score_deleted=kwargs.get('score_deleted', False),
-            event_transaction_id=six.text_type(get_event_transaction_id()),
-            event_transaction_type=six.text_type(get_event_transaction_type()),
-            score_db_table=kwargs['score_db_table'],
-            force_update_subsections=kwargs.get('force_update_subsections', False),
-        ),
-        countdown=RECALCULATE_GRADE_DELAY_SECONDS,
+    task_kwargs = dict(
+        user_id=kwargs['user_id'],
+        anonymous_user_id=kwargs.get('anonymous_user_id'),
+        course_id=kwargs['course_id'],
+        usage_id=kwargs['usage_id'],
+        only_if_higher=kwargs.get('only_if_higher'),
+        expected_modified_time=to_timestamp(kwargs['modified']),
+        score_deleted=kwargs.get('score_deleted', False),
+        event_transaction_id=six.text_type(get_event_transaction_id()),
+        event_transaction_type=six.text_type(get_event_transaction_type()),
+        score_db_table=kwargs['score_db_table'],
+        force_update_subsections=kwargs.get('force_update_subsections', False),
     )
+    countdown = RECALCULATE_GRADE_DELAY_SECONDS
+    if settings.RECALCULATE_GRADES_COALESCE_SECONDS:
+        # Delay the task for the coalescing window, so that the score
+        # changes within it of the problems of the same subsections are
+        # recalculated only once.
+        task_kwargs.update(coalesce_subsection_grade_recalculation(**task_kwargs))
+        countdown = max(countdown, settings.RECALCULATE_GRADES_COALESCE_SECONDS)
+    recalculate_subsection_grade_v3.apply_async(kwargs=task_kwargs, countdown=countdown)
 
 
 @receiver(SUBSECTION_SCORE_CHANGED)
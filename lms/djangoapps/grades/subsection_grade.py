@@ -269,6 +269,24 @@ class ReadSubsectionGrade(NonZeroSubsectionGrade):
         return problem_scores
 
 
+class SnapshotSubsectionGrade(NonZeroSubsectionGrade):
+    """
+    Class for Subsection grades that are read from a snapshot of the
+    course grade.  See course_grade_snapshot.py.
+    """
+    def __init__(self, subsection, snapshot_entry, course_structure):
+        super(SnapshotSubsectionGrade, self).__init__(
+            subsection, snapshot_entry.all_total, snapshot_entry.graded_total,
+        )
+        # As in ReadSubsectionGrade, the scores of blocks that are no
+        # longer visible to the user are left out.
+        self.problem_scores = OrderedDict(
+            (block_key, problem_score)
+            for block_key, problem_score in six.iteritems(snapshot_entry.problem_scores)
+            if block_key in course_structure
+        )
+
+
 class CreateSubsectionGrade(NonZeroSubsectionGrade):
     """
     Class for Subsection grades that are newly created or updated.
@@ -3,15 +3,19 @@ This module contains tasks for asynchronous execution of grade updates.
 """
 
 
+import hashlib
 from logging import getLogger
+from uuid import uuid4
 
 import six
 from celery import task
 from celery_utils.persist_on_failure import LoggedPersistOnFailureTask
 from django.conf import settings
 from django.contrib.auth.models import User
+from django.core.cache import cache
 from django.core.exceptions import ValidationError
 from django.db.utils import DatabaseError
+from django.utils import timezone
 from edx_django_utils.monitoring import set_custom_metric, set_custom_metrics_for_course_key
 from opaque_keys.edx.keys import CourseKey, UsageKey
 from opaque_keys.edx.locator import CourseLocator
@@ -20,6 +24,7 @@ from submissions import api as sub_api
 from lms.djangoapps.courseware.model_data import get_score
 from lms.djangoapps.course_blocks.api import get_course_blocks
 from lms.djangoapps.grades.config.models import ComputeGradesSetting
+from openedx.core.djangoapps.content.block_structure.api import get_course_in_cache
 from openedx.core.djangoapps.content.course_overviews.models import CourseOverview
 from student.models import CourseEnrollment
 from track.event_transaction_utils import set_event_transaction_id, set_event_transaction_type
@@ -44,6 +49,7 @@ KNOWN_RETRY_ERRORS = (  # Errors we expect occasionally, should be resolved on r
     DatabaseNotReadyError,
 )
 RECALCULATE_GRADE_DELAY_SECONDS = 2  # to prevent excessive _has_db_updated failures. See TNL-6424.
+RECALCULATE_GRADE_COALESCE_TIMEOUT_SECONDS = 60 * 60
 RETRY_DELAY_SECONDS = 40
 SUBSECTION_GRADE_TIMEOUT_SECONDS = 300
 
@@ -204,6 +210,10 @@ def _recalculate_subsection_grade(self, **kwargs):
             event at the root of the current event transaction.
         score_db_table (ScoreDatabaseTableEnum): database table that houses
             the changed score. Used in conjunction with expected_modified_time.
+        coalesce_key, coalesce_token (string, OPTIONAL): identify the task
+            among those enqueued for the same user and subsections, so that
+            it is skipped if superseded by a later one.  See
+            coalesce_subsection_grade_recalculation.
     """
     try:
         course_key = CourseLocator.from_string(kwargs['course_id'])
@@ -215,6 +225,19 @@ def _recalculate_subsection_grade(self, **kwargs):
 
         set_custom_metrics_for_course_key(course_key)
         set_custom_metric('usage_id', six.text_type(scored_block_usage_key))
+        set_custom_metric(
+            'recalculate_subsection_grade_latency',
+            (timezone.now() - from_timestamp(kwargs['expected_modified_time'])).total_seconds(),
+        )
+
+        if _is_recalculation_superseded(**kwargs):
+            set_custom_metric('recalculate_subsection_grade_coalesced', True)
+            log.info(
+                u"Grades: Skipping recalculation superseded by a later one, user: %s, usage_id: %s",
+                kwargs['user_id'],
+                scored_block_usage_key,
+            )
+            return
 
         # The request cache is not maintained on celery workers,
         # where this code runs. So we take the values from the
@@ -251,6 +274,82 @@ def _recalculate_subsection_grade(self, **kwargs):
         raise self.retry(kwargs=kwargs, exc=exc)
 
 
+def coalesce_subsection_grade_recalculation(**kwargs):
+    """
+    Records that a recalculate_subsection_grade_v3 task with the given
+    arguments is about to be enqueued, superseding any task still pending
+    for the same user and subsections, and returns the coalesce_key and
+    coalesce_token arguments to add to the task.
+
+    The subsections are those that contain the scored block in the
+    collected course structure, so that score changes of different
+    problems of the same subsection are coalesced as well.  A block that
+    is missing from it is keyed on itself.
+
+    Tasks that are superseded by the time they run are skipped, since the
+    latest task recalculates the same subsection grades from the latest
+    scores, unless they were enqueued with flags that the latest task's
+    flags don't cover (see _recalculation_flags_cover).
+    """
+    course_key = CourseKey.from_string(kwargs['course_id'])
+    usage_key = UsageKey.from_string(kwargs['usage_id']).replace(course_key=course_key)
+    subsection_keys = get_course_in_cache(course_key).get_transformer_block_field(
+        usage_key, GradesTransformer, 'subsections', set(),
+    ) or {usage_key}
+    coalesce_key = u'grades.recalculate_subsection_grade.{}.{}.{}'.format(
+        course_key,
+        kwargs['user_id'],
+        hashlib.md5(u','.join(sorted(six.text_type(key) for key in subsection_keys)).encode('utf-8')).hexdigest(),
+    )
+    coalesce_token = uuid4().hex
+    latest = dict(_recalculation_flags(kwargs), token=coalesce_token)
+    cache.set(coalesce_key, latest, RECALCULATE_GRADE_COALESCE_TIMEOUT_SECONDS)
+    return dict(coalesce_key=coalesce_key, coalesce_token=coalesce_token)
+
+
+def _is_recalculation_superseded(**kwargs):
+    """
+    Returns whether a later recalculate_subsection_grade_v3 task, whose
+    flags cover those of the task with the given arguments, was enqueued
+    for the same user and subsections.
+    """
+    if kwargs.get('coalesce_key') is None or kwargs.get('coalesce_token') is None:
+        return False
+    latest = cache.get(kwargs['coalesce_key'])
+    return (
+        latest is not None and
+        latest['token'] != kwargs['coalesce_token'] and
+        _recalculation_flags_cover(latest, _recalculation_flags(kwargs))
+    )
+
+
+def _recalculation_flags(kwargs):
+    """
+    Returns the flags of the recalculate_subsection_grade_v3 task with the
+    given arguments that change how the subsection grades are updated.
+    """
+    return dict(
+        only_if_higher=bool(kwargs.get('only_if_higher')),
+        score_deleted=bool(kwargs.get('score_deleted')),
+        force_update_subsections=bool(kwargs.get('force_update_subsections')),
+    )
+
+
+def _recalculation_flags_cover(flags, other_flags):
+    """
+    Returns whether a recalculation with the given flags updates the
+    subsection grades in every case that one with the other flags does,
+    so that the latter can be skipped.  A recalculation that only raises
+    grades doesn't cover one that may lower them, and one that persists
+    grades only when attempted doesn't cover one that always persists them.
+    """
+    return (
+        (not flags['only_if_higher'] or other_flags['only_if_higher']) and
+        (flags['score_deleted'] or not other_flags['score_deleted']) and
+        (flags['force_update_subsections'] or not other_flags['force_update_subsections'])
+    )
+
+
 def _has_db_updated_with_new_score(self, scored_block_usage_key, **kwargs):
     """
     Returns whether the database has been updated with the
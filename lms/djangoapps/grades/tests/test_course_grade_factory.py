@@ -7,6 +7,7 @@ import itertools
 
 import ddt
 from django.conf import settings
+from django.test.utils import override_settings
 from mock import patch
 from six import text_type
 
@@ -20,7 +21,7 @@ from xmodule.modulestore.tests.factories import CourseFactory
 from ..config.waffle import ASSUME_ZERO_GRADE_IF_ABSENT, waffle
 from ..course_grade import CourseGrade, ZeroCourseGrade
 from ..course_grade_factory import CourseGradeFactory
-from ..subsection_grade import ReadSubsectionGrade, ZeroSubsectionGrade
+from ..subsection_grade import ReadSubsectionGrade, SnapshotSubsectionGrade, ZeroSubsectionGrade
 from .base import GradeTestBase
 from .utils import mock_get_score
 
@@ -155,6 +156,39 @@ class TestCourseGradeFactory(GradeTestBase):
                 self.assertFalse(mocked_get_score.called)  # no calls to CSM/submissions tables
                 self.assertFalse(mocked_course_blocks.called)  # no user-specific transformer calculation
 
+    @override_settings(
+        COURSE_GRADE_SNAPSHOT_CACHE_TIMEOUT=60,
+        CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+    )
+    def test_read_snapshot(self):
+        grade_factory = CourseGradeFactory()
+
+        def _assert_snapshot_read(expected_earned):
+            """
+            Reads the grade, ensuring its subsection grades come from the
+            snapshot, without any calls to the CSM/submissions tables.
+            """
+            with patch('lms.djangoapps.grades.subsection_grade.get_score') as mocked_get_score:
+                course_grade = grade_factory.read(self.request.user, self.course)
+                subsection_grade = course_grade.subsection_grades[self.sequence.location]
+                self.assertIsInstance(subsection_grade, SnapshotSubsectionGrade)
+                self.assertEqual(
+                    [score.earned for score in subsection_grade.problem_scores.values()],
+                    [expected_earned],
+                )
+                self.assertFalse(mocked_get_score.called)
+
+        with mock_get_score(1, 2):
+            grade_factory.update(self.request.user, self.course, force_update_subsections=True)
+        _assert_snapshot_read(expected_earned=1)
+
+        # As in the recalculate_subsection_grade_v3 task, only one
+        # subsection grade is updated before the course grade.
+        with mock_get_score(2, 2):
+            self.subsection_grade_factory.update(self.course_structure[self.sequence.location])
+            grade_factory.update(self.request.user, self.course)
+        _assert_snapshot_read(expected_earned=2)
+
     def test_subsection_grade(self):
         grade_factory = CourseGradeFactory()
         with mock_get_score(1, 2):
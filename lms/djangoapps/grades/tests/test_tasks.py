@@ -13,6 +13,7 @@ import pytz
 import six
 from django.conf import settings
 from django.db.utils import IntegrityError
+from django.test.utils import override_settings
 from django.utils import timezone
 from mock import MagicMock, patch
 from six.moves import range
@@ -144,6 +145,68 @@ class RecalculateSubsectionGradeTest(HasCourseWithProblemsMixin, ModuleStoreTest
             PROBLEM_WEIGHTED_SCORE_CHANGED.send(sender=None, **send_args)
             mock_task_apply.assert_called_once_with(countdown=RECALCULATE_GRADE_DELAY_SECONDS, kwargs=local_task_args)
 
+    @override_settings(
+        RECALCULATE_GRADES_COALESCE_SECONDS=10,
+        CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+    )
+    @patch('lms.djangoapps.grades.tasks._update_subsection_grades')
+    def test_coalesced_score_changes(self, mock_update):
+        """
+        Ensures that only the latest of the tasks enqueued for score changes
+        of the problems of the same subsection recalculates its grades.
+        """
+        self.set_up_course()
+        other_problem = ItemFactory.create(parent=self.sequential, category='problem')
+        other_sequential = ItemFactory.create(parent=self.chapter, category='sequential')
+        other_subsection_problem = ItemFactory.create(parent=other_sequential, category='problem')
+
+        with patch('lms.djangoapps.grades.tasks.recalculate_subsection_grade_v3.apply_async') as mock_task_apply:
+            for problem in (self.problem, other_problem, other_subsection_problem, self.problem, other_problem):
+                send_args = dict(self.problem_weighted_score_changed_kwargs, usage_id=six.text_type(problem.location))
+                PROBLEM_WEIGHTED_SCORE_CHANGED.send(sender=None, **send_args)
+        self.assertEqual(
+            [call[1]['countdown'] for call in mock_task_apply.call_args_list],
+            [10] * 5,
+        )
+
+        with self.mock_csm_get_score(MagicMock(modified=self.frozen_now_datetime + timedelta(days=1))):
+            for call in mock_task_apply.call_args_list:
+                recalculate_subsection_grade_v3.apply(kwargs=call[1]['kwargs'])
+        self.assertEqual(
+            [call[0][1] for call in mock_update.call_args_list],
+            [other_subsection_problem.location, other_problem.location],
+        )
+
+    @override_settings(
+        RECALCULATE_GRADES_COALESCE_SECONDS=10,
+        CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+    )
+    @patch('lms.djangoapps.grades.tasks._update_subsection_grades')
+    @ddt.data(
+        # Flags of the earlier and the later score changes, and whether the
+        # earlier one is recalculated.
+        ({'only_if_higher': True}, {'only_if_higher': False}, False),
+        ({'only_if_higher': False}, {'only_if_higher': True}, True),
+        ({'score_deleted': False}, {'score_deleted': True}, False),
+        ({'score_deleted': True}, {'score_deleted': False}, True),
+    )
+    @ddt.unpack
+    def test_coalesced_score_changes_flags(self, earlier_flags, later_flags, earlier_recalculated, mock_update):
+        """
+        Ensures that a task is only skipped if the flags of the latest task
+        enqueued for the same subsection cover its own.
+        """
+        self.set_up_course()
+        with patch('lms.djangoapps.grades.tasks.recalculate_subsection_grade_v3.apply_async') as mock_task_apply:
+            for flags in (earlier_flags, later_flags):
+                send_args = dict(self.problem_weighted_score_changed_kwargs, **flags)
+                PROBLEM_WEIGHTED_SCORE_CHANGED.send(sender=None, **send_args)
+
+        with self.mock_csm_get_score(MagicMock(modified=self.frozen_now_datetime + timedelta(days=1))):
+            for call in mock_task_apply.call_args_list:
+                recalculate_subsection_grade_v3.apply(kwargs=call[1]['kwargs'])
+        self.assertEqual(mock_update.call_count, 2 if earlier_recalculated else 1)
+
     @patch('lms.djangoapps.grades.signals.signals.SUBSECTION_SCORE_CHANGED.send')
     def test_triggers_subsection_score_signal(self, mock_subsection_signal):
         """
@@ -13,6 +13,8 @@ WAFFLE_SWITCHES = WaffleSwitchNamespace(name=WAFFLE_NAMESPACE)
 # Waffle switches
 OPTIMIZE_GET_LEARNERS_FOR_COURSE = u'optimize_get_learners_for_course'
 GENERATE_GRADE_REPORT_VERIFIED_ONLY = u'generate_grade_report_for_verified_only'
+PARALLEL_GRADE_REPORT = u'parallel_grade_report'
+BULK_PROBLEM_GRADE_REPORT = u'bulk_problem_grade_report'
 
 
 def waffle_flags():
@@ -35,3 +37,19 @@ def generate_grade_report_for_verified_only():
     verified learners.
     """
     return WAFFLE_SWITCHES.is_enabled(GENERATE_GRADE_REPORT_VERIFIED_ONLY)
+
+
+def parallel_grade_report_enabled():
+    """
+    Returns True if waffle switch is enabled that indicates course grade reports are
+    generated in shards of learners by separate subtasks.
+    """
+    return WAFFLE_SWITCHES.is_enabled(PARALLEL_GRADE_REPORT)
+
+
+def bulk_problem_grade_report_enabled():
+    """
+    Returns True if waffle switch is enabled that indicates problem grade reports read
+    the persisted grades and problem scores of learners in bulk.
+    """
+    return WAFFLE_SWITCHES.is_enabled(BULK_PROBLEM_GRADE_REPORT)
@@ -16,22 +16,29 @@ ASSUMPTIONS: modules have unique IDs, even across different module_types
 
 import codecs
 import csv
+import gzip
 import hashlib
 import json
 import logging
 import os.path
+import shutil
+import sys
+import tempfile
+from contextlib import contextmanager
 from uuid import uuid4
 
 import six
 from boto.exception import BotoServerError
 from django.conf import settings
 from django.contrib.auth.models import User
-from django.core.files.base import ContentFile
+from django.core.files.base import ContentFile, File
 from django.db import models, transaction
 from django.utils.encoding import python_2_unicode_compatible
 from django.utils.translation import ugettext as _
 from opaque_keys.edx.django.models import CourseKeyField
 from six import text_type
+from storages.backends.s3boto import S3BotoStorage
+from storages.backends.s3boto3 import S3Boto3Storage
 
 from openedx.core.storage import get_storage
 
@@ -286,19 +293,103 @@ class DjangoStorageReportStore(ReportStore):
 
         self.storage.save(path, buff)
 
-    def store_rows(self, course_id, filename, rows):
+    def store_rows(self, course_id, filename, rows, gzip_compressed=False):
         """
         Given a course_id, filename, and rows (each row is an iterable of
-        strings), write the rows to the storage backend in csv format.
+        strings), write the rows to the storage backend in csv format,
+        gzip-compressed if `gzip_compressed` is True. `rows` can be a
+        generator, since rows are written as they are produced.
         """
-        output_buffer = ContentFile('')
-        # Adding unicode signature (BOM) for MS Excel 2013 compatibility
-        if six.PY2:
-            output_buffer.write(codecs.BOM_UTF8)
-        csvwriter = csv.writer(output_buffer)
-        csvwriter.writerows(self._get_utf8_encoded_rows(rows))
-        output_buffer.seek(0)
-        self.store(course_id, filename, output_buffer)
+        with self.rows_writer(course_id, filename, gzip_compressed) as writer:
+            writer.writerows(rows)
+
+    @contextmanager
+    def rows_writer(self, course_id, filename, gzip_compressed=False):
+        """
+        Context manager that yields a csv writer, with `writerow` and
+        `writerows` methods, for the given course_id and filename. Rows are
+        encoded and written to the storage backend in chunks, so memory use
+        does not grow with the number of rows. The file is stored when the
+        context exits.
+        """
+        with self._writable_file(course_id, filename) as output_file:
+            if gzip_compressed:
+                output_file = gzip.GzipFile(mode='wb', fileobj=output_file)
+            try:
+                # Adding unicode signature (BOM) for MS Excel 2013 compatibility
+                if six.PY2:
+                    output_file.write(codecs.BOM_UTF8)
+                writer = _ChunkedCsvWriter(self, output_file)
+                yield writer
+                writer.flush()
+            finally:
+                if gzip_compressed:
+                    # Writes the gzip trailer; the underlying file stays open.
+                    output_file.close()
+
+    @contextmanager
+    def _writable_file(self, course_id, filename):
+        """
+        Context manager that yields a binary file object to write the given
+        file to. S3 storage backends are written to directly, using multipart
+        uploads; other backends are given a temporary file to save once it is
+        complete.  If the body of the context raises, nothing is stored.
+        """
+        path = self.path_to(course_id, filename)
+        if isinstance(self.storage, (S3BotoStorage, S3Boto3Storage)):
+            output_file = self.storage.open(path, 'wb')
+            try:
+                yield output_file
+            except BaseException:
+                exc_info = sys.exc_info()
+                _abort_upload(output_file)
+                six.reraise(*exc_info)
+            output_file.close()
+        else:
+            with tempfile.TemporaryFile() as output_file:
+                yield output_file
+                output_file.seek(0)
+                self.storage.save(path, File(output_file))
+
+    def store_merged(self, course_id, filename, rows, fragment_filenames):
+        """
+        Given a course_id, filename, rows (each row is an iterable of
+        strings) and the filenames of csv fragments previously stored with
+        `store_rows`, write the rows followed by the contents of each
+        fragment to the storage backend. Fragments are copied one at a time,
+        so they are never held in memory together.
+        """
+        with self._writable_file(course_id, filename) as output_file:
+            if six.PY2:
+                output_file.write(codecs.BOM_UTF8)
+            writer = _ChunkedCsvWriter(self, output_file)
+            writer.writerows(rows)
+            writer.flush()
+            for fragment_filename in fragment_filenames:
+                with self.open(course_id, fragment_filename) as fragment_file:
+                    # Skip the unicode signature that store_rows adds to each fragment.
+                    signature = fragment_file.read(len(codecs.BOM_UTF8))
+                    if signature != codecs.BOM_UTF8:
+                        output_file.write(signature)
+                    shutil.copyfileobj(fragment_file, output_file)
+
+    def open(self, course_id, filename):
+        """
+        Return a file object for reading the given file of the given course.
+        """
+        return self.storage.open(self.path_to(course_id, filename), 'rb')
+
+    def exists(self, course_id, filename):
+        """
+        Return whether the given file has been stored for the given course.
+        """
+        return self.storage.exists(self.path_to(course_id, filename))
+
+    def delete(self, course_id, filename):
+        """
+        Delete the given file of the given course, if it exists.
+        """
+        self.storage.delete(self.path_to(course_id, filename))
 
     def links_for(self, course_id):
         """
@@ -334,3 +425,70 @@ class DjangoStorageReportStore(ReportStore):
         """
         hashed_course_id = hashlib.sha1(text_type(course_id).encode('utf-8')).hexdigest()
         return os.path.join(hashed_course_id, filename)
+
+
+def _abort_upload(output_file):
+    """
+    Closes the given S3 storage file without completing its multipart
+    upload, which closing it normally would do, publishing a partial file.
+    """
+    # pylint: disable=protected-access
+    multipart = output_file._multipart
+    if multipart is not None:
+        try:
+            if hasattr(multipart, 'abort'):
+                # boto3
+                multipart.abort()
+            else:
+                # boto
+                multipart.cancel_upload()
+        except Exception:  # pylint: disable=broad-except
+            logger.exception(u'Aborting the upload of %s failed', output_file.name)
+    output_file._multipart = None
+    output_file._is_dirty = False
+    output_file.close()
+
+
+class _ChunkedCsvWriter(object):
+    """
+    Writes rows in csv format to a binary file object, buffering at most
+    ROWS_PER_CHUNK encoded rows at a time.
+    """
+    ROWS_PER_CHUNK = 1000
+
+    def __init__(self, report_store, output_file):
+        self.report_store = report_store
+        self.output_file = output_file
+        self.num_rows = 0
+        self._buffer = six.StringIO()
+        self._buffered_rows = 0
+        self._csvwriter = csv.writer(self._buffer)
+
+    def writerow(self, row):
+        """
+        Writes the given row.
+        """
+        self.writerows([row])
+
+    def writerows(self, rows):
+        """
+        Writes the given rows, which can be any iterable of rows.
+        """
+        for row in self.report_store._get_utf8_encoded_rows(rows):  # pylint: disable=protected-access
+            self._csvwriter.writerow(row)
+            self.num_rows += 1
+            self._buffered_rows += 1
+            if self._buffered_rows >= self.ROWS_PER_CHUNK:
+                self.flush()
+
+    def flush(self):
+        """
+        Writes the buffered rows to the file object.
+        """
+        data = self._buffer.getvalue()
+        if not six.PY2:
+            data = data.encode('utf-8')
+        self.output_file.write(data)
+        self._buffer.seek(0)
+        self._buffer.truncate()
+        self._buffered_rows = 0
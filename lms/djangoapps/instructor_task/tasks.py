@@ -21,6 +21,7 @@ of the query for traversing StudentModule objects.
 """
 
 
+import json
 import logging
 from functools import partial
 
@@ -29,6 +30,7 @@ from django.conf import settings
 from django.utils.translation import ugettext_noop
 
 from bulk_email.tasks import perform_delegate_email_batches
+from lms.djangoapps.instructor_task.models import InstructorTask
 from lms.djangoapps.instructor_task.tasks_base import BaseInstructorTask
 from lms.djangoapps.instructor_task.tasks_helper.certs import generate_students_certificates
 from lms.djangoapps.instructor_task.tasks_helper.enrollments import (
@@ -173,7 +175,10 @@ def calculate_problem_responses_csv(entry_id, xmodule_instance_args):
     return run_main_task(entry_id, task_fn, action_name)
 
 
-@task(base=BaseInstructorTask, routing_key=settings.GRADES_DOWNLOAD_ROUTING_KEY)
+# Tasks are acknowledged once they finish, so that a task whose worker dies
+# is redelivered and a report generated in shards resumes from the shards
+# that are already finished.
+@task(base=BaseInstructorTask, routing_key=settings.GRADES_DOWNLOAD_ROUTING_KEY, acks_late=True)
 def calculate_grades_csv(entry_id, xmodule_instance_args):
     """
     Grade a course and push the results to an S3 bucket for download.
@@ -189,6 +194,25 @@ def calculate_grades_csv(entry_id, xmodule_instance_args):
     return run_main_task(entry_id, task_fn, action_name)
 
 
+@task(base=BaseInstructorTask, routing_key=settings.GRADES_DOWNLOAD_ROUTING_KEY, acks_late=True)
+def calculate_grades_csv_shard(entry_id, xmodule_instance_args, shard_index):
+    """
+    Grade a shard of the enrollees of a course, for a grade report queued by
+    `calculate_grades_csv` that is generated in shards.
+    """
+    # Translators: This is a past-tense verb that is inserted into task progress messages as {action}.
+    action_name = ugettext_noop('graded')
+    TASK_LOG.info(
+        u"Task: %s, InstructorTask ID: %s, Task type: %s, Preparing for shard %s",
+        xmodule_instance_args.get('task_id'), entry_id, action_name, shard_index
+    )
+
+    entry = InstructorTask.objects.get(pk=entry_id)
+    return CourseGradeReport.generate_shard(
+        xmodule_instance_args, entry_id, entry.course_id, json.loads(entry.task_input), action_name, shard_index
+    )
+
+
 @task(base=BaseInstructorTask, routing_key=settings.GRADES_DOWNLOAD_ROUTING_KEY)
 def calculate_problem_grade_report(entry_id, xmodule_instance_args):
     """
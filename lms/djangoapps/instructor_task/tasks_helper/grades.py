@@ -3,16 +3,23 @@ Functionality for generating grade reports.
 """
 
 
+import json
 import logging
 import re
 from collections import OrderedDict, defaultdict
+from contextlib import contextmanager
 from datetime import datetime
-from itertools import chain
+from itertools import chain, islice
 from time import time
+from uuid import uuid4
 
 import six
+from celery.states import SUCCESS
+from contextlib2 import ExitStack
 from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.base import ContentFile
 from lazy import lazy
 from pytz import UTC
 from six import text_type
@@ -23,15 +30,19 @@ from course_modes.models import CourseMode
 from lms.djangoapps.certificates.models import CertificateWhitelist, GeneratedCertificate, certificate_info_for_user
 from lms.djangoapps.courseware.courses import get_course_by_id
 from lms.djangoapps.courseware.user_state_client import DjangoXBlockUserStateClient
-from lms.djangoapps.grades.api import CourseGradeFactory
+from lms.djangoapps.grades.api import BulkProblemScores, CourseGradeFactory
 from lms.djangoapps.grades.api import context as grades_context
-from lms.djangoapps.grades.api import prefetch_course_and_subsection_grades
+from lms.djangoapps.grades.api import prefetch_course_and_subsection_grades, should_persist_grades
 from lms.djangoapps.instructor_analytics.basic import list_problem_responses
 from lms.djangoapps.instructor_analytics.csvs import format_dictlist
 from lms.djangoapps.instructor_task.config.waffle import (
+    bulk_problem_grade_report_enabled,
     generate_grade_report_for_verified_only,
-    optimize_get_learners_switch_enabled
+    optimize_get_learners_switch_enabled,
+    parallel_grade_report_enabled
 )
+from lms.djangoapps.instructor_task.models import InstructorTask, ReportStore
+from lms.djangoapps.instructor_task.subtasks import initialize_subtask_info
 from lms.djangoapps.teams.models import CourseTeamMembership
 from lms.djangoapps.verify_student.services import IDVerificationService
 from opaque_keys.edx.keys import UsageKey
@@ -45,7 +56,7 @@ from xmodule.partitions.partitions_service import PartitionService
 from xmodule.split_test_module import get_split_user_partitions
 
 from .runner import TaskProgress
-from .utils import upload_csv_to_report_store
+from .utils import upload_csv_to_report_store, upload_csv_writer, upload_merged_csv_to_report_store
 
 TASK_LOG = logging.getLogger('edx.celery.task')
 
@@ -69,6 +80,18 @@ def _flatten(iterable):
     return list(chain.from_iterable(iterable))
 
 
+def _enrolled_users_filter_kwargs(course_id, verified_only=False):
+    """
+    Returns the filter kwargs for the users enrolled in the given course.
+    """
+    filter_kwargs = {
+        'courseenrollment__course_id': course_id,
+    }
+    if verified_only:
+        filter_kwargs['courseenrollment__mode'] = CourseMode.VERIFIED
+    return filter_kwargs
+
+
 class _CourseGradeReportContext(object):
     """
     Internal class that provides a common context to use for a single grade
@@ -197,6 +220,146 @@ class _CourseGradeBulkContext(object):
         BulkCourseTags.prefetch(context.course_id, users)
 
 
+class _CourseGradeReportShards(object):
+    """
+    Checkpoints of a grade report that is generated in shards of enrollees
+    by separate subtasks.
+
+    The enrollees are split into ranges of user ids, recorded in a manifest
+    in the report store so that every subtask and any later attempt at the
+    report agree on them.  Each subtask stores the rows of its shard as CSV
+    fragments, followed by a status file that marks the shard as finished.
+    An attempt that is restarted after a worker dies only grades the shards
+    that are not finished yet.
+    """
+    # Lock expiration should be long enough to allow the fragments to be merged.
+    MERGE_LOCK_EXPIRE = 60 * 10
+
+    def __init__(self, context, entry_id):
+        self.context = context
+        self.entry_id = entry_id
+        self.report_store = ReportStore.from_config(config_name='GRADES_DOWNLOAD')
+
+    @lazy
+    def ranges(self):
+        """
+        Returns the list of [first user id, last user id] ranges of the
+        shards, or None if the shards have not been created yet.
+        """
+        if not self.report_store.exists(self.context.course_id, self._filename(u'manifest.json')):
+            return None
+        return self._read_json(u'manifest.json')['ranges']
+
+    def create(self, user_ids, shard_size):
+        """
+        Splits the given ordered user ids into shards of shard_size users
+        and records them in the manifest.
+        """
+        ranges = []
+        for index in range(0, len(user_ids), shard_size):
+            shard_user_ids = user_ids[index:index + shard_size]
+            ranges.append([shard_user_ids[0], shard_user_ids[-1]])
+        self._write_json(u'manifest.json', {'ranges': ranges})
+        self.ranges = ranges
+
+    def unfinished(self):
+        """
+        Returns the indices of the shards that are not finished yet.
+        """
+        return [
+            index for index in range(len(self.ranges))
+            if not self.report_store.exists(self.context.course_id, self._filename(u'{:05d}.json'.format(index)))
+        ]
+
+    def merged(self):
+        """
+        Returns whether the shards were merged, and deleted, already.
+        """
+        return not self.report_store.exists(self.context.course_id, self._filename(u'manifest.json'))
+
+    def store(self, index, batched_rows):
+        """
+        Stores the given batches of (success_rows, error_rows) of the given
+        shard and marks it as finished.
+        """
+        course_id = self.context.course_id
+        with self.report_store.rows_writer(course_id, self._filename(u'{:05d}.csv'.format(index))) as success_writer:
+            with self.report_store.rows_writer(
+                course_id, self._filename(u'{:05d}_err.csv'.format(index))
+            ) as error_writer:
+                for success_rows, error_rows in batched_rows:
+                    success_writer.writerows(success_rows)
+                    error_writer.writerows(error_rows)
+        self._write_json(
+            u'{:05d}.json'.format(index),
+            {'succeeded': success_writer.num_rows, 'failed': error_writer.num_rows},
+        )
+
+    def merge(self, success_headers, error_headers):
+        """
+        Uploads the reports merged from the fragments of all shards, and
+        returns the total number of (succeeded, failed) rows.
+        """
+        statuses = [self._read_json(u'{:05d}.json'.format(index)) for index in range(len(self.ranges))]
+        succeeded = sum(status['succeeded'] for status in statuses)
+        failed = sum(status['failed'] for status in statuses)
+
+        date = datetime.now(UTC)
+        upload_merged_csv_to_report_store(
+            [success_headers],
+            [self._filename(u'{:05d}.csv'.format(index)) for index in range(len(self.ranges))],
+            'grade_report',
+            self.context.course_id,
+            date,
+        )
+        if failed > 0:
+            upload_merged_csv_to_report_store(
+                [error_headers],
+                [
+                    self._filename(u'{:05d}_err.csv'.format(index))
+                    for index, status in enumerate(statuses) if status['failed']
+                ],
+                'grade_report_err',
+                self.context.course_id,
+                date,
+            )
+        return succeeded, failed
+
+    def delete(self):
+        """
+        Deletes the manifest and the fragments of all shards.
+        """
+        for index in range(len(self.ranges)):
+            for name in (u'{:05d}.csv', u'{:05d}_err.csv', u'{:05d}.json'):
+                self.report_store.delete(self.context.course_id, self._filename(name.format(index)))
+        self.report_store.delete(self.context.course_id, self._filename(u'manifest.json'))
+
+    @contextmanager
+    def merge_lock(self):
+        """
+        Context manager that yields whether this process acquired the lock
+        for merging the shards, so that the report is only merged once when
+        several shards finish at the same time.
+        """
+        key = u'grade_report_shards_merge_{}'.format(self.entry_id)
+        acquired = cache.add(key, 'true', self.MERGE_LOCK_EXPIRE)
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                cache.delete(key)
+
+    def _filename(self, name):
+        return u'grade_report_shards/{}/{}'.format(self.entry_id, name)
+
+    def _read_json(self, name):
+        with self.report_store.open(self.context.course_id, self._filename(name)) as json_file:
+            return json.loads(json_file.read().decode('utf-8'))
+
+    def _write_json(self, name, data):
+        self.report_store.store(self.context.course_id, self._filename(name), ContentFile(json.dumps(data)))
+
+
 class CourseGradeReport(object):
     """
     Class to encapsulate functionality related to generating Grade Reports.
@@ -204,6 +367,10 @@ class CourseGradeReport(object):
     # Batch size for chunking the list of enrollees in the course.
     USER_BATCH_SIZE = 100
 
+    # Number of enrollees graded by each subtask when the report is
+    # generated in shards.
+    USER_SHARD_SIZE = 5000
+
     @classmethod
     def generate(cls, _xmodule_instance_args, _entry_id, course_id, _task_input, action_name):
         """
@@ -211,8 +378,20 @@ class CourseGradeReport(object):
         """
         with modulestore().bulk_operations(course_id):
             context = _CourseGradeReportContext(_xmodule_instance_args, _entry_id, course_id, _task_input, action_name)
+            if parallel_grade_report_enabled():
+                return CourseGradeReport()._generate_in_shards(context, _xmodule_instance_args, _entry_id)
             return CourseGradeReport()._generate(context)
 
+    @classmethod
+    def generate_shard(cls, _xmodule_instance_args, _entry_id, course_id, _task_input, action_name, shard_index):
+        """
+        Public method to generate a single shard of a grade report that is
+        generated in shards.
+        """
+        with modulestore().bulk_operations(course_id):
+            context = _CourseGradeReportContext(_xmodule_instance_args, _entry_id, course_id, _task_input, action_name)
+            return CourseGradeReport()._generate_shard(context, _entry_id, shard_index)
+
     def _generate(self, context):
         """
         Internal method for generating a grade report for the given context.
@@ -222,14 +401,100 @@ class CourseGradeReport(object):
         error_headers = self._error_headers()
         batched_rows = self._batched_rows(context)
 
-        context.update_status(u'Compiling grades')
-        success_rows, error_rows = self._compile(context, batched_rows)
-
-        context.update_status(u'Uploading grades')
-        self._upload(context, success_headers, success_rows, error_headers, error_rows)
+        context.update_status(u'Compiling and uploading grades')
+        self._upload(context, success_headers, error_headers, self._compile(context, batched_rows))
 
         return context.update_status(u'Completed grades')
 
+    def _generate_in_shards(self, context, xmodule_instance_args, entry_id):
+        """
+        Internal method for splitting the grade report for the given context
+        into shards, and queuing a subtask for each shard that is not
+        finished yet.  The last subtask to finish merges the report.
+        """
+        # Avoid a circular import, since the tasks module imports this one.
+        from lms.djangoapps.instructor_task.tasks import calculate_grades_csv_shard
+
+        shards = _CourseGradeReportShards(context, entry_id)
+        if shards.ranges is None:
+            context.update_status(u'Starting grades')
+            user_ids = list(
+                get_user_model().objects.filter(
+                    **_enrolled_users_filter_kwargs(context.course_id, generate_grade_report_for_verified_only())
+                ).values_list('id', flat=True).order_by('id')
+            )
+            shards.create(user_ids, self.USER_SHARD_SIZE)
+
+        unfinished = shards.unfinished()
+        if not unfinished:
+            return self._merge_shards(context, shards)
+
+        subtask_ids = [str(uuid4()) for _ in unfinished]
+        initialize_subtask_info(
+            InstructorTask.objects.get(pk=entry_id), context.action_name, len(shards.ranges), subtask_ids
+        )
+        context.update_status(u'Queuing {} of {} grade shards'.format(len(unfinished), len(shards.ranges)))
+        for shard_index, subtask_id in zip(unfinished, subtask_ids):
+            calculate_grades_csv_shard.apply_async((entry_id, xmodule_instance_args, shard_index), task_id=subtask_id)
+        return context.update_status(u'Queued grade shards')
+
+    def _generate_shard(self, context, entry_id, shard_index):
+        """
+        Internal method for grading the enrollees of the given shard of the
+        grade report for the given context, and merging the report if all of
+        its shards are finished.
+        """
+        shards = _CourseGradeReportShards(context, entry_id)
+        if shards.ranges is None:
+            # The report was merged by another subtask already.
+            return context.update_status(u'Completed grades')
+
+        context.update_status(u'Compiling grades for shard {}'.format(shard_index))
+        first_user_id, last_user_id = shards.ranges[shard_index]
+        users = list(
+            get_user_model().objects.filter(
+                id__gte=first_user_id,
+                id__lte=last_user_id,
+                **_enrolled_users_filter_kwargs(context.course_id, generate_grade_report_for_verified_only())
+            ).select_related('profile').order_by('id')
+        )
+        user_batches = [
+            users[index:index + self.USER_BATCH_SIZE] for index in range(0, len(users), self.USER_BATCH_SIZE)
+        ]
+        shards.store(shard_index, self._batched_rows(context, user_batches))
+
+        if shards.unfinished():
+            return context.update_status(u'Completed grades for shard {}'.format(shard_index))
+        return self._merge_shards(context, shards)
+
+    def _merge_shards(self, context, shards):
+        """
+        Internal method for merging the finished shards of a grade report
+        into its final reports, and marking the report's task as succeeded.
+        """
+        with shards.merge_lock() as acquired:
+            if not acquired:
+                return context.update_status(u'Merging grades in another subtask')
+            if shards.merged():
+                # Another subtask merged the report since this one found
+                # every shard finished.
+                return context.update_status(u'Completed grades')
+
+            context.update_status(u'Merging grades')
+            succeeded, failed = shards.merge(self._success_headers(context), self._error_headers())
+            shards.delete()
+
+        context.task_progress.succeeded = succeeded
+        context.task_progress.failed = failed
+        context.task_progress.attempted = context.task_progress.total = succeeded + failed
+        task_progress = context.update_status(u'Completed grades')
+
+        entry = InstructorTask.objects.get(pk=shards.entry_id)
+        entry.task_output = InstructorTask.create_output_for_success(task_progress)
+        entry.task_state = SUCCESS
+        entry.save_now()
+        return task_progress
+
     def _success_headers(self, context):
         """
         Returns a list of all applicable column headers for this grade report.
@@ -251,40 +516,52 @@ class CourseGradeReport(object):
         """
         return ["Student ID", "Username", "Error"]
 
-    def _batched_rows(self, context):
+    def _batched_rows(self, context, user_batches=None):
         """
-        A generator of batches of (success_rows, error_rows) for this report.
+        A generator of batches of (success_rows, error_rows) for this report,
+        for the given batches of users or else all enrolled users.
         """
-        for users in self._batch_users(context):
+        if user_batches is None:
+            user_batches = self._batch_users(context)
+        for users in user_batches:
             users = [u for u in users if u is not None]
             yield self._rows_for_users(context, users)
 
     def _compile(self, context, batched_rows):
         """
-        Compiles and returns the complete list of (success_rows, error_rows) for
-        the given batched_rows and context.
+        A generator of the (success_rows, error_rows) batches in the given
+        batched_rows, which updates the metrics on task status with each batch.
         """
-        # partition and chain successes and errors
-        success_rows, error_rows = zip(*batched_rows)
-        success_rows = list(chain(*success_rows))
-        error_rows = list(chain(*error_rows))
-
-        # update metrics on task status
-        context.task_progress.succeeded = len(success_rows)
-        context.task_progress.failed = len(error_rows)
-        context.task_progress.attempted = context.task_progress.succeeded + context.task_progress.failed
-        context.task_progress.total = context.task_progress.attempted
-        return success_rows, error_rows
-
-    def _upload(self, context, success_headers, success_rows, error_headers, error_rows):
+        task_progress = context.task_progress
+        task_progress.succeeded = task_progress.failed = 0
+        for success_rows, error_rows in batched_rows:
+            task_progress.succeeded += len(success_rows)
+            task_progress.failed += len(error_rows)
+            task_progress.attempted = task_progress.succeeded + task_progress.failed
+            task_progress.total = task_progress.attempted
+            yield success_rows, error_rows
+
+    def _upload(self, context, success_headers, error_headers, batched_rows):
         """
-        Creates and uploads a CSV for the given headers and rows.
+        Creates and uploads CSVs for the given headers and batched rows.  Each
+        batch is uploaded as it is compiled, so that only one batch of rows is
+        held in memory at a time.  The error CSV is only created if there are
+        error rows.
         """
         date = datetime.now(UTC)
-        upload_csv_to_report_store([success_headers] + success_rows, 'grade_report', context.course_id, date)
-        if len(error_rows) > 0:
-            error_rows = [error_headers] + error_rows
-            upload_csv_to_report_store(error_rows, 'grade_report_err', context.course_id, date)
+        with ExitStack() as stack:
+            _, success_writer = stack.enter_context(upload_csv_writer('grade_report', context.course_id, date))
+            success_writer.writerow(success_headers)
+            error_writer = None
+            for success_rows, error_rows in batched_rows:
+                success_writer.writerows(success_rows)
+                if error_rows:
+                    if error_writer is None:
+                        _, error_writer = stack.enter_context(
+                            upload_csv_writer('grade_report_err', context.course_id, date)
+                        )
+                        error_writer.writerow(error_headers)
+                    error_writer.writerows(error_rows)
 
     def _grades_header(self, context):
         """
@@ -344,12 +621,7 @@ class CourseGradeReport(object):
             This generator method fetches & loads the enrolled user objects on demand which in chunk
             size defined. This method is a workaround to avoid out-of-memory errors.
             """
-            filter_kwargs = {
-                'courseenrollment__course_id': course_id,
-            }
-            if verified_only:
-                filter_kwargs['courseenrollment__mode'] = CourseMode.VERIFIED
-
+            filter_kwargs = _enrolled_users_filter_kwargs(course_id, verified_only)
             user_ids_list = get_user_model().objects.filter(**filter_kwargs).values_list('id', flat=True).order_by('id')
             user_chunks = grouper(user_ids_list)
             for user_ids in user_chunks:
@@ -520,6 +792,10 @@ class CourseGradeReport(object):
 
 
 class ProblemGradeReport(object):
+    # Batch size for chunking the list of enrollees when their scores are
+    # read in bulk.
+    USER_BATCH_SIZE = 100
+
     @classmethod
     def generate(cls, _xmodule_instance_args, _entry_id, course_id, _task_input, action_name):
         """
@@ -571,11 +847,17 @@ class ProblemGradeReport(object):
         log_task_info(u'Fetching enrollment status')
         CourseEnrollment.bulk_fetch_enrollment_states(enrolled_students, course_id)
 
-        for student, course_grade, error in CourseGradeFactory().iter(enrolled_students, course):
+        if bulk_problem_grade_report_enabled() and should_persist_grades(course_id):
+            log_task_info(u'Reading persisted grades in bulk')
+            grade_results = cls._bulk_grade_results(course, enrolled_students, graded_scorable_blocks)
+        else:
+            grade_results = cls._grade_results(course, enrolled_students, graded_scorable_blocks)
+
+        for student, percent, earned_possible_values, error in grade_results:
             student_fields = [getattr(student, field_name) for field_name in header_row]
             task_progress.attempted += 1
 
-            if not course_grade:
+            if percent is None:
                 err_msg = text_type(error)
                 # There was an error grading this student.
                 if not err_msg:
@@ -586,19 +868,7 @@ class ProblemGradeReport(object):
 
             enrollment_status = _user_enrollment_status(student, course_id)
 
-            earned_possible_values = []
-            for block_location in graded_scorable_blocks:
-                try:
-                    problem_score = course_grade.problem_scores[block_location]
-                except KeyError:
-                    earned_possible_values.append([u'Not Available', u'Not Available'])
-                else:
-                    if problem_score.first_attempted:
-                        earned_possible_values.append([problem_score.earned, problem_score.possible])
-                    else:
-                        earned_possible_values.append([u'Not Attempted', problem_score.possible])
-
-            rows.append(student_fields + [enrollment_status, course_grade.percent] + _flatten(earned_possible_values))
+            rows.append(student_fields + [enrollment_status, percent] + _flatten(earned_possible_values))
 
             task_progress.succeeded += 1
             if task_progress.attempted % status_interval == 0:
@@ -617,6 +887,83 @@ class ProblemGradeReport(object):
 
         return task_progress.update_task_state(extra_meta={'step': 'Uploading CSV'})
 
+    @classmethod
+    def _grade_results(cls, course, students, graded_scorable_blocks):
+        """
+        A generator of (student, percent, earned_possible_values, error)
+        tuples for the given students, computed from each student's
+        CourseGrade. The percent is None if the student could not be graded.
+        """
+        for student, course_grade, error in CourseGradeFactory().iter(students, course):
+            if not course_grade:
+                yield student, None, None, error
+                continue
+
+            earned_possible_values = [
+                cls._earned_possible(course_grade.problem_scores.get(block_location))
+                for block_location in graded_scorable_blocks
+            ]
+            yield student, course_grade.percent, earned_possible_values, None
+
+    @classmethod
+    def _bulk_grade_results(cls, course, students, graded_scorable_blocks):
+        """
+        A generator of (student, percent, earned_possible_values, error)
+        tuples for the given students, like `_grade_results`, but read in
+        batches from the persisted grades and problem scores. The scores of
+        each batch are computed one problem column at a time. Students
+        without a persisted course grade are graded through their CourseGrade.
+        """
+        collected_block_structure = get_course_in_cache(course.id)
+        students = iter(students)
+        while True:
+            users = list(islice(students, cls.USER_BATCH_SIZE))
+            if not users:
+                return
+
+            try:
+                bulk_scores = BulkProblemScores(course.id, collected_block_structure, users)
+                graded_users = [user for user in users if user.id in bulk_scores.course_grades]
+                columns = [
+                    [cls._earned_possible(problem_score) for problem_score in
+                     bulk_scores.problem_scores(block_location, graded_users)]
+                    for block_location in graded_scorable_blocks
+                ]
+            except Exception:  # pylint: disable=broad-except
+                TASK_LOG.exception(
+                    u'Cannot read grades in bulk in course %s, grading the batch individually instead', course.id
+                )
+                for grade_result in cls._grade_results(course, users, graded_scorable_blocks):
+                    yield grade_result
+                continue
+
+            results_by_user_id = {
+                user.id: (
+                    user,
+                    bulk_scores.course_grades[user.id].percent_grade,
+                    [column[index] for column in columns],
+                    None,
+                )
+                for index, user in enumerate(graded_users)
+            }
+            ungraded_users = [user for user in users if user.id not in results_by_user_id]
+            for grade_result in cls._grade_results(course, ungraded_users, graded_scorable_blocks):
+                results_by_user_id[grade_result[0].id] = grade_result
+            for user in users:
+                yield results_by_user_id[user.id]
+
+    @staticmethod
+    def _earned_possible(problem_score):
+        """
+        Returns the [earned, possible] report values for the given
+        ProblemScore, or for a problem that is not available if None.
+        """
+        if problem_score is None:
+            return [u'Not Available', u'Not Available']
+        if problem_score.first_attempted:
+            return [problem_score.earned, problem_score.possible]
+        return [u'Not Attempted', problem_score.possible]
+
     @classmethod
     def _graded_scorable_blocks_to_header(cls, course):
         """
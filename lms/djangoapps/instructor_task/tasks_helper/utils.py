@@ -3,6 +3,8 @@ Utility methods for instructor tasks
 """
 
 
+from contextlib import contextmanager
+
 from eventtracking import tracker
 
 from lms.djangoapps.instructor_task.models import ReportStore
@@ -19,35 +21,85 @@ UPDATE_STATUS_FAILED = 'failed'
 UPDATE_STATUS_SKIPPED = 'skipped'
 
 
-def upload_csv_to_report_store(rows, csv_name, course_id, timestamp, config_name='GRADES_DOWNLOAD'):
+def upload_csv_to_report_store(rows, csv_name, course_id, timestamp, config_name='GRADES_DOWNLOAD',
+                               gzip_compressed=False):
     """
     Upload data as a CSV using ReportStore.
 
     Arguments:
         rows: CSV data in the following format (first column may be a
-            header):
+            header), or a generator of such rows:
             [
                 [row1_colum1, row1_colum2, ...],
                 ...
             ]
         csv_name: Name of the resulting CSV
         course_id: ID of the course
+        gzip_compressed: Whether to upload the CSV gzip-compressed
 
     Returns:
         report_name: string - Name of the generated report
     """
+    with upload_csv_writer(csv_name, course_id, timestamp, config_name, gzip_compressed) as (report_name, writer):
+        writer.writerows(rows)
+    return report_name
+
+
+@contextmanager
+def upload_csv_writer(csv_name, course_id, timestamp, config_name='GRADES_DOWNLOAD', gzip_compressed=False):
+    """
+    Context manager to upload data as a CSV using ReportStore, one row at
+    a time.
+
+    Yields a (report_name, writer) tuple, where writer has `writerow` and
+    `writerows` methods. Rows are uploaded in chunks as they are written,
+    and the report is complete when the context exits.
+    """
     report_store = ReportStore.from_config(config_name)
-    report_name = u"{course_prefix}_{csv_name}_{timestamp_str}.csv".format(
-        course_prefix=course_filename_prefix_generator(course_id),
-        csv_name=csv_name,
-        timestamp_str=timestamp.strftime("%Y-%m-%d-%H%M")
-    )
+    report_name = _report_name(csv_name, course_id, timestamp, gzip_compressed)
 
-    report_store.store_rows(course_id, report_name, rows)
+    with report_store.rows_writer(course_id, report_name, gzip_compressed) as writer:
+        yield report_name, writer
+    tracker_emit(csv_name)
+
+
+def upload_merged_csv_to_report_store(rows, fragment_filenames, csv_name, course_id, timestamp,
+                                      config_name='GRADES_DOWNLOAD'):
+    """
+    Upload data as a CSV using ReportStore, where the data is the given rows
+    followed by the contents of CSV fragments previously stored for the
+    course in the same ReportStore.
+
+    Arguments:
+        rows: CSV data to write before the fragments, in the format
+            accepted by `upload_csv_to_report_store`.
+        fragment_filenames: Names of the fragments to append, in order.
+        csv_name: Name of the resulting CSV
+        course_id: ID of the course
+
+    Returns:
+        report_name: string - Name of the generated report
+    """
+    report_store = ReportStore.from_config(config_name)
+    report_name = _report_name(csv_name, course_id, timestamp)
+
+    report_store.store_merged(course_id, report_name, rows, fragment_filenames)
     tracker_emit(csv_name)
     return report_name
 
 
+def _report_name(csv_name, course_id, timestamp, gzip_compressed=False):
+    """
+    Returns the name of the report CSV with the given name for the given course.
+    """
+    return u"{course_prefix}_{csv_name}_{timestamp_str}.csv{extension}".format(
+        course_prefix=course_filename_prefix_generator(course_id),
+        csv_name=csv_name,
+        timestamp_str=timestamp.strftime("%Y-%m-%d-%H%M"),
+        extension=u'.gz' if gzip_compressed else u'',
+    )
+
+
 def tracker_emit(report_name):
     """
     Emits a 'report.requested' event for the given report.
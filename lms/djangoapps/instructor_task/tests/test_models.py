@@ -4,9 +4,11 @@ Tests for instructor_task/models.py.
 
 
 import copy
+import gzip
 import time
 from six import StringIO
 
+import ddt
 from django.conf import settings
 from django.test import SimpleTestCase, TestCase, override_settings
 from opaque_keys.edx.locator import CourseLocator
@@ -69,7 +71,48 @@ class ReportStoreTestMixin(object):
             ['new_file', 'middle_file', 'old_file']
         )
 
+    @ddt.data(False, True)
+    def test_store_rows_from_generator(self, gzip_compressed):
+        """
+        Test that ReportStore.store_rows() writes rows from a generator in
+        chunks, optionally gzip-compressed.
+        """
+        report_store = self.create_report_store()
+        num_rows = 2500
+        report_store.store_rows(
+            self.course_id,
+            'rows.csv',
+            ([index, u'ni\xf1o'] for index in range(num_rows)),
+            gzip_compressed=gzip_compressed,
+        )
+
+        with report_store.open(self.course_id, 'rows.csv') as csv_file:
+            data = csv_file.read()
+        if gzip_compressed:
+            data = gzip.decompress(data)
+        lines = data.decode('utf-8').splitlines()
+        self.assertEqual(len(lines), num_rows)
+        self.assertEqual(lines[-1], u'{},ni\xf1o'.format(num_rows - 1))
+
+    @ddt.data(False, True)
+    def test_store_rows_error(self, gzip_compressed):
+        """
+        Test that ReportStore.store_rows() stores nothing when the rows
+        generator raises midway.
+        """
+        def rows():
+            """ Generates some rows, then fails """
+            for index in range(2500):
+                yield [index, u'ni\xf1o']
+            raise ValueError
+
+        report_store = self.create_report_store()
+        with self.assertRaises(ValueError):
+            report_store.store_rows(self.course_id, 'rows.csv', rows(), gzip_compressed=gzip_compressed)
+        self.assertFalse(report_store.exists(self.course_id, 'rows.csv'))
+
 
+@ddt.ddt
 class LocalFSReportStoreTestCase(ReportStoreTestMixin, TestReportMixin, SimpleTestCase):
     """
     Test the old LocalFSReportStore configuration.
@@ -82,6 +125,7 @@ class LocalFSReportStoreTestCase(ReportStoreTestMixin, TestReportMixin, SimpleTe
         return ReportStore.from_config(config_name='GRADES_DOWNLOAD')
 
 
+@ddt.ddt
 class DjangoStorageReportStoreLocalTestCase(ReportStoreTestMixin, TestReportMixin, SimpleTestCase):
     """
     Test the DjangoStorageReportStore implementation using the local
@@ -98,6 +142,7 @@ class DjangoStorageReportStoreLocalTestCase(ReportStoreTestMixin, TestReportMixi
             return ReportStore.from_config(config_name='GRADES_DOWNLOAD')
 
 
+@ddt.ddt
 class DjangoStorageReportStoreS3TestCase(MockS3BotoMixin, ReportStoreTestMixin, TestReportMixin, SimpleTestCase):
     """
     Test the DjangoStorageReportStore implementation using S3 stubs.
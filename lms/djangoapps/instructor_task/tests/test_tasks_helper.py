@@ -9,6 +9,7 @@ Unit tests for LMS instructor-initiated background tasks helper functions.
 """
 
 
+import json
 import os
 import shutil
 import tempfile
@@ -22,6 +23,7 @@ from six.moves.urllib.parse import quote  # pylint: disable=import-error
 import ddt
 import openedx.core.djangoapps.user_api.course_tag.api as course_tag_api
 import unicodecsv
+from celery.states import SUCCESS
 from capa.tests.response_xml_factory import MultipleChoiceResponseXMLFactory
 from course_modes.models import CourseMode
 from course_modes.tests.factories import CourseModeFactory
@@ -34,7 +36,11 @@ from lms.djangoapps.certificates.models import CertificateStatuses, GeneratedCer
 from lms.djangoapps.certificates.tests.factories import CertificateWhitelistFactory, GeneratedCertificateFactory
 from lms.djangoapps.courseware.tests.factories import InstructorFactory
 from lms.djangoapps.grades.course_data import CourseData
-from lms.djangoapps.grades.models import PersistentCourseGrade, PersistentSubsectionGradeOverride
+from lms.djangoapps.grades.models import (
+    PersistentCourseGrade,
+    PersistentSubsectionGrade,
+    PersistentSubsectionGradeOverride
+)
 from lms.djangoapps.grades.subsection_grade import CreateSubsectionGrade
 from lms.djangoapps.grades.transformer import GradesTransformer
 from lms.djangoapps.instructor_analytics.basic import UNAVAILABLE, list_problem_responses
@@ -50,13 +56,16 @@ from lms.djangoapps.instructor_task.tasks_helper.grades import (
     NOT_ENROLLED_IN_COURSE,
     CourseGradeReport,
     ProblemGradeReport,
-    ProblemResponses
+    ProblemResponses,
+    _CourseGradeReportContext,
+    _CourseGradeReportShards
 )
 from lms.djangoapps.instructor_task.tasks_helper.misc import (
     cohort_students_and_upload,
     upload_course_survey_report,
     upload_ora2_data
 )
+from lms.djangoapps.instructor_task.tests.factories import InstructorTaskFactory
 from lms.djangoapps.instructor_task.tests.test_base import (
     InstructorTaskCourseTestCase,
     InstructorTaskModuleTestCase,
@@ -90,8 +99,8 @@ from xmodule.modulestore.tests.django_utils import SharedModuleStoreTestCase
 from xmodule.modulestore.tests.factories import CourseFactory, ItemFactory, check_mongo_calls
 from xmodule.partitions.partitions import Group, UserPartition
 
-from ..config.waffle import GENERATE_GRADE_REPORT_VERIFIED_ONLY
-from ..models import ReportStore
+from ..config.waffle import BULK_PROBLEM_GRADE_REPORT, GENERATE_GRADE_REPORT_VERIFIED_ONLY, PARALLEL_GRADE_REPORT
+from ..models import InstructorTask, ReportStore
 from ..tasks_helper.utils import UPDATE_STATUS_FAILED, UPDATE_STATUS_SUCCEEDED
 
 _TEAMS_CONFIG = TeamsConfig({
@@ -99,6 +108,8 @@ _TEAMS_CONFIG = TeamsConfig({
     'topics': [{'id': 'topic', 'name': 'Topic', 'description': 'A Topic'}],
 })
 SWITCH_GENERATE_GRADE_REPORT_VERIFIED_ONLY = '.'.join(['instructor_task', GENERATE_GRADE_REPORT_VERIFIED_ONLY])
+SWITCH_PARALLEL_GRADE_REPORT = '.'.join(['instructor_task', PARALLEL_GRADE_REPORT])
+SWITCH_BULK_PROBLEM_GRADE_REPORT = '.'.join(['instructor_task', BULK_PROBLEM_GRADE_REPORT])
 
 
 class InstructorGradeReportTestCase(TestReportMixin, InstructorTaskCourseTestCase):
@@ -448,6 +459,93 @@ class TestInstructorGradeReport(InstructorGradeReportTestCase):
             {'attempted': expected_students, 'succeeded': expected_students, 'failed': 0}, result
         )
 
+    @override_switch(SWITCH_PARALLEL_GRADE_REPORT, active=True)
+    @patch('lms.djangoapps.instructor_task.tasks_helper.grades.CourseGradeReport.USER_SHARD_SIZE', 2)
+    @patch('lms.djangoapps.instructor_task.tasks_helper.runner._get_current_task')
+    def test_grade_report_in_shards(self, _mock_current_task):
+        """
+        Test that a report generated in shards by subtasks is merged into
+        a single report once all of its shards are finished.
+        """
+        for i in range(5):
+            self.create_student(u'student{}'.format(i), u'student{}@example.com'.format(i))
+        entry = InstructorTaskFactory.create(course_id=self.course.id, task_type='grade_course')
+
+        CourseGradeReport.generate({}, entry.id, self.course.id, None, 'graded')
+
+        entry = InstructorTask.objects.get(pk=entry.id)
+        self.assertEqual(entry.task_state, SUCCESS)
+        self.assertDictContainsSubset({'attempted': 5, 'succeeded': 5, 'failed': 0}, json.loads(entry.task_output))
+
+        report_store = ReportStore.from_config(config_name='GRADES_DOWNLOAD')
+        self.assertEqual(len(report_store.links_for(self.course.id)), 1)
+        self.verify_rows_in_csv(
+            [{'Username': u'student{}'.format(i)} for i in range(5)],
+            ignore_other_columns=True,
+        )
+        self.assertFalse(report_store.exists(self.course.id, u'grade_report_shards/{}/manifest.json'.format(entry.id)))
+
+    @override_switch(SWITCH_PARALLEL_GRADE_REPORT, active=True)
+    @patch('lms.djangoapps.instructor_task.tasks_helper.grades.CourseGradeReport.USER_SHARD_SIZE', 2)
+    @patch('lms.djangoapps.instructor_task.tasks_helper.runner._get_current_task')
+    @patch('lms.djangoapps.instructor_task.tasks.calculate_grades_csv_shard.apply_async')
+    def test_grade_report_in_shards_resumes(self, mock_apply_async, _mock_current_task):
+        """
+        Test that a report generated in shards only queues the shards that
+        are not finished yet when it is restarted.
+        """
+        for i in range(5):
+            self.create_student(u'student{}'.format(i), u'student{}@example.com'.format(i))
+        entry = InstructorTaskFactory.create(course_id=self.course.id, task_type='grade_course')
+
+        CourseGradeReport.generate({}, entry.id, self.course.id, None, 'graded')
+        self.assertEqual([call[0][0][2] for call in mock_apply_async.call_args_list], [0, 1, 2])
+
+        CourseGradeReport.generate_shard({}, entry.id, self.course.id, None, 'graded', 1)
+        mock_apply_async.reset_mock()
+        CourseGradeReport.generate({}, entry.id, self.course.id, None, 'graded')
+        self.assertEqual([call[0][0][2] for call in mock_apply_async.call_args_list], [0, 2])
+
+        for shard_index in (0, 2):
+            CourseGradeReport.generate_shard({}, entry.id, self.course.id, None, 'graded', shard_index)
+        self.assertEqual(InstructorTask.objects.get(pk=entry.id).task_state, SUCCESS)
+        self.verify_rows_in_csv(
+            [{'Username': u'student{}'.format(i)} for i in range(5)],
+            ignore_other_columns=True,
+        )
+
+    @override_switch(SWITCH_PARALLEL_GRADE_REPORT, active=True)
+    @patch('lms.djangoapps.instructor_task.tasks_helper.grades.CourseGradeReport.USER_SHARD_SIZE', 2)
+    @patch('lms.djangoapps.instructor_task.tasks_helper.runner._get_current_task')
+    @patch('lms.djangoapps.instructor_task.tasks.calculate_grades_csv_shard.apply_async')
+    def test_grade_report_in_shards_merged_once(self, _mock_apply_async, _mock_current_task):
+        """
+        Test that a report generated in shards is merged once when two
+        subtasks both find every shard finished.
+        """
+        for i in range(5):
+            self.create_student(u'student{}'.format(i), u'student{}@example.com'.format(i))
+        entry = InstructorTaskFactory.create(course_id=self.course.id, task_type='grade_course')
+
+        CourseGradeReport.generate({}, entry.id, self.course.id, None, 'graded')
+        for shard_index in (0, 1):
+            CourseGradeReport.generate_shard({}, entry.id, self.course.id, None, 'graded', shard_index)
+        # A subtask that read the manifest before the report was merged.
+        context = _CourseGradeReportContext({}, entry.id, self.course.id, None, 'graded')
+        shards = _CourseGradeReportShards(context, entry.id)
+        self.assertIsNotNone(shards.ranges)
+        CourseGradeReport.generate_shard({}, entry.id, self.course.id, None, 'graded', 2)
+        self.assertEqual(InstructorTask.objects.get(pk=entry.id).task_state, SUCCESS)
+
+        CourseGradeReport()._merge_shards(context, shards)  # pylint: disable=protected-access
+        self.assertEqual(InstructorTask.objects.get(pk=entry.id).task_state, SUCCESS)
+        report_store = ReportStore.from_config(config_name='GRADES_DOWNLOAD')
+        self.assertEqual(len(report_store.links_for(self.course.id)), 1)
+        self.verify_rows_in_csv(
+            [{'Username': u'student{}'.format(i)} for i in range(5)],
+            ignore_other_columns=True,
+        )
+
 
 class TestTeamGradeReport(InstructorGradeReportTestCase):
     """ Test that teams appear correctly in the grade report when it is enabled for the course. """
@@ -905,7 +1003,8 @@ class TestProblemGradeReport(TestReportMixin, InstructorTaskModuleTestCase):
         ])
 
     @patch('lms.djangoapps.instructor_task.tasks_helper.runner._get_current_task')
-    def test_single_problem(self, _get_current_task):
+    @ddt.data(False, True)
+    def test_single_problem(self, bulk_read, _get_current_task):
         vertical = ItemFactory.create(
             parent_location=self.problem_section.location,
             category='vertical',
@@ -915,7 +1014,8 @@ class TestProblemGradeReport(TestReportMixin, InstructorTaskModuleTestCase):
         self.define_option_problem(u'Problem1', parent=vertical)
 
         self.submit_student_answer(self.student_1.username, u'Problem1', ['Option 1'])
-        result = ProblemGradeReport.generate(None, None, self.course.id, None, 'graded')
+        with override_switch(SWITCH_BULK_PROBLEM_GRADE_REPORT, active=bulk_read):
+            result = ProblemGradeReport.generate(None, None, self.course.id, None, 'graded')
         self.assertDictContainsSubset({'action_name': 'graded', 'attempted': 2, 'succeeded': 2, 'failed': 0}, result)
         problem_name = u'Homework 1: Subsection - Problem1'
         header_row = self.csv_header_row + [problem_name + ' (Earned)', problem_name + ' (Possible)']
@@ -1172,6 +1272,7 @@ class TestProblemReportSplitTestContent(TestReportMixin, TestConditionalContent,
         self.assertEqual(self.get_csv_row_with_headers(), header_row)
 
 
+@ddt.ddt
 class TestProblemReportCohortedContent(TestReportMixin, ContentGroupTestCase, InstructorTaskModuleTestCase):
     """
     Test the problem report on a course that has cohorted content.
@@ -1215,7 +1316,8 @@ class TestProblemReportCohortedContent(TestReportMixin, ContentGroupTestCase, In
             ] + grade
         )))
 
-    def test_cohort_content(self):
+    @ddt.data(False, True)
+    def test_cohort_content(self, bulk_read):
         self.submit_student_answer(self.alpha_user.username, u'Problem0', ['Option 1', 'Option 1'])
         resp = self.submit_student_answer(self.alpha_user.username, u'Problem1', ['Option 1', 'Option 1'])
         self.assertEqual(resp.status_code, 404)
@@ -1224,7 +1326,22 @@ class TestProblemReportCohortedContent(TestReportMixin, ContentGroupTestCase, In
         self.assertEqual(resp.status_code, 404)
         self.submit_student_answer(self.beta_user.username, u'Problem1', ['Option 1', 'Option 2'])
 
-        with patch('lms.djangoapps.instructor_task.tasks_helper.runner._get_current_task'):
+        # Users may have a persisted course grade without persisted grades
+        # for the subsection of the problems, whose availability must then
+        # be read from their own course structure.
+        grading_policy_hash = GradesTransformer.grading_policy_hash(self.course)
+        for user in (self.staff_user, self.non_cohorted_user, self.community_ta):
+            PersistentCourseGrade.update_or_create(
+                user_id=user.id,
+                course_id=self.course.id,
+                passed=False,
+                percent_grade=0.0,
+                grading_policy_hash=grading_policy_hash,
+            )
+        PersistentSubsectionGrade.objects.filter(user_id=self.beta_user.id, course_id=self.course.id).delete()
+
+        with patch('lms.djangoapps.instructor_task.tasks_helper.runner._get_current_task'), \
+                override_switch(SWITCH_BULK_PROBLEM_GRADE_REPORT, active=bulk_read):
             result = ProblemGradeReport.generate(None, None, self.course.id, None, 'graded')
             self.assertDictContainsSubset(
                 {'action_name': 'graded', 'attempted': 5, 'succeeded': 5, 'failed': 0}, result
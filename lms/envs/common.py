@@ -564,6 +564,18 @@ CACHES = {
     },
 }
 
+# Maximum total size, in bytes, of decoded split modulestore course structures
+# to keep in each process, in front of the course_structure_cache.  0 disables
+# the process cache.
+COURSE_STRUCTURE_PROCESS_CACHE_MAX_SIZE_IN_BYTES = 0
+
+# Compression codec of the course structures in the course_structure_cache:
+# 'zlib', 'lz4' or 'zstd'.  See openedx.core.lib.compression.  A dictionary
+# trained on course structures, written by the benchmark_compression perf
+# script, can be given for use with 'zstd'.
+COURSE_STRUCTURE_CACHE_CODEC = 'zlib'
+COURSE_STRUCTURE_CACHE_COMPRESSION_DICTIONARY_PATH = None
+
 ############################ OAUTH2 Provider ###################################
 OAUTH_EXPIRE_CONFIDENTIAL_CLIENT_DAYS = 365
 OAUTH_EXPIRE_PUBLIC_CLIENT_DAYS = 30
@@ -1072,6 +1084,17 @@ CODE_JAIL = {
         'REALTIME': 3,
         'PROXY': 0,
     },
+
+    # Warm sandbox workers, see capa/safe_exec/sandbox_pool.py.
+    'pool': {
+        # Number of workers to keep in each process.  0 disables the pool.
+        'size': 0,
+        # Replace workers after this many executions.
+        'max_executions': 100,
+        # Replace workers once their resident set size exceeds this many
+        # bytes.  0 disables the check.
+        'max_memory': 0,
+    },
 }
 
 # Some courses are allowed to run unsafe code. This is a list of regexes, one
@@ -1084,6 +1107,11 @@ CODE_JAIL = {
 #   ]
 COURSES_WITH_UNSAFE_CODE = []
 
+# Whether the results of sandboxed problem code are also cached in each
+# process, in a cache bounded by the size of the results, in front of the
+# shared cache.
+SAFE_EXEC_LOCAL_RESULT_CACHE = False
+
 ############################### DJANGO BUILT-INS ###############################
 # Change DEBUG in your environment settings files, not here
 DEBUG = False
@@ -2123,6 +2151,16 @@ BLOCK_STRUCTURES_SETTINGS = dict(
 
     # Backend storage options
     PRUNING_ACTIVE=False,
+
+    # Maximum total size, in bytes, of block structures to keep decoded in
+    # each process, in front of the cache and storage, as accounted by their
+    # serialized size.  Only used when storage backing is enabled.  0
+    # disables the process cache.
+    PROCESS_CACHE_MAX_SIZE_IN_BYTES=0,
+
+    # Compression codec of the zpickle serializer: 'zlib', 'lz4' or 'zstd'.
+    # See openedx.core.lib.compression.
+    CODEC='zlib',
 )
 
 ################################ Bulk Email ###################################
@@ -3777,6 +3815,17 @@ FERNET_KEYS = [
 # Maximum number of rows to fetch in XBlockUserStateClient calls. Adjust for performance
 USER_STATE_BATCH_SIZE = 5000
 
+# Compact storage of courseware StudentModule state and its history.
+COMPACT_STUDENT_MODULE_STATE = dict(
+    # States and history entries at least this many characters long are
+    # stored compressed.  None disables compression.
+    COMPRESSION_MIN_LENGTH=None,
+
+    # Whether new history entries are stored as deltas against the
+    # latest full history entry of the StudentModule, when smaller.
+    HISTORY_DELTAS=False,
+)
+
 ############### Settings for edx-rbac  ###############
 SYSTEM_WIDE_ROLE_CLASSES = []
 
@@ -7,6 +7,7 @@ Module with family of classes for block structures.
 The following internal data structures are implemented:
     _BlockRelations - Data structure for a single block's relations.
     _BlockData - Data structure for a single block's data.
+    _BlockIndex - Data structure for a dense integer index of blocks.
 """
 
 
@@ -43,6 +44,28 @@ class _BlockRelations(object):
         self.children = []
 
 
+class _BlockIndex(object):
+    """
+    Data structure to encapsulate a dense integer index of the blocks in
+    a block relations map, with the parents and children of each block
+    as lists of integer ids.
+    """
+    def __init__(self, block_relations):
+
+        # List of usage keys of the blocks, by id.
+        # list [UsageKey]
+        self.keys = list(block_relations)
+
+        # Map of a block's usage key to its id.
+        # dict {UsageKey: int}
+        self.ids = {usage_key: block_id for block_id, usage_key in enumerate(self.keys)}
+
+        # Lists of ids of each block's parents and children, by id.
+        # list [list [int]]
+        self.parents = [[self.ids[parent] for parent in block_relations[key].parents] for key in self.keys]
+        self.children = [[self.ids[child] for child in block_relations[key].children] for key in self.keys]
+
+
 class BlockStructure(object):
     """
     Base class for a block structure.  BlockStructures are constructed
@@ -394,6 +417,18 @@ class BlockData(FieldData):
         # Map of transformer name to its block-specific data.
         self.transformer_data = TransformerDataMap()
 
+    def copy_with_shared_values(self, memo):
+        """
+        Returns a copy of this BlockData whose fields map is a new map
+        of the same field values, with a deep-copy of its transformer
+        data, which transformers may update in place.  The given
+        deepcopy memo is used for the transformer data.
+        """
+        copied = BlockData(self.location)
+        copied.fields = dict(self.fields)
+        copied.transformer_data = deepcopy(self.transformer_data, memo)
+        return copied
+
 
 class BlockStructureBlockData(BlockStructure):
     """
@@ -417,17 +452,55 @@ class BlockStructureBlockData(BlockStructure):
         # Map of a transformer's name to its non-block-specific data.
         self.transformer_data = TransformerDataMap()
 
-    def copy(self):
+        # Map of the usage key of a block that is removed during a
+        # filter_topological_traversal to whether its descendants are
+        # kept.  None when no such traversal is in progress.
+        # dict {UsageKey: bool}
+        self._deferred_removals = None
+
+    def copy(self, deep=True):
         """
         Returns a new instance of BlockStructureBlockData with a
         deep-copy of this instance's contents.
+
+        Arguments:
+            deep (bool) - If False, the collected values of the blocks'
+                xBlock fields are shared with this instance rather than
+                deep-copied, which is much cheaper for large structures.
+                The copy still has its own relations, BlockData, field
+                maps and transformer data, so it can be transformed
+                independently as long as xBlock field values are
+                replaced (for example with override_xblock_field) rather
+                than mutated in place.
         """
         from .factory import BlockStructureFactory
+        if deep:
+            return BlockStructureFactory.create_new(
+                self.root_block_usage_key,
+                deepcopy(self._block_relations),
+                deepcopy(self.transformer_data),
+                deepcopy(self._block_data_map),
+            )
+
+        block_relations = {}
+        for usage_key, relations in six.iteritems(self._block_relations):
+            copied_relations = _BlockRelations()
+            copied_relations.parents = list(relations.parents)
+            copied_relations.children = list(relations.children)
+            block_relations[usage_key] = copied_relations
+
+        # Map the original block data map to the copied one so any state
+        # that refers to it is copied to refer to the new one.
+        block_data_map = {}
+        memo = {id(self._block_data_map): block_data_map}
+        for usage_key, block_data in six.iteritems(self._block_data_map):
+            block_data_map[usage_key] = block_data.copy_with_shared_values(memo)
+
         return BlockStructureFactory.create_new(
             self.root_block_usage_key,
-            deepcopy(self._block_relations),
+            block_relations,
             deepcopy(self.transformer_data),
-            deepcopy(self._block_data_map),
+            block_data_map,
         )
 
     def iteritems(self):
@@ -620,7 +693,16 @@ class BlockStructureBlockData(BlockStructure):
                 relations (graph edges) are updated such that the
                 removed block's children become children of the
                 removed block's parents.
+
+        Note: When called during a filter_topological_traversal, the
+        removal is deferred until the end of the traversal.
         """
+        if self._deferred_removals is not None:
+            if usage_key not in self._block_relations:
+                raise KeyError(usage_key)
+            self._deferred_removals.setdefault(usage_key, keep_descendants)
+            return
+
         children = self._block_relations[usage_key].children
         parents = self._block_relations[usage_key].parents
 
@@ -727,8 +809,107 @@ class BlockStructureBlockData(BlockStructure):
         # descendants that are unyielded.  However, note that the
         # optimization is not currently present because of DAGs,
         # but it will be as soon as we remove support for DAGs.
-        for _ in self.topological_traversal(filter_func=filter_func, **kwargs):
-            pass
+        #
+        # Blocks removed during the traversal are only marked as removed
+        # and the structure's relations are rebuilt once at the end,
+        # rather than updated for each removed block.
+        self._deferred_removals = {}
+        try:
+            self._filter_topological_traversal_by_index(filter_func, **kwargs)
+            removals = self._deferred_removals
+        finally:
+            self._deferred_removals = None
+        self._apply_removals(removals)
+
+    def _filter_topological_traversal_by_index(
+            self,
+            filter_func,
+            start_node=None,
+            yield_descendants_of_unyielded=False,
+    ):
+        """
+        Performs the topological traversal of
+        openedx.core.lib.graph_traversals.traverse_topologically over a
+        _BlockIndex of this structure, applying the given filter to each
+        block.  Blocks that are removed while deferred are treated as
+        they would be if they had been removed right away: a removed
+        block is unyielded, and a block removed with its descendants
+        kept passes its parents' yield results on to its children.
+        """
+        filter_func = filter_func or self.create_universal_filter()
+        index = _BlockIndex(self._block_relations)
+        start_id = index.ids[start_node or self.root_block_usage_key]
+
+        # Whether each block was visited, and whether it counts as a
+        # yielded parent for its children, by id.
+        visited = bytearray(len(index.keys))
+        passes = bytearray(len(index.keys))
+
+        stack = [start_id]
+        while stack:
+            block_id = stack.pop()
+            parents = index.parents[block_id] if block_id != start_id else []
+            if block_id != start_id:
+                if not all(visited[parent] for parent in parents):
+                    continue
+                elif not yield_descendants_of_unyielded and not any(passes[parent] for parent in parents):
+                    continue
+
+            if visited[block_id]:
+                continue
+
+            stack.extend(reversed(index.children[block_id]))
+            visited[block_id] = True
+
+            block_key = index.keys[block_id]
+            if block_key not in self._deferred_removals:
+                yielded = filter_func(block_key)
+            if block_key in self._deferred_removals:
+                keep_descendants = self._deferred_removals[block_key]
+                passes[block_id] = keep_descendants and any(passes[parent] for parent in parents)
+            else:
+                passes[block_id] = bool(yielded)
+
+    def _apply_removals(self, removals):
+        """
+        Removes the given blocks and their data from the structure,
+        rebuilding its relations in one pass.  The children of a block
+        whose descendants are kept become children of its parents.
+
+        Arguments:
+            removals (dict {UsageKey: bool}) - Map of the usage key of
+                each block to remove to whether its descendants are kept.
+        """
+        if not removals:
+            return
+
+        def _retained_children(usage_key, visited):
+            """
+            Yields the retained children of the given block, replacing
+            removed children whose descendants are kept with their own
+            retained children.
+            """
+            for child in self._block_relations[usage_key].children:
+                if child in visited:
+                    continue
+                visited.add(child)
+                if child not in removals:
+                    yield child
+                elif removals[child]:
+                    for descendant in _retained_children(child, visited):
+                        yield descendant
+
+        block_relations = {}
+        for usage_key in self._block_relations:
+            if usage_key not in removals:
+                self._add_block(block_relations, usage_key)
+        for usage_key in block_relations:
+            for child in _retained_children(usage_key, set()):
+                self._add_to_relations(block_relations, usage_key, child)
+
+        for usage_key in removals:
+            self._block_data_map.pop(usage_key, None)
+        self._block_relations = block_relations
 
     #--- Internal methods ---#
     # To be used within the block_structure framework or by tests.
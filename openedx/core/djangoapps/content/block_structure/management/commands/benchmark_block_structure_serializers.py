@@ -0,0 +1,74 @@
+"""
+Command to compare the block structure serializers on collected course blocks.
+"""
+
+
+import timeit
+
+import six
+from django.core.management.base import BaseCommand
+
+import openedx.core.djangoapps.content.block_structure.api as api
+from openedx.core.djangoapps.content.block_structure.serializers import SERIALIZERS
+from openedx.core.lib.command_utils import parse_course_keys
+
+
+class Command(BaseCommand):
+    """
+    Example usage:
+        $ ./manage.py lms benchmark_block_structure_serializers 'course-v1:edX+DemoX+Demo_Course' --settings=devstack
+    """
+    args = u'<course_id course_id ...>'
+    help = (
+        u'Reports the serialized size and decode time of each block structure serializer for the given courses, '
+        u'and the time to copy a decoded block structure, as done on hits of the process cache.'
+    )
+
+    def add_arguments(self, parser):
+        """
+        Entry point for subclassed commands to add custom arguments.
+        """
+        parser.add_argument(
+            'courses',
+            nargs='+',
+            help=u'Course keys of the collected course blocks to benchmark.',
+        )
+        parser.add_argument(
+            '--repeat',
+            help=u'Number of times to decode the serialized data for each serializer, and to copy the structure.',
+            default=10,
+            type=int,
+        )
+
+    def handle(self, *args, **options):
+        for course_key in parse_course_keys(options['courses']):
+            block_structure = api.get_course_in_cache(course_key)
+            for name, serializer in sorted(six.iteritems(SERIALIZERS)):
+                serialized_data = serializer.serialize(block_structure)
+                decode_time = min(timeit.repeat(
+                    lambda: serializer.deserialize(serialized_data),  # pylint: disable=cell-var-from-loop
+                    repeat=options['repeat'],
+                    number=1,
+                ))
+                self.stdout.write(
+                    u'{course_key}\t{name}\tblocks: {num_blocks}\tsize: {size} bytes\tdecode: {decode_ms:.2f} ms'.format(
+                        course_key=course_key,
+                        name=name,
+                        num_blocks=len(block_structure),
+                        size=len(serialized_data),
+                        decode_ms=decode_time * 1000,
+                    )
+                )
+
+            copy_time = min(timeit.repeat(
+                lambda: block_structure.copy(deep=False),  # pylint: disable=cell-var-from-loop
+                repeat=options['repeat'],
+                number=1,
+            ))
+            self.stdout.write(
+                u'{course_key}\tprocess cache copy\tblocks: {num_blocks}\tcopy: {copy_ms:.2f} ms'.format(
+                    course_key=course_key,
+                    num_blocks=len(block_structure),
+                    copy_ms=copy_time * 1000,
+                )
+            )
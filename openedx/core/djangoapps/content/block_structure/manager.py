@@ -64,8 +64,57 @@ class BlockStructureManager(object):
             BlockStructureBlockData - A transformed block structure,
                 starting at starting_block_usage_key.
         """
-        block_structure = collected_block_structure.copy() if collected_block_structure else self.get_collected()
+        if collected_block_structure:
+            block_structure = collected_block_structure.copy()
+        else:
+            block_structure = self.get_collected(transformers)
+
+        return self._transform(block_structure, transformers, starting_block_usage_key)
+
+    def get_transformed_for_each(
+            self,
+            transformers_list,
+            starting_block_usage_key=None,
+            collected_block_structure=None,
+    ):
+        """
+        Yields a transformed Block Structure for each collection of
+        transformers in the given list, in order, typically one per user.
+
+        Details: Similar to calling get_transformed for each collection
+        of transformers, except the collected Block Structure is
+        retrieved at most once and each transformation is applied to a
+        copy that shares the collected field values with it (see
+        BlockStructureBlockData.copy), rather than to a deep copy.
+
+        Arguments:
+            transformers_list (iterable(BlockStructureTransformers)) -
+                Collections of transformers to apply, each with its
+                own usage_info.
 
+            starting_block_usage_key (UsageKey) - See get_transformed.
+
+            collected_block_structure (BlockStructureBlockData) - See
+                get_transformed.
+
+        Returns:
+            generator(BlockStructureBlockData) - Transformed block
+                structures, starting at starting_block_usage_key.
+        """
+        for transformers in transformers_list:
+            if collected_block_structure is None:
+                collected_block_structure = self.get_collected(transformers)
+            yield self._transform(
+                collected_block_structure.copy(deep=False),
+                transformers,
+                starting_block_usage_key,
+            )
+
+    def _transform(self, block_structure, transformers, starting_block_usage_key):
+        """
+        Transforms the given block structure, starting at the given
+        starting_block_usage_key, with the given transformers.
+        """
         if starting_block_usage_key:
             # Override the root_block_usage_key so traversals start at the
             # requested location.  The rest of the structure will be pruned
@@ -80,7 +129,7 @@ class BlockStructureManager(object):
         transformers.transform(block_structure)
         return block_structure
 
-    def get_collected(self):
+    def get_collected(self, transformers=None):
         """
         Returns the collected Block Structure for the root_block_usage_key,
         getting block data from the cache and modulestore, as needed.
@@ -89,6 +138,14 @@ class BlockStructureManager(object):
         the modulestore is accessed if needed (at cache miss), and the
         transformers data is collected if needed.
 
+        Arguments:
+            transformers (BlockStructureTransformers) - Collection of
+                transformers that are to be applied to the returned
+                block structure.  If given, only their collected block
+                data is deserialized up front; the collected block data
+                of any other transformer is deserialized on first
+                access.  If None, all collected data is deserialized.
+
         Returns:
             BlockStructureBlockData - A collected block structure,
                 starting at root_block_usage_key, with collected data
@@ -98,6 +155,7 @@ class BlockStructureManager(object):
             block_structure = BlockStructureFactory.create_from_store(
                 self.root_block_usage_key,
                 self.store,
+                transformers.names() if transformers else None,
             )
             BlockStructureTransformers.verify_versions(block_structure)
 
@@ -0,0 +1,468 @@
+"""
+Serialization formats for the collected data of BlockStructure objects.
+
+The following serializers are implemented:
+    ZPickleSerializer - The original format: a compressed pickle of a
+        block structure's relations, transformer data and block data,
+        compressed with the codec configured in BLOCK_STRUCTURES_SETTINGS.
+    ColumnarSerializer - A compact, versioned format in which usage keys are
+        interned into a single table, block relations are stored as integer
+        index arrays and collected fields are stored as per-field value
+        columns, each group of columns in its own compressed segment.
+
+Data written by any of the serializers can be read back with
+deserialize_block_structure, which dispatches on the header of the
+serialized data.  This allows previously cached and stored data to
+continue to be read after the serializer used for writing is changed.
+"""
+
+
+import json
+import struct
+import zlib
+from copy import deepcopy
+
+import six
+from django.conf import settings
+from opaque_keys.edx.keys import CourseKey, UsageKey
+from six.moves import cPickle as pickle
+
+from openedx.core.lib import compression
+from openedx.core.lib.cache_utils import zpickle, zunpickle
+
+from .block_structure import BlockData, TransformerData, TransformerDataMap, _BlockRelations
+
+
+class ZPickleSerializer(object):
+    """
+    Serializer for the original format of block structure data: a
+    compressed pickle of the (block_relations, transformer_data,
+    block_data_map) tuple.  The format has no header of its own, other
+    than the codec's, and is used as the fallback when no other
+    serializer claims the data.
+    """
+    NAME = u'zpickle'
+
+    @classmethod
+    def can_deserialize(cls, serialized_data):  # pylint: disable=unused-argument
+        """
+        Returns whether the given data is in this serializer's format.
+        """
+        return True
+
+    @classmethod
+    def serialize(cls, block_structure):
+        """
+        Serializes the data for the given block_structure.
+        """
+        return zpickle(
+            (
+                block_structure._block_relations,  # pylint: disable=protected-access
+                block_structure.transformer_data,
+                block_structure._block_data_map,  # pylint: disable=protected-access
+            ),
+            settings.BLOCK_STRUCTURES_SETTINGS.get('CODEC', compression.ZLIB),
+        )
+
+    @classmethod
+    def deserialize(cls, serialized_data, transformer_names=None):  # pylint: disable=unused-argument
+        """
+        Returns the (block_relations, transformer_data, block_data_map)
+        tuple for the given serialized data.  The data of all transformers
+        is always decoded, regardless of the given transformer_names.
+        """
+        return zunpickle(serialized_data)
+
+
+class ColumnarSerializer(object):
+    """
+    Serializer for the columnar format of block structure data.
+
+    Layout:
+        header - MAGIC, a format version byte and the length of the index.
+        index - zlib compressed JSON containing the interned usage key
+            table, the parents and children of each related block as
+            integer indices into the key table, and the offsets of each
+            segment.
+        segments - zlib compressed pickles, one for the structure's
+            transformer data, one for the collected xBlock fields and one
+            per transformer for its block-specific data.  Block fields are
+            stored as columns of ([block index], [value]) pairs per field.
+
+    Usage keys that belong to the course of the root block are stored as
+    (block_type, block_id) pairs and recreated from the course key, rather
+    than unpickled one at a time.  Field values are arbitrary objects set
+    by transformers and so are still pickled, but as a single list per
+    column.
+    """
+    NAME = u'columnar'
+    MAGIC = b'BSC'
+    VERSION = 1
+
+    # magic, format version, length of the index.
+    _HEADER = struct.Struct('>3sBI')
+
+    TRANSFORMER_DATA_SEGMENT = u'transformer_data'
+    XBLOCK_FIELDS_SEGMENT = u'xblock_fields'
+    KEYS_SEGMENT = u'keys'
+    TRANSFORMER_BLOCK_DATA_SEGMENT_PREFIX = u'transformer_block_data.'
+
+    @classmethod
+    def can_deserialize(cls, serialized_data):
+        """
+        Returns whether the given data is in this serializer's format.
+        """
+        return serialized_data[:len(cls.MAGIC)] == cls.MAGIC
+
+    @classmethod
+    def serialize(cls, block_structure):
+        """
+        Serializes the data for the given block_structure.
+        """
+        block_relations = block_structure._block_relations  # pylint: disable=protected-access
+        block_data_map = block_structure._block_data_map  # pylint: disable=protected-access
+
+        # Intern all keys: related blocks first, followed by any blocks
+        # that only have collected data.
+        keys = list(block_relations)
+        keys.extend(key for key in block_data_map if key not in block_relations)
+        key_indices = {key: index for index, key in enumerate(keys)}
+
+        index = {
+            u'children': [[key_indices[child] for child in block_relations[key].children] for key in block_relations],
+            u'parents': [[key_indices[parent] for parent in block_relations[key].parents] for key in block_relations],
+            u'data_blocks': [key_indices[key] for key in block_data_map],
+        }
+
+        segments = [
+            (cls.TRANSFORMER_DATA_SEGMENT, {
+                name: data.fields for name, data in six.iteritems(block_structure.transformer_data)
+            }),
+            (cls.XBLOCK_FIELDS_SEGMENT, cls._columns_for(
+                (key_indices[key], block_data.fields) for key, block_data in six.iteritems(block_data_map)
+            )),
+        ]
+        segments.extend(
+            (cls.TRANSFORMER_BLOCK_DATA_SEGMENT_PREFIX + name, columns)
+            for name, columns in six.iteritems(cls._transformer_block_columns(block_data_map, key_indices))
+        )
+
+        course_key, encoded_keys = cls._encode_keys(block_structure.root_block_usage_key, keys)
+        index[u'course'] = course_key
+        if encoded_keys is None:
+            segments.append((cls.KEYS_SEGMENT, keys))
+        else:
+            index[u'keys'] = encoded_keys
+
+        encoded_segments = []
+        offset = 0
+        index[u'segments'] = {}
+        for name, payload in segments:
+            encoded_segment = zlib.compress(pickle.dumps(payload, 4))
+            index[u'segments'][name] = [offset, len(encoded_segment)]
+            encoded_segments.append(encoded_segment)
+            offset += len(encoded_segment)
+
+        encoded_index = zlib.compress(json.dumps(index, separators=(',', ':')).encode('utf-8'))
+        return b''.join(
+            [cls._HEADER.pack(cls.MAGIC, cls.VERSION, len(encoded_index)), encoded_index] + encoded_segments
+        )
+
+    @classmethod
+    def deserialize(cls, serialized_data, transformer_names=None):
+        """
+        Returns the (block_relations, transformer_data, block_data_map)
+        tuple for the given serialized data.
+
+        Arguments:
+            serialized_data (bytes) - Data written by serialize.
+
+            transformer_names (iterable(string)) - Names of the
+                transformers whose block-specific data is to be decoded
+                right away.  The data of any other transformer is
+                decoded on first access to it through a block's
+                transformer_data.  If None, the data of all transformers
+                is decoded right away.
+        """
+        reader = _ColumnarReader(serialized_data)
+        keys = reader.keys
+
+        block_relations = {}
+        for block_index, (children, parents) in enumerate(zip(reader.index[u'children'], reader.index[u'parents'])):
+            relations = _BlockRelations()
+            relations.children = [keys[child] for child in children]
+            relations.parents = [keys[parent] for parent in parents]
+            block_relations[keys[block_index]] = relations
+
+        transformer_data = TransformerDataMap()
+        for name, fields in six.iteritems(reader.segment(cls.TRANSFORMER_DATA_SEGMENT)):
+            transformer_data[name] = _new_field_data(TransformerData, fields=fields)
+
+        all_transformer_names = reader.transformer_names()
+        if transformer_names is None:
+            transformer_names = all_transformer_names
+        else:
+            transformer_names = set(transformer_names).intersection(all_transformer_names)
+
+        block_data_map = {}
+        pending = _PendingTransformerBlockData(reader, block_data_map, set(all_transformer_names) - transformer_names)
+        block_data_list = [None] * len(keys)
+        for block_index in reader.index[u'data_blocks']:
+            block_key = keys[block_index]
+            block_data = _new_field_data(
+                BlockData,
+                fields={},
+                location=block_key,
+                transformer_data=_LazyTransformerDataMap(pending) if pending else TransformerDataMap(),
+            )
+            block_data_list[block_index] = block_data
+            block_data_map[block_key] = block_data
+
+        cls._set_columns(
+            reader.segment(cls.XBLOCK_FIELDS_SEGMENT),
+            reader.index[u'data_blocks'],
+            lambda block_index: block_data_list[block_index].fields,
+        )
+
+        for transformer_name in transformer_names:
+            cls._load_transformer_block_data(reader, transformer_name, block_data_list.__getitem__)
+
+        return block_relations, transformer_data, block_data_map
+
+    @classmethod
+    def _load_transformer_block_data(cls, reader, transformer_name, block_data_at):
+        """
+        Decodes the block-specific data of the given transformer into the
+        transformer_data of each block returned by block_data_at for the
+        block indices in the data.  Blocks for which block_data_at returns
+        None are skipped.
+        """
+        present_indices, columns = reader.segment(cls.TRANSFORMER_BLOCK_DATA_SEGMENT_PREFIX + transformer_name)
+        transformer_fields = {}
+        for block_index in present_indices:
+            block_data = block_data_at(block_index)
+            if block_data is not None and transformer_name not in block_data.transformer_data:
+                transformer_fields[block_index] = {}
+                dict.__setitem__(
+                    block_data.transformer_data,
+                    transformer_name,
+                    _new_field_data(TransformerData, fields=transformer_fields[block_index]),
+                )
+        cls._set_columns(
+            columns,
+            present_indices,
+            lambda block_index: transformer_fields.get(block_index, {}),
+        )
+
+    @staticmethod
+    def _columns_for(indexed_fields):
+        """
+        Returns a map of field name to its ([block index], [value]) column
+        for the given iterable of (block index, fields dict) pairs.  The
+        block indices of a column that has a value for every given block
+        are replaced with None, to be read as all of the given blocks.
+        """
+        columns = {}
+        num_blocks = 0
+        for block_index, fields in indexed_fields:
+            num_blocks += 1
+            for field_name, value in six.iteritems(fields):
+                block_indices, values = columns.setdefault(field_name, ([], []))
+                block_indices.append(block_index)
+                values.append(value)
+        return {
+            field_name: (None if len(block_indices) == num_blocks else block_indices, values)
+            for field_name, (block_indices, values) in six.iteritems(columns)
+        }
+
+    @staticmethod
+    def _set_columns(columns, all_block_indices, fields_of_block):
+        """
+        Sets the values of the given columns on the fields dict returned
+        by fields_of_block for each block index in the columns.
+        """
+        for field_name, (block_indices, values) in six.iteritems(columns):
+            for block_index, value in zip(block_indices or all_block_indices, values):
+                fields_of_block(block_index)[field_name] = value
+
+    @classmethod
+    def _transformer_block_columns(cls, block_data_map, key_indices):
+        """
+        Returns a map of transformer name to a ([block index], columns)
+        pair, listing the blocks that have data for the transformer and
+        the columns of that data.
+        """
+        indexed_data_by_transformer = {}
+        for key, block_data in six.iteritems(block_data_map):
+            for name, data in six.iteritems(block_data.transformer_data):
+                indexed_data_by_transformer.setdefault(name, []).append((key_indices[key], data.fields))
+
+        return {
+            name: ([block_index for block_index, _ in indexed_data], cls._columns_for(indexed_data))
+            for name, indexed_data in six.iteritems(indexed_data_by_transformer)
+        }
+
+    @staticmethod
+    def _encode_keys(root_block_usage_key, keys):
+        """
+        Returns a (course key string, encoded keys) pair for the given
+        keys.  Keys in the root block's course are encoded as
+        [block_type, block_id] pairs and all other usage keys as strings.
+        The encoded keys are None if any key is not a UsageKey, in which
+        case the keys are to be pickled instead.
+        """
+        if not isinstance(root_block_usage_key, UsageKey):
+            return None, None
+
+        course_key = root_block_usage_key.course_key
+        encoded_keys = []
+        for key in keys:
+            if not isinstance(key, UsageKey):
+                return None, None
+            if key.course_key == course_key and course_key.make_usage_key(key.block_type, key.block_id) == key:
+                encoded_keys.append([key.block_type, key.block_id])
+            else:
+                encoded_keys.append(six.text_type(key))
+        return six.text_type(course_key), encoded_keys
+
+
+class _ColumnarReader(object):
+    """
+    Reader for data in the ColumnarSerializer's format, decoding
+    the index eagerly and each segment on request.
+    """
+    def __init__(self, serialized_data):
+        header = ColumnarSerializer._HEADER  # pylint: disable=protected-access
+        magic, version, index_length = header.unpack_from(serialized_data)
+        if magic != ColumnarSerializer.MAGIC or version != ColumnarSerializer.VERSION:
+            raise ValueError(u'Unsupported block structure data format: {!r} v{}'.format(magic, version))
+
+        self._data = serialized_data
+        self._segments_start = header.size + index_length
+        self.index = json.loads(zlib.decompress(serialized_data[header.size:self._segments_start]).decode('utf-8'))
+
+        self.keys = self._decode_keys()
+
+    def _decode_keys(self):
+        """
+        Returns the list of usage keys interned in the data.
+        """
+        encoded_keys = self.index.get(u'keys')
+        if encoded_keys is None:
+            return self.segment(ColumnarSerializer.KEYS_SEGMENT)
+
+        make_usage_key = CourseKey.from_string(self.index[u'course']).make_usage_key
+        return [
+            make_usage_key(*encoded_key) if isinstance(encoded_key, list) else UsageKey.from_string(encoded_key)
+            for encoded_key in encoded_keys
+        ]
+
+    def transformer_names(self):
+        """
+        Returns the names of the transformers with block-specific data
+        in the data.
+        """
+        prefix = ColumnarSerializer.TRANSFORMER_BLOCK_DATA_SEGMENT_PREFIX
+        return {name[len(prefix):] for name in self.segment_names(prefix)}
+
+    def segment_names(self, prefix=u''):
+        """
+        Returns the names of the segments in the data that start with
+        the given prefix.
+        """
+        return [name for name in self.index[u'segments'] if name.startswith(prefix)]
+
+    def segment(self, name):
+        """
+        Returns the decoded payload of the segment with the given name.
+        """
+        offset, length = self.index[u'segments'][name]
+        start = self._segments_start + offset
+        return pickle.loads(zlib.decompress(self._data[start:start + length]))
+
+
+class _PendingTransformerBlockData(object):
+    """
+    The block-specific data of transformers that is yet to be decoded
+    from a _ColumnarReader, shared by all blocks of a block structure.
+    """
+    def __init__(self, reader, block_data_map, transformer_names):
+        self._reader = reader
+        self._block_data_map = block_data_map
+        self._transformer_names = transformer_names
+
+    def __bool__(self):
+        return bool(self._transformer_names)
+
+    __nonzero__ = __bool__
+
+    def __deepcopy__(self, memo):
+        """
+        Copies along with the block structure's block data map, while
+        sharing the immutable reader.
+        """
+        return _PendingTransformerBlockData(
+            self._reader,
+            deepcopy(self._block_data_map, memo),
+            set(self._transformer_names),
+        )
+
+    def load(self, transformer_name):
+        """
+        Decodes the data of the given transformer into the blocks of the
+        block structure, if it is pending.  Returns whether it was.
+        """
+        if transformer_name not in self._transformer_names:
+            return False
+
+        self._transformer_names.discard(transformer_name)
+        keys = self._reader.keys
+        ColumnarSerializer._load_transformer_block_data(  # pylint: disable=protected-access
+            self._reader,
+            transformer_name,
+            lambda block_index: self._block_data_map.get(keys[block_index]),
+        )
+        return True
+
+
+class _LazyTransformerDataMap(TransformerDataMap):
+    """
+    A TransformerDataMap of a block that decodes the block-specific data
+    of a transformer on first access to it.
+    """
+    def __init__(self, pending):
+        super(_LazyTransformerDataMap, self).__init__()
+        self._pending = pending
+
+    def __missing__(self, key):
+        if self._pending.load(key):
+            return dict.__getitem__(self, key)
+        raise KeyError(key)
+
+
+def _new_field_data(field_data_cls, **attributes):
+    """
+    Returns a new instance of the given FieldData class with the given
+    attributes.  As when unpickling, the instance's __dict__ is set
+    directly, bypassing FieldData's attribute lookups for each block.
+    """
+    field_data = field_data_cls.__new__(field_data_cls)
+    field_data.__dict__.update(attributes)
+    return field_data
+
+
+SERIALIZERS = {
+    serializer.NAME: serializer
+    for serializer in (ZPickleSerializer, ColumnarSerializer)
+}
+
+
+def deserialize_block_structure(serialized_data, transformer_names=None):
+    """
+    Returns the (block_relations, transformer_data, block_data_map) tuple
+    for the given serialized data, using the serializer whose format the
+    data is in.  See ColumnarSerializer.deserialize for transformer_names.
+    """
+    for serializer in (ColumnarSerializer, ZPickleSerializer):
+        if serializer.can_deserialize(serialized_data):
+            return serializer.deserialize(serialized_data, transformer_names)
@@ -8,18 +8,25 @@ from logging import getLogger
 
 import six
 
+from django.conf import settings
 from django.utils.encoding import python_2_unicode_compatible
-from openedx.core.lib.cache_utils import zpickle, zunpickle
+from edx_django_utils.monitoring import set_custom_metric
+from openedx.core.lib.cache_utils import ByteSizeLRUCache
 
 from . import config
 from .block_structure import BlockStructureBlockData
 from .exceptions import BlockStructureNotFound
 from .factory import BlockStructureFactory
 from .models import BlockStructureModel
+from .serializers import ColumnarSerializer, ZPickleSerializer, deserialize_block_structure
 from .transformer_registry import TransformerRegistry
 
 logger = getLogger(__name__)  # pylint: disable=C0103
 
+# Process-wide cache of deserialized Block Structures, keyed by their
+# version data.  See _process_cache.
+_PROCESS_CACHE = None
+
 
 @python_2_unicode_compatible
 class StubModel(object):
@@ -70,8 +77,12 @@ class BlockStructureStore(object):
 
         bs_model = self._update_or_create_model(block_structure, serialized_data)
         self._add_to_cache(serialized_data, bs_model)
+        if self._is_process_cache_enabled():
+            # The caller goes on to use the given block structure, so
+            # the process cache keeps its own copy.
+            self._add_to_process_cache(block_structure.copy(), serialized_data, bs_model)
 
-    def get(self, root_block_usage_key):
+    def get(self, root_block_usage_key, transformer_names=None):
         """
         Deserializes and returns the block structure starting at
         root_block_usage_key, if found in the cache or storage.
@@ -84,6 +95,13 @@ class BlockStructureStore(object):
                 root of the block structure that is to be retrieved
                 from the store.
 
+            transformer_names (iterable(string)) - Names of the
+                transformers whose collected block data is to be
+                deserialized right away.  Where supported by the
+                stored format, the collected block data of other
+                transformers is deserialized only when first accessed.
+                If None, all collected data is deserialized.
+
         Returns:
             BlockStructure - The deserialized block structure starting
             at root_block_usage_key, if found.
@@ -94,13 +112,25 @@ class BlockStructureStore(object):
         """
         bs_model = self._get_model(root_block_usage_key)
 
+        block_structure = self._get_from_process_cache(bs_model)
+        if block_structure is not None:
+            return block_structure.copy(deep=False)
+
         try:
             serialized_data = self._get_from_cache(bs_model)
         except BlockStructureNotFound:
             serialized_data = self._get_from_store(bs_model)
             self._add_to_cache(serialized_data, bs_model)
 
-        return self._deserialize(serialized_data, root_block_usage_key)
+        if not self._is_process_cache_enabled():
+            return self._deserialize(serialized_data, root_block_usage_key, transformer_names)
+
+        # Entries of the process cache are shared by later requests, so
+        # all of their collected data is deserialized up front, and
+        # callers are given copies that they can transform.
+        block_structure = self._deserialize(serialized_data, root_block_usage_key)
+        self._add_to_process_cache(block_structure, serialized_data, bs_model)
+        return block_structure.copy(deep=False)
 
     def delete(self, root_block_usage_key):
         """
@@ -113,6 +143,8 @@ class BlockStructureStore(object):
         """
         bs_model = self._get_model(root_block_usage_key)
         self._cache.delete(self._encode_root_cache_key(bs_model))
+        if self._is_process_cache_enabled():
+            _process_cache().delete(self._encode_process_cache_key(bs_model))
         bs_model.delete()
         logger.info(u"BlockStructure: Deleted from cache and store; %s.", bs_model)
 
@@ -180,6 +212,42 @@ class BlockStructureStore(object):
             raise BlockStructureNotFound(bs_model.data_usage_key)
         return serialized_data
 
+    @staticmethod
+    def _is_process_cache_enabled():
+        """
+        Returns whether the process cache is enabled.
+
+        Entries are keyed on the model's version data, which is only
+        known when storage backing is enabled.
+        """
+        return _process_cache() is not None and _is_storage_backing_enabled()
+
+    def _get_from_process_cache(self, bs_model):
+        """
+        Returns the deserialized block structure for the given
+        BlockStructureModel from the process cache, or None if not
+        found.  The returned block structure is shared and must not
+        be modified.
+        """
+        if not self._is_process_cache_enabled():
+            return None
+
+        block_structure = _process_cache().get(self._encode_process_cache_key(bs_model))
+        set_custom_metric('block_structure_process_cache', 'miss' if block_structure is None else 'hit')
+        return block_structure
+
+    def _add_to_process_cache(self, block_structure, serialized_data, bs_model):
+        """
+        Adds the given deserialized block_structure for the given
+        BlockStructureModel to the process cache, accounting for it
+        by the size of its serialized_data.
+        """
+        _process_cache().set(
+            self._encode_process_cache_key(bs_model),
+            block_structure,
+            size_in_bytes=len(serialized_data),
+        )
+
     def _get_from_store(self, bs_model):
         """
         Returns the serialized data for the given BlockStructureModel
@@ -194,22 +262,22 @@ class BlockStructureStore(object):
 
     def _serialize(self, block_structure):
         """
-        Serializes the data for the given block_structure.
+        Serializes the data for the given block_structure, using the
+        serializer selected by the columnar_serialization waffle switch.
         """
-        data_to_cache = (
-            block_structure._block_relations,
-            block_structure.transformer_data,
-            block_structure._block_data_map,
-        )
-        return zpickle(data_to_cache)
+        return _serializer().serialize(block_structure)
 
-    def _deserialize(self, serialized_data, root_block_usage_key):
+    def _deserialize(self, serialized_data, root_block_usage_key, transformer_names=None):
         """
         Deserializes the given data and returns the parsed block_structure.
+        Data in any of the supported formats is accepted, so that entries
+        written before a change of serializer can still be read.
         """
 
         try:
-            block_relations, transformer_data, block_data_map = zunpickle(serialized_data)
+            block_relations, transformer_data, block_data_map = deserialize_block_structure(
+                serialized_data, transformer_names,
+            )
         except Exception:
             # Somehow failed to de-serialized the data, assume it's corrupt.
             bs_model = self._get_model(root_block_usage_key)
@@ -238,6 +306,18 @@ class BlockStructureStore(object):
                 root_usage_key=six.text_type(bs_model.data_usage_key),
             )
 
+    @classmethod
+    def _encode_process_cache_key(cls, bs_model):
+        """
+        Returns the process cache key to use for the given
+        BlockStructureModel, which changes with each new version
+        of the block structure.
+        """
+        version_data = cls._version_data_of_model(bs_model)
+        return (six.text_type(bs_model.data_usage_key),) + tuple(
+            six.text_type(version_data[field_name]) for field_name in BlockStructureModel.VERSION_FIELDS
+        )
+
     @staticmethod
     def _version_data_of_block(root_block):
         """
@@ -267,3 +347,35 @@ def _is_storage_backing_enabled():
     Returns whether storage backing for Block Structures is enabled.
     """
     return config.waffle().is_enabled(config.STORAGE_BACKING_FOR_CACHE)
+
+
+def _process_cache():
+    """
+    Returns the process-wide cache of deserialized Block Structures,
+    or None if it is disabled.
+    """
+    global _PROCESS_CACHE  # pylint: disable=global-statement
+    max_size_in_bytes = settings.BLOCK_STRUCTURES_SETTINGS.get('PROCESS_CACHE_MAX_SIZE_IN_BYTES', 0)
+    if not max_size_in_bytes:
+        return None
+    if _PROCESS_CACHE is None or _PROCESS_CACHE.max_size_in_bytes != max_size_in_bytes:
+        _PROCESS_CACHE = ByteSizeLRUCache(max_size_in_bytes)
+    return _PROCESS_CACHE
+
+
+def process_cache_stats():
+    """
+    Returns the hit, miss and eviction counts and size of the
+    process-wide cache of deserialized Block Structures.
+    """
+    process_cache = _process_cache()
+    return process_cache.stats() if process_cache is not None else None
+
+
+def _serializer():
+    """
+    Returns the serializer to use for writing Block Structures.
+    """
+    if config.waffle().is_enabled(config.COLUMNAR_SERIALIZATION):
+        return ColumnarSerializer
+    return ZPickleSerializer
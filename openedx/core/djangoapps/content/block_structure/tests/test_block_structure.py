@@ -268,7 +268,33 @@ class TestBlockStructureData(TestCase, ChildrenMapTestMixin):
         block_structure.remove_block_traversal(lambda block: block == 2)
         self.assert_block_structure(block_structure, [[1], [], [], []], missing_blocks=[2])
 
-    def test_copy(self):
+    @ddt.data(
+        (True, [[1, 2], [5, 6], [4, 5, 6], [], [], [], []], []),
+        (False, [[1, 2], [], [4], [], [], [], []], [5, 6]),
+    )
+    @ddt.unpack
+    def test_remove_block_traversal_dag(self, keep_descendants, expected_children_map, expected_pruned_blocks):
+        #     0
+        #    / \
+        #   1  2
+        #   \ / \
+        #    3  4
+        #   / \
+        #  5  6
+        block_structure = self.create_block_structure(ChildrenMapTestMixin.DAG_CHILDREN_MAP)
+        block_structure.remove_block_traversal(lambda block: block == 3, keep_descendants=keep_descendants)
+
+        # Block 3 is removed from the structure, with its children
+        # relinked to its parents only if its descendants are kept.
+        missing_blocks = [3]
+        self.assert_block_structure(block_structure, expected_children_map, missing_blocks)
+
+        block_structure._prune_unreachable()
+        for block in expected_pruned_blocks:
+            self.assertNotIn(block, block_structure)
+
+    @ddt.data(True, False)
+    def test_copy(self, deep):
         def _set_value(structure, value):
             """
             Sets a test transformer block field to the given value in the given structure.
@@ -287,7 +313,7 @@ class TestBlockStructureData(TestCase, ChildrenMapTestMixin):
         _set_value(block_structure, 'original_value')
 
         # create a new copy of the structure and verify they are equivalent
-        new_copy = block_structure.copy()
+        new_copy = block_structure.copy(deep=deep)
         self.assertEqual(block_structure.root_block_usage_key, new_copy.root_block_usage_key)
         for block in block_structure:
             self.assertIn(block, new_copy)
@@ -312,3 +338,13 @@ class TestBlockStructureData(TestCase, ChildrenMapTestMixin):
         _set_value(new_copy, 'edit2')
         self.assertEqual(_get_value(block_structure), 'edit1')
         self.assertEqual(_get_value(new_copy), 'edit2')
+
+        # verify in-place updates of transformer data in the copy do not
+        # affect the original
+        block_structure.set_transformer_block_field(1, 'transformer', 'test_dict', {'url': 'original_url'})
+        new_copy = block_structure.copy(deep=deep)
+        new_copy.get_transformer_block_field(1, 'transformer', 'test_dict')['url'] = 'edited_url'
+        self.assertEqual(
+            block_structure.get_transformer_block_field(1, 'transformer', 'test_dict'),
+            {'url': 'original_url'},
+        )
@@ -167,6 +167,20 @@ class TestBlockStructureManager(UsageKeyFactoryMixin, ChildrenMapTestMixin, Test
             )
             self.assert_block_structure(block_structure, expected_structure, missing_blocks=expected_missing_blocks)
 
+    def test_get_transformed_for_each(self):
+        with mock_registered_transformers(self.registered_transformers):
+            block_structures = list(self.bs_manager.get_transformed_for_each(
+                [self.transformers, self.transformers],
+                starting_block_usage_key=self.block_key_factory(1),
+            ))
+        self.assertEqual(len(block_structures), 2)
+        self.assertIsNot(block_structures[0], block_structures[1])
+        for block_structure in block_structures:
+            self.assert_block_structure(block_structure, [[], [3, 4], [], [], []], missing_blocks=[0, 2])
+            TestTransformer1.assert_collected(block_structure)
+            TestTransformer1.assert_transformed(block_structure)
+        assert TestTransformer1.collect_call_count == 1
+
     def test_get_transformed_with_nonexistent_starting_block(self):
         with mock_registered_transformers(self.registered_transformers):
             with self.assertRaises(UsageKeyNotInBlockStructure):
@@ -0,0 +1,126 @@
+"""
+Tests for serializers.py
+"""
+
+
+from copy import deepcopy
+from datetime import datetime
+from unittest import TestCase
+
+import ddt
+from opaque_keys.edx.locator import BlockUsageLocator, CourseLocator
+
+from ..serializers import ColumnarSerializer, ZPickleSerializer, deserialize_block_structure
+from .helpers import ChildrenMapTestMixin, MockTransformer, UsageKeyFactoryMixin
+
+
+class SerializerTestMixin(ChildrenMapTestMixin):
+    """
+    Test Mixin with assertions for round-tripping block structures
+    through each of the serializers.
+    """
+    def create_collected_block_structure(self, children_map):
+        """
+        Returns a block structure for the given children_map with
+        collected xBlock fields and transformer data.
+        """
+        block_structure = self.create_block_structure(children_map)
+        block_structure._add_transformer(MockTransformer)  # pylint: disable=protected-access
+        block_structure.set_transformer_data(MockTransformer, 'course_data', {'due': datetime(2020, 1, 1)})
+        for block_id in range(len(children_map)):
+            block_key = self.block_key_factory(block_id)
+            block_structure._get_or_create_block(block_key).display_name = u'Block {}'.format(block_id)  # pylint: disable=protected-access
+            if block_id % 2:
+                block_structure.set_transformer_block_field(block_key, MockTransformer, 'odd', block_id)
+        return block_structure
+
+    def assert_round_trip(self, serializer, children_map):
+        """
+        Verifies that the given serializer round-trips the block
+        structure created for the given children_map.
+        """
+        block_structure = self.create_collected_block_structure(children_map)
+        block_relations, transformer_data, block_data_map = deserialize_block_structure(
+            serializer.serialize(block_structure)
+        )
+
+        self.assertEqual(set(block_relations), set(block_structure._block_relations))  # pylint: disable=protected-access
+        for block_key, relations in block_relations.items():
+            self.assertEqual(relations.children, block_structure.get_children(block_key))
+            self.assertEqual(relations.parents, block_structure.get_parents(block_key))
+
+        self.assertEqual(transformer_data[MockTransformer].fields, block_structure.transformer_data[MockTransformer].fields)
+
+        self.assertEqual(set(block_data_map), set(block_structure._block_data_map))  # pylint: disable=protected-access
+        for block_key, block_data in block_data_map.items():
+            expected_block_data = block_structure[block_key]
+            self.assertEqual(block_data.location, block_key)
+            self.assertEqual(block_data.fields, expected_block_data.fields)
+            self.assertEqual(set(block_data.transformer_data), set(expected_block_data.transformer_data))
+            for name, data in block_data.transformer_data.items():
+                self.assertEqual(data.fields, expected_block_data.transformer_data[name].fields)
+
+
+@ddt.ddt
+class TestSerializers(SerializerTestMixin, TestCase):
+    """
+    Tests for the block structure serializers with non-UsageKey block keys.
+    """
+    @ddt.data(
+        *[
+            (serializer, children_map)
+            for serializer in (ZPickleSerializer, ColumnarSerializer)
+            for children_map in (
+                ChildrenMapTestMixin.SIMPLE_CHILDREN_MAP,
+                ChildrenMapTestMixin.LINEAR_CHILDREN_MAP,
+                ChildrenMapTestMixin.DAG_CHILDREN_MAP,
+            )
+        ]
+    )
+    @ddt.unpack
+    def test_round_trip(self, serializer, children_map):
+        self.assert_round_trip(serializer, children_map)
+
+    def test_partial_deserialization(self):
+        block_structure = self.create_collected_block_structure(self.SIMPLE_CHILDREN_MAP)
+        block_structure.set_transformer_block_field(1, 'other_transformer', 'other', True)
+        _, _, block_data_map = ColumnarSerializer.deserialize(
+            ColumnarSerializer.serialize(block_structure),
+            transformer_names=['other_transformer'],
+        )
+        # Only the requested transformer's data is decoded up front.
+        self.assertEqual(set(block_data_map[1].transformer_data), {'other_transformer'})
+        self.assertNotIn(MockTransformer.name(), block_data_map[3].transformer_data)
+
+        # The data of other transformers is decoded on first access, for
+        # all blocks, including those of copies.
+        copied_block_data_map = deepcopy(block_data_map)
+        self.assertEqual(block_data_map[1].transformer_data[MockTransformer].odd, 1)
+        self.assertEqual(block_data_map[3].transformer_data[MockTransformer].odd, 3)
+        self.assertEqual(copied_block_data_map[3].transformer_data[MockTransformer].odd, 3)
+        with self.assertRaises(KeyError):
+            block_data_map[2].transformer_data[MockTransformer]  # pylint: disable=pointless-statement
+
+    def test_format_detection(self):
+        block_structure = self.create_collected_block_structure(self.SIMPLE_CHILDREN_MAP)
+        self.assertTrue(ColumnarSerializer.can_deserialize(ColumnarSerializer.serialize(block_structure)))
+        self.assertFalse(ColumnarSerializer.can_deserialize(ZPickleSerializer.serialize(block_structure)))
+
+
+@ddt.ddt
+class TestSerializersWithUsageKeys(UsageKeyFactoryMixin, SerializerTestMixin, TestCase):
+    """
+    Tests for the block structure serializers with UsageKey block keys.
+    """
+    @ddt.data(ZPickleSerializer, ColumnarSerializer)
+    def test_round_trip(self, serializer):
+        self.assert_round_trip(serializer, self.DAG_CHILDREN_MAP)
+
+    def test_interned_keys(self):
+        block_structure = self.create_collected_block_structure(self.SIMPLE_CHILDREN_MAP)
+        other_course_key = BlockUsageLocator(CourseLocator('other', 'course', 'run'), 'html', 'shared')
+        block_structure._add_relation(self.block_key_factory(2), other_course_key)  # pylint: disable=protected-access
+
+        block_relations, _, _ = ColumnarSerializer.deserialize(ColumnarSerializer.serialize(block_structure))
+        self.assertEqual(block_relations[self.block_key_factory(2)].children, [other_course_key])
+        self.assertEqual(block_relations[other_course_key].parents, [self.block_key_factory(2)])
@@ -3,14 +3,18 @@ Tests for block_structure/cache.py
 """
 
 
+import itertools
+
 import ddt
+from django.conf import settings
+from mock import patch
 
 from openedx.core.djangolib.testing.utils import CacheIsolationTestCase
 
-from ..config import STORAGE_BACKING_FOR_CACHE, waffle
+from ..config import COLUMNAR_SERIALIZATION, STORAGE_BACKING_FOR_CACHE, waffle
 from ..config.models import BlockStructureConfiguration
 from ..exceptions import BlockStructureNotFound
-from ..store import BlockStructureStore
+from ..store import BlockStructureStore, process_cache_stats
 from .helpers import ChildrenMapTestMixin, MockCache, MockTransformer, UsageKeyFactoryMixin
 
 
@@ -59,6 +63,52 @@ class TestBlockStructureStore(UsageKeyFactoryMixin, ChildrenMapTestMixin, CacheI
             self.assertIsNotNone(stored_value)
             self.assert_block_structure(stored_value, self.children_map)
 
+    @ddt.data(*itertools.product((True, False), repeat=2))
+    @ddt.unpack
+    def test_read_after_serializer_change(self, with_storage_backing, columnar_on_write):
+        with waffle().override(STORAGE_BACKING_FOR_CACHE, active=with_storage_backing):
+            with waffle().override(COLUMNAR_SERIALIZATION, active=columnar_on_write):
+                self.store.add(self.block_structure)
+            with waffle().override(COLUMNAR_SERIALIZATION, active=not columnar_on_write):
+                stored_value = self.store.get(self.block_structure.root_block_usage_key)
+            self.assert_block_structure(stored_value, self.children_map)
+            self.assertEqual(
+                stored_value.get_transformer_block_field(self.block_key_factory(0), MockTransformer, 'test'),
+                u'{} val'.format(MockTransformer.name()),
+            )
+
+    def test_process_cache(self):
+        with waffle().override(STORAGE_BACKING_FOR_CACHE, active=True):
+            with patch.dict(settings.BLOCK_STRUCTURES_SETTINGS, {'PROCESS_CACHE_MAX_SIZE_IN_BYTES': 10 ** 6}):
+                self.store.add(self.block_structure)
+                self.mock_cache.map.clear()
+                stats_before_get = process_cache_stats()
+                with patch(
+                    'openedx.core.djangoapps.content.block_structure.store.deserialize_block_structure',
+                ) as mock_deserialize:
+                    stored_value = self.store.get(self.block_structure.root_block_usage_key)
+                self.assertFalse(mock_deserialize.called)
+                self.assert_block_structure(stored_value, self.children_map)
+                self.assertFalse(self.mock_cache.map)
+                self.assertEqual(process_cache_stats()['hits'], stats_before_get['hits'] + 1)
+
+                # Changes to the returned block structure do not affect
+                # the cached one, nor the one that was added.
+                block_key = self.block_key_factory(0)
+                stored_value.set_transformer_block_field(block_key, MockTransformer, 'test', u'changed')
+                stored_value.remove_block(self.block_key_factory(1), keep_descendants=False)
+                for value in (self.store.get(self.block_structure.root_block_usage_key), self.block_structure):
+                    self.assert_block_structure(value, self.children_map)
+                    self.assertEqual(
+                        value.get_transformer_block_field(block_key, MockTransformer, 'test'),
+                        u'{} val'.format(MockTransformer.name()),
+                    )
+
+                self.store.delete(self.block_structure.root_block_usage_key)
+                self.assertEqual(process_cache_stats()['entries'], stats_before_get['entries'] - 1)
+                with self.assertRaises(BlockStructureNotFound):
+                    self.store.get(self.block_structure.root_block_usage_key)
+
     @ddt.data(True, False)
     def test_delete(self, with_storage_backing):
         with waffle().override(STORAGE_BACKING_FOR_CACHE, active=with_storage_backing):
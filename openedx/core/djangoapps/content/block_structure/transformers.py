@@ -71,6 +71,15 @@ class BlockStructureTransformers(object):
                 self._transformers['no_filter'].append(transformer)
         return self
 
+    def names(self):
+        """
+        Returns the names of the transformers in the collection.
+        """
+        return [
+            transformer.name()
+            for transformer in self._transformers['supports_filter'] + self._transformers['no_filter']
+        ]
+
     @classmethod
     def collect(cls, block_structure):
         """
@@ -6,7 +6,7 @@ Utilities related to caching.
 import collections
 import functools
 import itertools
-import zlib
+import threading
 
 import six
 import wrapt
@@ -18,6 +18,8 @@ from six import iteritems
 from six.moves import cPickle as pickle
 from six.moves import map
 
+from openedx.core.lib import compression
+
 
 def request_cached(namespace=None, arg_map_function=None, request_cache_getter=None):
     """
@@ -204,17 +206,131 @@ class CacheInvalidationManager:
         return decorator
 
 
-def zpickle(data):
-    """Given any data structure, returns a zlib compressed pickled serialization."""
-    return zlib.compress(pickle.dumps(data, 4))  # Keep this constant as we upgrade from python 2 to 3.
+class ByteSizeLRUCache(object):
+    """
+    A thread-safe, least-recently-used cache for the life of a process,
+    bounded by the total size in bytes of the values it holds.
+
+    Hit, miss and eviction counts are kept for monitoring.
+
+    WARNING: As with process_cached, values are shared across requests
+    in the process.  Only cache values that are immutable, or that
+    callers copy before modifying.
+    """
+
+    def __init__(self, max_size_in_bytes):
+        self.max_size_in_bytes = max_size_in_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = collections.OrderedDict()
+        self._size_in_bytes = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def size_in_bytes(self):
+        """
+        Returns the total size in bytes of the values in the cache.
+        """
+        return self._size_in_bytes
+
+    def get(self, key, default=None):
+        """
+        Returns the value cached for the given key, marking it as the
+        most recently used, or the given default if not found.
+        """
+        with self._lock:
+            try:
+                value, size_in_bytes = self._entries.pop(key)
+            except KeyError:
+                self.misses += 1
+                return default
+            self._entries[key] = (value, size_in_bytes)
+            self.hits += 1
+            return value
+
+    def set(self, key, value, size_in_bytes=None):
+        """
+        Caches the given value for the given key, evicting the least
+        recently used values as needed to stay within max_size_in_bytes.
+        Values larger than max_size_in_bytes are not cached.
+
+        Arguments:
+            size_in_bytes (int) - The size to account for the value.
+                Defaults to len(value), for bytes-like values.
+        """
+        if size_in_bytes is None:
+            size_in_bytes = len(value)
+
+        with self._lock:
+            self._delete(key)
+            if size_in_bytes > self.max_size_in_bytes:
+                return
+            self._entries[key] = (value, size_in_bytes)
+            self._size_in_bytes += size_in_bytes
+            while self._size_in_bytes > self.max_size_in_bytes:
+                _, (_, evicted_size_in_bytes) = self._entries.popitem(last=False)
+                self._size_in_bytes -= evicted_size_in_bytes
+                self.evictions += 1
+
+    def delete(self, key):
+        """
+        Removes the value cached for the given key, if any.
+        """
+        with self._lock:
+            self._delete(key)
+
+    def clear(self):
+        """
+        Removes all values from the cache and resets its counters.
+        """
+        with self._lock:
+            self._entries.clear()
+            self._size_in_bytes = 0
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self):
+        """
+        Returns a dict of the cache's counters and current size.
+        """
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'entries': len(self._entries),
+            'size_in_bytes': self._size_in_bytes,
+        }
+
+    def _delete(self, key):
+        """
+        Removes the value cached for the given key, if any. The caller
+        must hold the lock.
+        """
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._size_in_bytes -= entry[1]
+
+
+def zpickle(data, codec=compression.ZLIB):
+    """
+    Given any data structure, returns a compressed pickled serialization,
+    compressed with the given codec (zlib by default).
+    """
+    return compression.compress(pickle.dumps(data, 4), codec)  # Keep this constant as we upgrade from python 2 to 3.
 
 
 def zunpickle(zdata):
-    """Given a zlib compressed pickled serialization, returns the deserialized data."""
+    """
+    Given a compressed pickled serialization, as returned by zpickle with
+    any codec, returns the deserialized data.
+    """
     if six.PY2:
-        return pickle.loads(zlib.decompress(zdata))
+        return pickle.loads(compression.decompress(zdata))
     else:
-        return pickle.loads(zlib.decompress(zdata), encoding='latin1')
+        return pickle.loads(compression.decompress(zdata), encoding='latin1')
 
 
 def get_cache(name):
@@ -0,0 +1,140 @@
+"""
+Compression codecs for cached and stored payloads.
+
+Compressed data is self-describing: its first byte identifies the codec
+that produced it, so that data written with one codec can still be read
+after the configured codec is changed.  Data compressed with zlib has no
+added header, since zlib streams always start with 0x78, which keeps it
+readable by code that predates this module.
+
+The following codecs are available:
+    zlib - The default.  Always available.
+    lz4 - Much faster to compress and decompress than zlib, at the cost
+        of larger results.  Requires the optional `lz4` package.
+    zstd - Faster than zlib with smaller results.  Requires the optional
+        `zstandard` package.  Can also be used with a dictionary trained
+        on sample payloads (see train_dictionary), which greatly improves
+        the compression of many small, similar payloads.
+"""
+
+
+import logging
+import struct
+import zlib
+
+try:
+    import lz4.frame
+except ImportError:
+    lz4 = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+log = logging.getLogger(__name__)
+
+ZLIB = u'zlib'
+LZ4 = u'lz4'
+ZSTD = u'zstd'
+
+_LZ4_HEADER = b'\x01'
+_ZSTD_HEADER = b'\x02'
+_ZSTD_DICT_HEADER = b'\x03'
+
+# Header of data compressed with a dictionary: the codec byte followed
+# by the id of the dictionary.
+_DICT_HEADER = struct.Struct('>cI')
+
+
+def available_codecs():
+    """
+    Returns the names of the codecs that can be used in this environment.
+    """
+    codecs = [ZLIB]
+    if lz4 is not None:
+        codecs.append(LZ4)
+    if zstandard is not None:
+        codecs.append(ZSTD)
+    return codecs
+
+
+def dictionary_id(dictionary):
+    """
+    Returns the id that identifies the given dictionary in compressed data.
+    """
+    return zlib.adler32(dictionary) & 0xffffffff
+
+
+def compress(data, codec=ZLIB, level=None, dictionary=None):
+    """
+    Compresses the given bytes with the given codec, and returns the result
+    prefixed with the header of the codec.
+
+    Arguments:
+        data (bytes): The data to compress.
+        codec (str): The name of the codec to use.  If the codec is not
+            available, zlib is used instead.
+        level (int): The compression level, in the codec's own scale, or
+            None for the codec's default.
+        dictionary (bytes): An optional dictionary, as returned by
+            train_dictionary.  Only used by the zstd codec.
+    """
+    if codec not in available_codecs():
+        log.warning(u'Compression codec %s is not available, falling back to zlib.', codec)
+        codec = ZLIB
+
+    if codec == LZ4:
+        return _LZ4_HEADER + lz4.frame.compress(data, compression_level=level or 0)
+    elif codec == ZSTD:
+        if dictionary:
+            compressor = zstandard.ZstdCompressor(
+                level=level or 3,
+                dict_data=zstandard.ZstdCompressionDict(dictionary),
+            )
+            return _DICT_HEADER.pack(_ZSTD_DICT_HEADER, dictionary_id(dictionary)) + compressor.compress(data)
+        return _ZSTD_HEADER + zstandard.ZstdCompressor(level=level or 3).compress(data)
+    return zlib.compress(data, -1 if level is None else level)
+
+
+def decompress(data, dictionary=None):
+    """
+    Returns the decompressed bytes of the given data, as returned by
+    compress with any codec.
+
+    Raises ValueError if the data was compressed with a codec that is not
+    available, or with a dictionary other than the given one.
+    """
+    header = data[:1]
+    if header == _LZ4_HEADER:
+        _check_available(LZ4)
+        return lz4.frame.decompress(data[1:])
+    elif header == _ZSTD_HEADER:
+        _check_available(ZSTD)
+        return zstandard.ZstdDecompressor().decompress(data[1:])
+    elif header == _ZSTD_DICT_HEADER:
+        _check_available(ZSTD)
+        _, data_dictionary_id = _DICT_HEADER.unpack_from(data)
+        if not dictionary or dictionary_id(dictionary) != data_dictionary_id:
+            raise ValueError(u'Data was compressed with an unknown dictionary: {}'.format(data_dictionary_id))
+        decompressor = zstandard.ZstdDecompressor(dict_data=zstandard.ZstdCompressionDict(dictionary))
+        return decompressor.decompress(data[_DICT_HEADER.size:])
+    return zlib.decompress(data)
+
+
+def train_dictionary(samples, size=112640):
+    """
+    Returns a dictionary of the given size in bytes, trained on the given
+    list of sample payloads, for use with the zstd codec.
+    """
+    _check_available(ZSTD)
+    return zstandard.train_dictionary(size, samples).as_bytes()
+
+
+def _check_available(codec):
+    """
+    Raises ValueError if the given codec is not available.
+    """
+    if codec not in available_codecs():
+        raise ValueError(u'Compression codec {} is not available.'.format(codec))
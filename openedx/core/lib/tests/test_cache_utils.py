@@ -9,7 +9,7 @@ import ddt
 from mock import Mock
 
 from edx_django_utils.cache import RequestCache
-from openedx.core.lib.cache_utils import request_cached
+from openedx.core.lib.cache_utils import ByteSizeLRUCache, request_cached
 import six
 
 
@@ -297,3 +297,45 @@ class TestRequestCachedDecorator(TestCase):
         result = wrapped(3)
         self.assertEqual(result, 2)
         self.assertEqual(to_be_wrapped.call_count, 2)
+
+
+class TestByteSizeLRUCache(TestCase):
+    """
+    Test the ByteSizeLRUCache class.
+    """
+    def setUp(self):
+        super(TestByteSizeLRUCache, self).setUp()
+        self.cache = ByteSizeLRUCache(max_size_in_bytes=10)
+
+    def test_miss_and_then_hit(self):
+        self.assertIsNone(self.cache.get('key'))
+        self.cache.set('key', b'value')
+        self.assertEqual(self.cache.get('key'), b'value')
+        self.assertEqual(self.cache.stats(), {
+            'hits': 1, 'misses': 1, 'evictions': 0, 'entries': 1, 'size_in_bytes': 5,
+        })
+
+    def test_evicts_least_recently_used(self):
+        self.cache.set('a', b'aaaa')
+        self.cache.set('b', b'bbbb')
+        self.cache.get('a')
+        self.cache.set('c', b'cccc')
+        self.assertIsNone(self.cache.get('b'))
+        self.assertEqual(self.cache.get('a'), b'aaaa')
+        self.assertEqual(self.cache.get('c'), b'cccc')
+        self.assertEqual(self.cache.evictions, 1)
+        self.assertEqual(self.cache.size_in_bytes, 8)
+
+    def test_replace_and_delete(self):
+        self.cache.set('a', b'aaaa')
+        self.cache.set('a', b'aa')
+        self.assertEqual(self.cache.size_in_bytes, 2)
+        self.cache.delete('a')
+        self.assertEqual(self.cache.size_in_bytes, 0)
+        self.assertEqual(len(self.cache), 0)
+
+    def test_value_too_large(self):
+        self.cache.set('a', b'a' * 11)
+        self.assertIsNone(self.cache.get('a'))
+        self.cache.set('b', object(), size_in_bytes=3)
+        self.assertIsNotNone(self.cache.get('b'))
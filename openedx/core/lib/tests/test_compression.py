@@ -0,0 +1,49 @@
+"""
+Tests for compression.py
+"""
+
+
+import zlib
+from unittest import TestCase, skipUnless
+
+import ddt
+
+from openedx.core.lib import compression
+
+DATA = b'course structure ' * 1000
+
+
+@ddt.ddt
+class TestCompression(TestCase):
+    """
+    Tests for compressing and decompressing data with each codec.
+    """
+    @ddt.data(*compression.available_codecs())
+    def test_round_trip(self, codec):
+        compressed_data = compression.compress(DATA, codec)
+        self.assertLess(len(compressed_data), len(DATA))
+        self.assertEqual(compression.decompress(compressed_data), DATA)
+
+    def test_zlib_is_unchanged(self):
+        # Data compressed with zlib remains readable by code that predates
+        # the codec headers, and vice versa.
+        self.assertEqual(compression.compress(DATA, compression.ZLIB, level=1), zlib.compress(DATA, 1))
+        self.assertEqual(compression.decompress(zlib.compress(DATA)), DATA)
+
+    def test_unavailable_codec(self):
+        self.assertEqual(compression.decompress(compression.compress(DATA, u'unknown')), DATA)
+
+    @skipUnless(compression.ZSTD in compression.available_codecs(), u'zstandard is not installed')
+    def test_dictionary(self):
+        samples = [
+            u'{{"block": {}, "fields": {{"display_name": "Block"}}}}'.format(i).encode('utf-8')
+            for i in range(1000)
+        ]
+        dictionary = compression.train_dictionary(samples, size=1024)
+        compressed_data = compression.compress(samples[0], compression.ZSTD, dictionary=dictionary)
+        self.assertEqual(compression.decompress(compressed_data, dictionary), samples[0])
+
+        with self.assertRaises(ValueError):
+            compression.decompress(compressed_data)
+        with self.assertRaises(ValueError):
+            compression.decompress(compressed_data, dictionary + b'other')